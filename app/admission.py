@@ -0,0 +1,56 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class QueueFull(Exception):
+    """Raised when a limiter's wait queue is full; callers should answer 429/503."""
+
+
+class AdmissionLimiter:
+    """
+    Semaphore-based admission control for expensive async work.
+
+    At most max_in_flight calls run at once, at most max_waiting more wait for a
+    slot, and anything beyond that is refused immediately with QueueFull instead
+    of piling up. Must be used from a single event loop.
+    """
+
+    def __init__(self, max_in_flight: int, max_waiting: int):
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        if self._slots.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise QueueFull()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "rejected": self.rejected,
+        }
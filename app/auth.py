@@ -10,6 +10,9 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from . import crud, models, schemas, database # Make sure to import crud and schemas
+from .principal_cache import Principal, principal_cache
+from . import hashing
+import uuid
 
 # Load environment variables from .env file
 load_dotenv()
@@ -18,9 +21,14 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 # Token will be valid for 30 minutes
+# When true, the signed uid/role/act claims are trusted on a principal cache miss,
+# so authorizing a request never needs the database. Deactivations made through
+# another worker then take effect only when the token expires.
+TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() == "true"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 # --- Password Hashing ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Synchronous helpers; request handlers use the process-pool wrappers in app.hashing.
+pwd_context = hashing.pwd_context
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -35,7 +43,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -73,3 +81,62 @@ def get_current_active_user(token: str = Depends(oauth2_scheme), db: Session = D
     
     return user
 
+def principal_claims(user: models.User) -> dict:
+    """Signed claims that let get_current_principal authorize without a DB lookup."""
+    return {"uid": user.id, "role": user.role, "act": bool(user.is_active)}
+
+# --- Lightweight Dependency for Role Checks ---
+def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> Principal:
+    """
+    Like get_current_active_user, but returns a cached Principal instead of an ORM
+    user. A cache hit (or a trusted token carrying its own claims) needs zero queries.
+    Use get_current_active_user when the endpoint needs the full user row.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+    phone_number: str = payload.get("sub")
+    if phone_number is None:
+        raise credentials_exception
+    jti = payload.get("jti")
+
+    principal = principal_cache.get(phone_number, jti)
+    if principal is None:
+        if (
+            TRUST_TOKEN_CLAIMS
+            and "uid" in payload
+            and not principal_cache.invalidated_since(phone_number, payload.get("iat"))
+        ):
+            principal = Principal(
+                id=payload["uid"],
+                phone_number=phone_number,
+                role=payload.get("role"),
+                is_active=bool(payload.get("act")),
+            )
+        else:
+            user = crud.get_user_by_phone(db, phone_number=phone_number)
+            if user is None:
+                raise credentials_exception
+            principal = Principal(
+                id=user.id,
+                phone_number=user.phone_number,
+                role=user.role,
+                is_active=bool(user.is_active),
+            )
+        principal_cache.put(phone_number, jti, principal)
+
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
+
+def get_current_admin(principal: Principal = Depends(get_current_principal)) -> Principal:
+    """For operational endpoints. Admins are made in the database; signup can't create them."""
+    if principal.role != 'admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admins only")
+    return principal
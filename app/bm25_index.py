@@ -0,0 +1,400 @@
+"""
+In-process BM25 keyword index over job titles, descriptions and skill names.
+
+Jobs are added one at a time as they are created or changed (crud.create_job,
+crud.update_job) and removed when deleted (crud.delete_job). Every worker catches
+up on what other processes did with throttled keyset scans: of jobs on
+(updated_at, id), and of the job_tombstones rows crud.delete_job writes on
+(deleted_at, id). Postings are kept as CSR-style NumPy arrays (term offsets, doc
+rows, term frequencies) plus a small append-only delta for recent additions;
+save() merges the delta and writes everything to one .npz file, so a restarted
+worker loads the index instead of re-reading every job. A background thread
+saves every SAVE_INTERVAL_SECONDS while there are changes, and close() saves on
+shutdown; requests never wait for a save.
+
+A changed job is re-added under a new row and its old row is tombstoned, as is
+the row of a deleted job; tombstoned rows are dropped when the index is
+compacted on save().
+"""
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, selectinload
+
+from . import models
+from .vector_index import top_k
+
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", os.path.join("search_index", "bm25.npz"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+# How often a worker checks the jobs table for changes made by other processes.
+RECHECK_SECONDS = 5
+CATCH_UP_BATCH_SIZE = 1000
+# Re-read rows stamped this long before the watermarks, in case a slow transaction
+# committed one with an older timestamp after the last scan (as ingest_job.py does).
+# Re-adding an unchanged job or removing a removed one is a no-op.
+WATERMARK_OVERLAP = timedelta(minutes=2)
+# How often the background thread saves (and compacts) the index while it has changes.
+SAVE_INTERVAL_SECONDS = 60
+EPOCH = datetime(1970, 1, 1)
+
+_TOKEN = re.compile(r"\w+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "the", "to", "with", "we", "you", "your", "our", "will",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def _overlapped(watermark: Tuple[datetime, int]) -> Tuple[datetime, int]:
+    """Where a keyset scan resumes: WATERMARK_OVERLAP before the watermark."""
+    after, _ = watermark
+    return (after - WATERMARK_OVERLAP, 0) if after != EPOCH else watermark
+
+
+def _encode_watermark(watermark: Tuple[datetime, int]) -> np.ndarray:
+    return np.asarray([watermark[0].isoformat(), str(watermark[1])])
+
+
+def _decode_watermark(array: np.ndarray) -> Tuple[datetime, int]:
+    at, row_id = array.tolist()
+    return datetime.fromisoformat(at), int(row_id)
+
+
+def job_text(job: models.Job) -> str:
+    skills = " ".join(skill.name for skill in job.required_skills)
+    return f"{job.title} {job.description} {skills}"
+
+
+class BM25Index:
+    def __init__(self, path: str = BM25_INDEX_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        # Serializes saves, which write the file outside _lock.
+        self._save_lock = threading.Lock()
+        self._checked_at = 0.0
+        self._unsaved = 0
+        self._saver: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._reset()
+
+    def _reset(self):
+        self._terms: Dict[str, int] = {}
+        # Compacted postings: rows of term t are _rows[_offsets[t]:_offsets[t + 1]]
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._rows = np.empty(0, dtype=np.int32)
+        self._tfs = np.empty(0, dtype=np.uint16)
+        # Postings added since the last compaction: term id -> (rows, tfs)
+        self._delta: Dict[int, Tuple[List[int], List[int]]] = {}
+        # Per row
+        self._job_ids: List[int] = []
+        self._doc_lengths: List[int] = []
+        self._live: List[bool] = []
+        self._locations: List[str] = []
+        self._skill_ids: List[Tuple[int, ...]] = []
+        # Filters: skill id / normalized location -> rows
+        self._rows_by_skill: Dict[int, List[int]] = {}
+        self._rows_by_location: Dict[str, List[int]] = {}
+        self._row_by_job: Dict[int, int] = {}
+        self._updated_by_job: Dict[int, float] = {}
+        self._total_length = 0
+        self._live_count = 0
+        self._arrays = None  # cached NumPy views of the per-row lists
+        self._watermark: Tuple[datetime, int] = (EPOCH, 0)
+        self._tombstone_watermark: Tuple[datetime, int] = (EPOCH, 0)
+
+    # --- Building ---
+    def add_job(self, job: models.Job):
+        """Indexes a job (or re-indexes a changed one). job.required_skills must be loadable."""
+        updated = job.updated_at.timestamp() if job.updated_at else 0.0
+        with self._lock:
+            if self._updated_by_job.get(job.id) == updated:
+                return
+            self._remove(job.id)
+            tokens = tokenize(job_text(job))
+            row = len(self._job_ids)
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                term_id = self._terms.setdefault(token, len(self._terms))
+                rows, tfs = self._delta.setdefault(term_id, ([], []))
+                rows.append(row)
+                tfs.append(min(count, 65535))
+
+            location = job.location_area_norm or models.normalize_location(job.location_area or "")
+            self._append_row(job.id, len(tokens), location, tuple(skill.id for skill in job.required_skills), updated)
+            self._unsaved += 1
+        self._ensure_saver()
+
+    def remove_job(self, job_id: int):
+        """Drops a deleted job from the results."""
+        with self._lock:
+            if self._remove(job_id):
+                self._updated_by_job.pop(job_id, None)
+                self._unsaved += 1
+        self._ensure_saver()
+
+    def _append_row(self, job_id: int, length: int, location: str, skill_ids: Tuple[int, ...], updated: float):
+        row = len(self._job_ids)
+        self._job_ids.append(job_id)
+        self._doc_lengths.append(length)
+        self._live.append(True)
+        self._locations.append(location)
+        self._skill_ids.append(skill_ids)
+        self._rows_by_location.setdefault(location, []).append(row)
+        for skill_id in skill_ids:
+            self._rows_by_skill.setdefault(skill_id, []).append(row)
+        self._row_by_job[job_id] = row
+        self._updated_by_job[job_id] = updated
+        self._total_length += length
+        self._live_count += 1
+        self._arrays = None
+
+    def _remove(self, job_id: int) -> bool:
+        row = self._row_by_job.pop(job_id, None)
+        if row is None or not self._live[row]:
+            return False
+        self._live[row] = False
+        self._total_length -= self._doc_lengths[row]
+        self._live_count -= 1
+        self._arrays = None
+        return True
+
+    def refresh(self, db: Session):
+        """Catches up on jobs created, changed or deleted by other processes. Throttled."""
+        if time.monotonic() - self._checked_at < RECHECK_SECONDS:
+            return
+        with self._lock:
+            self._checked_at = time.monotonic()
+            self._watermark = self._catch_up_jobs(db, self._watermark)
+            self._tombstone_watermark = self._catch_up_tombstones(db, self._tombstone_watermark)
+
+    def _catch_up_jobs(self, db: Session, watermark: Tuple[datetime, int]) -> Tuple[datetime, int]:
+        after_updated_at, after_id = _overlapped(watermark)
+        while True:
+            jobs = (
+                db.query(models.Job)
+                .options(selectinload(models.Job.required_skills))
+                .filter(or_(
+                    models.Job.updated_at > after_updated_at,
+                    (models.Job.updated_at == after_updated_at) & (models.Job.id > after_id),
+                ))
+                .order_by(models.Job.updated_at, models.Job.id)
+                .limit(CATCH_UP_BATCH_SIZE)
+                .all()
+            )
+            for job in jobs:
+                self.add_job(job)
+            if jobs:
+                after_updated_at, after_id = jobs[-1].updated_at, jobs[-1].id
+            if len(jobs) < CATCH_UP_BATCH_SIZE:
+                return max(watermark, (after_updated_at, after_id))
+
+    def _catch_up_tombstones(self, db: Session, watermark: Tuple[datetime, int]) -> Tuple[datetime, int]:
+        after_deleted_at, after_id = _overlapped(watermark)
+        while True:
+            tombstones = (
+                db.query(models.JobTombstone)
+                .filter(or_(
+                    models.JobTombstone.deleted_at > after_deleted_at,
+                    (models.JobTombstone.deleted_at == after_deleted_at) & (models.JobTombstone.id > after_id),
+                ))
+                .order_by(models.JobTombstone.deleted_at, models.JobTombstone.id)
+                .limit(CATCH_UP_BATCH_SIZE)
+                .all()
+            )
+            for tombstone in tombstones:
+                self.remove_job(tombstone.job_id)
+            if tombstones:
+                after_deleted_at, after_id = tombstones[-1].deleted_at, tombstones[-1].id
+            if len(tombstones) < CATCH_UP_BATCH_SIZE:
+                return max(watermark, (after_deleted_at, after_id))
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = (self._offsets[term_id], self._offsets[term_id + 1]) if term_id + 1 < len(self._offsets) else (0, 0)
+        rows, tfs = self._rows[start:end], self._tfs[start:end]
+        delta = self._delta.get(term_id)
+        if delta:
+            rows = np.concatenate([rows, np.asarray(delta[0], dtype=np.int32)])
+            tfs = np.concatenate([tfs, np.asarray(delta[1], dtype=np.uint16)])
+        return rows, tfs
+
+    def _compact(self):
+        """Merges the delta postings into the CSR arrays and drops tombstoned rows."""
+        live = np.asarray(self._live, dtype=bool)
+        if not self._delta and live.all():
+            return
+        new_row = np.cumsum(live, dtype=np.int64) - 1
+        row_parts, tf_parts, offsets = [], [], [0]
+        for term_id in range(len(self._terms)):
+            rows, tfs = self._postings(term_id)
+            keep = live[rows]
+            row_parts.append(new_row[rows[keep]].astype(np.int32))
+            tf_parts.append(tfs[keep])
+            offsets.append(offsets[-1] + int(keep.sum()))
+        rows = np.concatenate(row_parts) if row_parts else np.empty(0, dtype=np.int32)
+        tfs = np.concatenate(tf_parts) if tf_parts else np.empty(0, dtype=np.uint16)
+
+        kept = [
+            (self._job_ids[row], self._doc_lengths[row], self._locations[row], self._skill_ids[row],
+             self._updated_by_job[self._job_ids[row]])
+            for row in np.flatnonzero(live).tolist()
+        ]
+        terms, watermarks = self._terms, (self._watermark, self._tombstone_watermark)
+        self._reset()
+        self._terms, (self._watermark, self._tombstone_watermark) = terms, watermarks
+        self._offsets, self._rows, self._tfs = np.asarray(offsets, dtype=np.int64), rows, tfs
+        for row in kept:
+            self._append_row(*row)
+
+    def _row_arrays(self):
+        if self._arrays is None:
+            self._arrays = (
+                np.asarray(self._doc_lengths, dtype=np.float32),
+                np.asarray(self._live, dtype=bool),
+            )
+        return self._arrays
+
+    # --- Persistence ---
+    def save(self):
+        """Compacts and writes the index. The file is written outside the search lock."""
+        with self._save_lock:
+            with self._lock:
+                self._compact()
+                terms = sorted(self._terms, key=self._terms.get)
+                skill_counts = [len(skills) for skills in self._skill_ids]
+                # Compaction replaces the CSR arrays instead of changing them, and new
+                # postings go to the delta, so these stay valid after the lock is released.
+                arrays = dict(
+                    terms=np.asarray(terms, dtype=str),
+                    offsets=self._offsets,
+                    rows=self._rows,
+                    tfs=self._tfs,
+                    job_ids=np.asarray(self._job_ids, dtype=np.int64),
+                    doc_lengths=np.asarray(self._doc_lengths, dtype=np.int32),
+                    updated=np.asarray([self._updated_by_job.get(j, 0.0) for j in self._job_ids], dtype=np.float64),
+                    locations=np.asarray(self._locations, dtype=str),
+                    skill_offsets=np.concatenate([[0], np.cumsum(skill_counts, dtype=np.int64)]),
+                    skill_values=np.asarray([s for skills in self._skill_ids for s in skills], dtype=np.int64),
+                    watermark=_encode_watermark(self._watermark),
+                    tombstone_watermark=_encode_watermark(self._tombstone_watermark),
+                )
+                self._unsaved = 0
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Write-then-rename, so readers never see a half-written file. Every worker
+            # may save; the last complete file wins and the others catch up via refresh().
+            tmp_path = f"{self.path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, self.path)
+
+    def _ensure_saver(self):
+        if self._saver is None or not self._saver.is_alive():
+            with self._lock:
+                if not self._stop.is_set() and (self._saver is None or not self._saver.is_alive()):
+                    self._saver = threading.Thread(target=self._save_loop, name="bm25-index-saver", daemon=True)
+                    self._saver.start()
+
+    def _save_loop(self):
+        while not self._stop.wait(SAVE_INTERVAL_SECONDS):
+            if self._unsaved:
+                try:
+                    self.save()
+                except Exception as e:
+                    print(f"Failed to save the BM25 index: {e}")
+
+    def close(self):
+        """Stops the background saver and saves what it hasn't yet; call on shutdown."""
+        self._stop.set()
+        if self._saver is not None:
+            self._saver.join(timeout=5)
+        if self._unsaved:
+            self.save()
+
+    def load(self) -> bool:
+        """Loads the saved index, if any. Jobs changed since are picked up by refresh()."""
+        try:
+            data = np.load(self.path, allow_pickle=False)
+        except FileNotFoundError:
+            return False
+        with self._lock, data:
+            self._reset()
+            # Saved files are compacted, so every row in them is live.
+            self._terms = {term: i for i, term in enumerate(data["terms"].tolist())}
+            self._offsets, self._rows, self._tfs = data["offsets"], data["rows"], data["tfs"]
+            skill_offsets, skill_values = data["skill_offsets"].tolist(), data["skill_values"].tolist()
+            for row, (job_id, length, location, updated) in enumerate(zip(
+                data["job_ids"].tolist(), data["doc_lengths"].tolist(), data["locations"].tolist(), data["updated"].tolist()
+            )):
+                skill_ids = tuple(skill_values[skill_offsets[row]:skill_offsets[row + 1]])
+                self._append_row(job_id, length, location, skill_ids, updated)
+            self._watermark = _decode_watermark(data["watermark"])
+            # Files saved before deletions were tracked replay every tombstone.
+            if "tombstone_watermark" in data.files:
+                self._tombstone_watermark = _decode_watermark(data["tombstone_watermark"])
+        return True
+
+    # --- Searching ---
+    def _candidate_mask(self, skill_ids: Optional[Sequence[int]], location_area: Optional[str]) -> np.ndarray:
+        _, live = self._row_arrays()
+        mask = live.copy()
+        if skill_ids is not None:
+            skill_mask = np.zeros(len(mask), dtype=bool)
+            for skill_id in set(skill_ids):
+                skill_mask[self._rows_by_skill.get(skill_id, [])] = True
+            mask &= skill_mask
+        if location_area:
+            location_mask = np.zeros(len(mask), dtype=bool)
+            for location, rows in self._rows_by_location.items():
+                if location.startswith(location_area):
+                    location_mask[rows] = True
+            mask &= location_mask
+        return mask
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        skill_ids: Optional[Sequence[int]] = None,
+        location_area: Optional[str] = None,
+    ) -> List[Tuple[int, float]]:
+        """(job_id, BM25 score) for the k best-matching jobs, best first. location_area is normalized."""
+        with self._lock:
+            if not self._live_count:
+                return []
+            doc_lengths, live = self._row_arrays()
+            average_length = max(self._total_length / self._live_count, 1.0)
+            scores = np.zeros(len(self._job_ids), dtype=np.float32)
+            for token in set(tokenize(query)):
+                term_id = self._terms.get(token)
+                if term_id is None:
+                    continue
+                rows, tfs = self._postings(term_id)
+                # Tombstoned rows stay in the postings until the next compaction.
+                document_frequency = int(np.count_nonzero(live[rows]))
+                idf = np.log(1.0 + (self._live_count - document_frequency + 0.5) / (document_frequency + 0.5))
+                tfs = tfs.astype(np.float32)
+                norms = BM25_K1 * (1.0 - BM25_B + BM25_B * doc_lengths[rows] / average_length)
+                scores[rows] += idf * tfs * (BM25_K1 + 1.0) / (tfs + norms)
+
+            filtered = skill_ids is not None or bool(location_area)
+            mask = self._candidate_mask(skill_ids, location_area) if filtered else live
+            scores[~mask] = 0.0
+            matched = np.flatnonzero(scores > 0)
+            best = matched[top_k(scores[matched], k)]
+            return [(self._job_ids[row], float(scores[row])) for row in best]
+
+
+# A single shared keyword index for the whole process.
+bm25_index = BM25Index()
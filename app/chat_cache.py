@@ -0,0 +1,160 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import FrozenSet, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+
+from . import models
+from .database import SessionLocal
+from .embeddings import get_embedder
+
+# --- Cache Settings ---
+CHAT_CACHE_THRESHOLD = float(os.getenv("CHAT_CACHE_THRESHOLD", "0.92"))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "1000"))
+CHAT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL_SECONDS", "600"))
+# How often a worker checks whether jobs changed through another process.
+RECHECK_SECONDS = 5
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_question(question: str) -> str:
+    """'Any  Plumber jobs in Adajan??' -> 'any plumber jobs in adajan'"""
+    return " ".join(_PUNCTUATION.sub(" ", question.lower()).split())
+
+
+# (skill ids, normalized location areas) named in a question, see IntentRouter.entities.
+Entities = Tuple[FrozenSet[int], FrozenSet[str]]
+
+
+class CacheLookup(NamedTuple):
+    answer: Optional[str]
+    normalized: str
+    vector: np.ndarray
+    entities: Entities
+    generation: int
+
+
+class ChatResponseCache:
+    """
+    Semantic cache of chatbot answers.
+
+    A question is normalized and looked up exactly first; otherwise it is embedded
+    and compared by cosine similarity with the cached questions that name the same
+    skills and location areas. Similarity alone would serve "plumber jobs in Adajan"
+    to "plumber jobs in Vesu", which differ by one word. Entries expire
+    after a TTL, the least recently used are evicted beyond the size limit, and
+    everything is dropped when the jobs table changes: invalidate() is called on
+    job writes in this process, and a cheap (COUNT, MAX(updated_at)) check on the
+    jobs table catches writes made by other processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # normalized question -> (expires_at, unit vector, entities, answer)
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray, Entities, str]]" = OrderedDict()
+        self._generation = 0
+        self._jobs_version = None
+        self._embedding: Optional[Tuple[str, str]] = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    # --- Embedding ---
+    def _embed(self, text: str) -> np.ndarray:
+        # Imported here because job_search -> crud -> chat_cache.
+        from .job_search import job_search
+        # The active index version's model and mode: already loaded for search, and switched with it.
+        embedding = job_search.query_embedding()
+        if embedding != self._embedding:
+            if self._embedding is not None:
+                self.invalidate()  # vectors of different models don't compare
+            self._embedding = embedding
+        vector = np.asarray(get_embedder(*embedding).embed_query(text), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    @staticmethod
+    def _entities(text: str) -> Entities:
+        # Imported here because intent_router -> crud -> chat_cache.
+        from .intent_router import intent_router
+        return intent_router.entities(text)
+
+    # --- Invalidation ---
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            # Answers computed before this point must not be stored afterwards.
+            self._generation += 1
+
+    def _check_jobs_version(self):
+        if time.monotonic() - self._checked_at < RECHECK_SECONDS:
+            return
+        db = SessionLocal()
+        try:
+            version = tuple(db.query(func.count(models.Job.id), func.max(models.Job.updated_at)).one())
+        finally:
+            db.close()
+        self._checked_at = time.monotonic()
+        if version != self._jobs_version:
+            if self._jobs_version is not None:
+                self.invalidate()
+            self._jobs_version = version
+
+    # --- Lookup / Store ---
+    def lookup(self, question: str) -> CacheLookup:
+        """Blocking (DB check + embedding); call it from a worker thread."""
+        self._check_jobs_version()
+        normalized = normalize_question(question)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(normalized)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(normalized)
+                self.hits += 1
+                return CacheLookup(entry[3], normalized, entry[1], entry[2], self._generation)
+
+        vector = self._embed(normalized)
+        entities = self._entities(normalized)
+        with self._lock:
+            for key in [key for key, (expires_at, _, _, _) in self._entries.items() if expires_at <= now]:
+                del self._entries[key]
+            keys = [key for key, entry in self._entries.items() if entry[2] == entities]
+            if keys:
+                matrix = np.stack([self._entries[key][1] for key in keys])
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= CHAT_CACHE_THRESHOLD:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return CacheLookup(self._entries[keys[best]][3], normalized, vector, entities, self._generation)
+            self.misses += 1
+            return CacheLookup(None, normalized, vector, entities, self._generation)
+
+    def store(self, lookup: CacheLookup, answer: str):
+        with self._lock:
+            if lookup.generation != self._generation:
+                return
+            self._entries[lookup.normalized] = (
+                time.monotonic() + CHAT_CACHE_TTL_SECONDS, lookup.vector, lookup.entities, answer,
+            )
+            self._entries.move_to_end(lookup.normalized)
+            while len(self._entries) > CHAT_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+# A single shared cache for the whole process.
+chat_cache = ChatResponseCache()
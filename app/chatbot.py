@@ -1,8 +1,18 @@
 import os
-import requests
 from langchain_groq import ChatGroq
 from langchain.agents import tool, AgentExecutor, create_tool_calling_agent # Changed import
 from langchain_core.prompts import ChatPromptTemplate # Changed import
+from . import crud
+from .admission import AdmissionLimiter
+from .database import SessionLocal
+from .job_search import job_search
+
+# --- Chat admission control ---
+# Each chat holds a slot for its whole agent run (several Groq round trips).
+CHAT_MAX_IN_FLIGHT = int(os.getenv("CHAT_MAX_IN_FLIGHT", "8"))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "32"))
+CHAT_RETRY_AFTER_SECONDS = int(os.getenv("CHAT_RETRY_AFTER_SECONDS", "5"))
+chat_limiter = AdmissionLimiter(max_in_flight=CHAT_MAX_IN_FLIGHT, max_waiting=CHAT_MAX_QUEUE)
 
 # --- 1. The Brain: Initialize the Language Model ---
 llm = ChatGroq(
@@ -11,6 +21,9 @@ llm = ChatGroq(
     model_name="llama3-70b-8192"
 )
 
+# How many jobs the tool hands back to the LLM at most.
+FIND_JOBS_TOP_K = 10
+
 @tool
 def find_jobs_tool(skill: str = "", location: str = "") -> str:
     """
@@ -23,50 +36,57 @@ def find_jobs_tool(skill: str = "", location: str = "") -> str:
     if not skill and not location:
         return "Error: You must provide either a skill or a location to search for jobs."
 
-    api_url = "http://127.0.0.1:8000/jobs/"
+    # Query the database directly with our own session instead of calling our own
+    # HTTP API, which would tie up a second worker and scan the whole job list.
+    db = SessionLocal()
     try:
-        response = requests.get(api_url)
-        if response.status_code != 200:
-            return "Error: Could not fetch jobs from the API."
-
-        all_jobs = response.json()
-        matching_jobs = []
-        
-        # --- SMARTER FILTERING LOGIC ---
-        skill_search_words = set(skill.lower().split())
-
-        for job in all_jobs:
-            # Check for skill match
-            skill_match = not skill
-            if skill:
-                for s in job.get('required_skills', []):
-                    db_skill_words = set(s.get('name', '').lower().split())
-                    # Check if any of the search words overlap with the database skill words
-                    if not skill_search_words.isdisjoint(db_skill_words):
-                        skill_match = True
-                        break
-            
-            # Check for location match
-            location_match = not location
-            if location:
-                if location.lower() in job.get('location_area', '').lower():
-                    location_match = True
-
-            if skill_match and location_match:
-                matching_jobs.append(f"- '{job['title']}' in {job['location_area']}")
-
-        if not matching_jobs:
+        skill_ids = None
+        if skill:
+            skill_ids = crud.find_skill_ids_by_words(db, skill.lower().split())
+            if not skill_ids:
+                return f"No jobs found matching your criteria."
+
+        jobs = crud.search_jobs_ranked(
+            db, skill_ids=skill_ids, location_area=location or None, limit=FIND_JOBS_TOP_K
+        )
+        if not jobs:
             return f"No jobs found matching your criteria."
-        
+
+        matching_jobs = [f"- '{job.title}' in {job.location_area}" for job in jobs]
         return "I found the following jobs:\n" + "\n".join(matching_jobs)
 
     except Exception as e:
         return f"An error occurred while searching for jobs: {e}"
+    finally:
+        db.close()
+
+
+@tool
+def search_jobs_tool(query: str) -> str:
+    """
+    Searches jobs by a free-text description of the work, e.g. "fixing water leaks
+    in bathrooms" or "night shift security guard". Use it when the user describes
+    the work instead of naming a skill or location.
+    Returns a list of the best matching jobs or a message if none are found.
+    """
+    print(f"--- Running search_jobs_tool with query: '{query}' ---")
+
+    db = SessionLocal()
+    try:
+        hits = job_search.search(db, query, k=FIND_JOBS_TOP_K)
+        if not hits:
+            return "No jobs found matching your criteria."
+        matching_jobs = [f"- '{hit.job.title}' in {hit.job.location_area}" for hit in hits]
+        return "I found the following jobs:\n" + "\n".join(matching_jobs)
+    except Exception as e:
+        return f"An error occurred while searching for jobs: {e}"
+    finally:
+        db.close()
 
 
 # --- 3. The Agent: (Upgraded Version) ---
 
-tools = [find_jobs_tool]
+tools = [find_jobs_tool, search_jobs_tool]
 
 # This is our new, stricter prompt.
 prompt = ChatPromptTemplate.from_messages(
@@ -87,4 +107,30 @@ prompt = ChatPromptTemplate.from_messages(
 agent = create_tool_calling_agent(llm, tools, prompt) # Changed agent type
 
 # The Agent Executor remains the same
-agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
\ No newline at end of file
+agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+
+# --- 4. Streaming: tokens and tool calls as they happen ---
+async def stream_chat_events(message: str, chat_history: list = ()):
+    """
+    Runs the agent and yields (event, data) pairs: 'token' for each piece of LLM
+    text, 'tool_start'/'tool_end' around tool calls, and a final 'done' with the answer.
+    Closing this generator (e.g. when the client disconnects) cancels the in-flight
+    Groq request and stops any remaining agent iterations.
+    """
+    events = agent_executor.astream_events({"input": message, "chat_history": list(chat_history)}, version="v2")
+    try:
+        async for event in events:
+            kind = event["event"]
+            if kind == "on_chat_model_stream":
+                text = event["data"]["chunk"].content
+                if text:
+                    yield "token", {"text": text}
+            elif kind == "on_tool_start":
+                yield "tool_start", {"tool": event["name"], "input": event["data"].get("input")}
+            elif kind == "on_tool_end":
+                yield "tool_end", {"tool": event["name"], "output": str(event["data"].get("output"))}
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # The root AgentExecutor run has finished.
+                yield "done", {"response": event["data"]["output"]["output"]}
+    finally:
+        await events.aclose()
@@ -0,0 +1,249 @@
+"""
+Per-session chat history for the agent's {chat_history} placeholder.
+
+Session ids are issued by the server (issue_session_id) and signed, so a client
+can only continue a conversation it was given, not read or extend another one
+by guessing its id.
+
+History is read from a pluggable backend (SQL by default, or JSON lines on
+disk) on every turn, so every uvicorn worker sees the same conversation. Writes
+are handed to a background thread that flushes them in batches, so saving
+history never adds latency to a chat response; until a turn is flushed, the
+worker that took it adds it to what it reads back. The history is kept within
+a token budget: the oldest turns are dropped into a short running summary, so
+prompt size stays bounded however long a conversation gets.
+"""
+import hashlib
+import hmac
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from . import models
+from .auth import SECRET_KEY
+from .database import SessionLocal
+
+# --- History Settings ---
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
+CHAT_HISTORY_BACKEND = os.getenv("CHAT_HISTORY_BACKEND", "sql") # 'sql' or 'file'
+CHAT_HISTORY_DIR = os.getenv("CHAT_HISTORY_DIR", "chat_history")
+# Turns read back for each chat turn; the budget trims them further.
+LOAD_LAST_TURNS = 50
+SUMMARY_MAX_CHARS = 600
+FLUSH_BATCH_SIZE = 200
+FLUSH_INTERVAL_SECONDS = 0.5
+
+
+class Turn(NamedTuple):
+    role: str     # 'human' or 'ai'
+    content: str
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English-like text; good enough for budgeting.
+    return len(text) // 4 + 1
+
+
+# --- Session ids ---
+def _session_signature(token: str) -> str:
+    return hmac.new(SECRET_KEY.encode(), b"chat-session:" + token.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def issue_session_id() -> str:
+    """A new, unguessable session id: '<random token>.<signature>', 55 characters."""
+    token = secrets.token_urlsafe(16)
+    return f"{token}.{_session_signature(token)}"
+
+
+def is_valid_session_id(session_id: str) -> bool:
+    token, _, signature = session_id.partition(".")
+    # Compared as bytes: compare_digest raises TypeError on str with non-ASCII characters.
+    return bool(token) and hmac.compare_digest(signature.encode(), _session_signature(token).encode())
+
+
+# --- Backends ---
+class SQLBackend:
+    def load(self, session_id: str, limit: int) -> List[Turn]:
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(models.ChatMessage.role, models.ChatMessage.content)
+                .filter(models.ChatMessage.session_id == session_id)
+                .order_by(models.ChatMessage.id.desc())
+                .limit(limit)
+                .all()
+            )
+        finally:
+            db.close()
+        return [Turn(role, content) for role, content in reversed(rows)]
+
+    def append_many(self, records: Iterable[Tuple[str, Turn]]):
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(models.ChatMessage, [
+                {"session_id": session_id, "role": turn.role, "content": turn.content, "created_at": models.utcnow()}
+                for session_id, turn in records
+            ])
+            db.commit()
+        finally:
+            db.close()
+
+
+class FileBackend:
+    """One JSON-lines file per session under CHAT_HISTORY_DIR."""
+
+    def __init__(self, directory: str = CHAT_HISTORY_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        # Hashed, so distinct ids can never share a file whatever characters they contain.
+        name = hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.jsonl")
+
+    def load(self, session_id: str, limit: int) -> List[Turn]:
+        try:
+            with open(self._path(session_id), encoding="utf-8") as f:
+                lines = deque(f, maxlen=limit)
+        except FileNotFoundError:
+            return []
+        return [Turn(**json.loads(line)) for line in lines]
+
+    def append_many(self, records: Iterable[Tuple[str, Turn]]):
+        by_session = {}
+        for session_id, turn in records:
+            by_session.setdefault(session_id, []).append(turn)
+        for session_id, turns in by_session.items():
+            with open(self._path(session_id), "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(turn._asdict()) + "\n" for turn in turns)
+
+
+# --- Store ---
+class _Session:
+    def __init__(self):
+        self.turns: Deque[Turn] = deque()
+        self.summary = ""
+        self.tokens = 0
+
+
+class ConversationStore:
+    def __init__(self, backend, token_budget: int = CHAT_HISTORY_TOKEN_BUDGET):
+        self.backend = backend
+        self.token_budget = token_budget
+        self._lock = threading.Lock()
+        # Turns taken by this process that the writer hasn't persisted yet.
+        self._unflushed: Dict[str, List[Turn]] = {}
+        # Held while reading history and while flushing, so a read sees every turn
+        # exactly once: either in the backend or still unflushed, never both or neither.
+        self._flush_lock = threading.Lock()
+        self._pending: "queue.Queue[Optional[Tuple[str, Turn]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    # --- Reading ---
+    def get_history(self, session_id: str) -> list:
+        """LangChain messages for the prompt. Blocking (backend read); call from a worker thread."""
+        with self._flush_lock:
+            turns = self.backend.load(session_id, LOAD_LAST_TURNS)
+            with self._lock:
+                turns.extend(self._unflushed.get(session_id, ()))
+        session = _Session()
+        for turn in turns[-LOAD_LAST_TURNS:]:
+            self._add_turn(session, turn)
+        return self._to_messages(session)
+
+    @staticmethod
+    def _to_messages(session: _Session) -> list:
+        messages = []
+        if session.summary:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation: {session.summary}"))
+        for turn in session.turns:
+            message_class = HumanMessage if turn.role == "human" else AIMessage
+            messages.append(message_class(content=turn.content))
+        return messages
+
+    # --- Writing ---
+    def append(self, session_id: str, question: str, answer: str):
+        """Queues one exchange for the background writer."""
+        turns = [Turn("human", question), Turn("ai", answer)]
+        self._ensure_writer()
+        with self._lock:
+            # Queued under the lock, so the writer flushes them in the order they are listed here.
+            self._unflushed.setdefault(session_id, []).extend(turns)
+            for turn in turns:
+                self._pending.put((session_id, turn))
+
+    def _add_turn(self, session: _Session, turn: Turn):
+        session.turns.append(turn)
+        session.tokens += estimate_tokens(turn.content)
+        # Compact: fold the oldest turns into the summary until the budget fits.
+        while session.tokens + estimate_tokens(session.summary) > self.token_budget and len(session.turns) > 1:
+            dropped = session.turns.popleft()
+            session.tokens -= estimate_tokens(dropped.content)
+            if dropped.role == "human":
+                asked = dropped.content.strip().replace("\n", " ")[:120]
+                session.summary = f"{session.summary} The user asked: {asked}".strip()
+                if len(session.summary) > SUMMARY_MAX_CHARS:
+                    session.summary = "..." + session.summary[-SUMMARY_MAX_CHARS:]
+
+    # --- Background writer ---
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            with self._lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._write_loop, name="chat-history-writer", daemon=True)
+                    self._writer.start()
+
+    def _write_loop(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+            while len(batch) < FLUSH_BATCH_SIZE:
+                try:
+                    item = self._pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                with self._flush_lock:
+                    try:
+                        self.backend.append_many(batch)
+                    except Exception as e:
+                        print(f"Failed to persist {len(batch)} chat turns: {e}")
+                    # Dropped from memory either way, so a failing backend can't grow it without bound.
+                    self._forget_flushed(batch)
+
+    def _forget_flushed(self, batch: List[Tuple[str, Turn]]):
+        with self._lock:
+            for session_id, _ in batch:
+                turns = self._unflushed.get(session_id)
+                if turns:
+                    turns.pop(0)
+                    if not turns:
+                        del self._unflushed[session_id]
+
+    def close(self):
+        """Flushes queued writes; call on shutdown."""
+        if self._writer is not None and self._writer.is_alive():
+            self._pending.put(None)
+            self._writer.join(timeout=5)
+
+
+def _make_backend():
+    if CHAT_HISTORY_BACKEND == "file":
+        return FileBackend()
+    return SQLBackend()
+
+
+# A single shared store for the whole process.
+conversation_store = ConversationStore(_make_backend())
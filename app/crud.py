@@ -1,6 +1,23 @@
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import delete, func, insert, literal, or_, select, update
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import Dict, List, NamedTuple, Optional
+from datetime import timedelta
 from . import models, schemas, auth
+from .matching import skill_index
+from .skill_catalog import skill_catalog
+from .principal_cache import principal_cache
+from .chat_cache import chat_cache
+from .bm25_index import bm25_index
+
+# --- Query Helpers ---
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _location_prefix(location_area: str):
+    """Case-insensitive prefix match that can use the jobs(location_area_norm, id) index."""
+    prefix = _escape_like(models.normalize_location(location_area))
+    return models.Job.location_area_norm.like(prefix + "%", escape="\\")
 
 # --- User CRUD ---
 def get_user_by_phone(db: Session, phone_number: str):
@@ -20,20 +37,57 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    if db_user.role == 'seeker':
+        # New seekers start without skills; this clears any stale entry for the id.
+        skill_index.set_user_skills(db_user.id, ())
     return db_user
 
 # --- Skill CRUD ---
 def get_skill_by_name(db: Session, name: str):
     return db.query(models.Skill).filter(models.Skill.name == name).first()
     
-def get_skills(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Skill).offset(skip).limit(limit).all()
+def normalize_skill_name(name: str) -> str:
+    # Skill names compare case-insensitively under the MySQL collation; only whitespace needs fixing.
+    return " ".join(name.split())
+
+def get_skill_ids_by_names(db: Session, names: List[str]) -> List[int]:
+    normalized = {normalize_skill_name(name) for name in names if name.strip()}
+    if not normalized:
+        return []
+    return [skill_id for (skill_id,) in db.query(models.Skill.id).filter(models.Skill.name.in_(normalized)).all()]
+
+def find_skill_ids_by_words(db: Session, words: List[str]) -> List[int]:
+    """
+    Ids of skills whose name contains any of the words as a whole word, e.g.
+    "plumber" finds "Plumber" and "Pipe Plumber". The skills table is small, so
+    matching inside names is cheap; the expensive part is the jobs lookup.
+    """
+    conditions = []
+    for word in {w.strip() for w in words if w.strip()}:
+        escaped = _escape_like(word)
+        conditions.extend([
+            models.Skill.name == word,
+            models.Skill.name.like(f"{escaped} %", escape="\\"),
+            models.Skill.name.like(f"% {escaped}", escape="\\"),
+            models.Skill.name.like(f"% {escaped} %", escape="\\"),
+        ])
+    if not conditions:
+        return []
+    return [skill_id for (skill_id,) in db.query(models.Skill.id).filter(or_(*conditions)).all()]
+
+def get_skills(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    query = db.query(models.Skill).order_by(models.Skill.id)
+    if after_id is not None:
+        # Keyset pagination: seek past the previous page on the primary key.
+        return query.filter(models.Skill.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
 def create_skill(db: Session, skill: schemas.SkillCreate):
     db_skill = models.Skill(name=skill.name, category=skill.category)
     db.add(db_skill)
     db.commit()
     db.refresh(db_skill)
+    skill_catalog.invalidate()
     return db_skill
 
 # ... (keep all your existing CRUD functions)
@@ -48,12 +102,15 @@ def update_user_skills(db: Session, user: models.User, skill_ids: List[int]):
     # Add the new skills
     for skill in skills_to_add:
         user.skills.append(skill)
+    user.skills_updated_at = models.utcnow()
         
     db.commit()
     db.refresh(user)
+    if user.role == 'seeker':
+        skill_index.set_user_skills(user.id, [skill.id for skill in user.skills])
+    principal_cache.invalidate(user.phone_number)
     return user
 
-
 # ... (keep all your existing CRUD functions)
 
 def create_job(db: Session, job: schemas.JobCreate, employer_id: int):
@@ -72,39 +129,292 @@ def create_job(db: Session, job: schemas.JobCreate, employer_id: int):
     db_job.required_skills.extend(required_skills)
     
     db.add(db_job)
+    # Queue the notification fan-out in the same transaction, so a committed job
+    # always gets its notifications even if the API process dies right after.
+    db.add(models.NotificationOutbox(kind='job_posted', job=db_job))
+    db.commit()
+    db.refresh(db_job)
+    # Cached chatbot answers may now be missing this job.
+    chat_cache.invalidate()
+    # Searchable by keyword right away; vectors follow with the next ingest_job.py run.
+    bm25_index.add_job(db_job)
+    return db_job
+
+def get_job(db: Session, job_id: int):
+    return db.query(models.Job).filter(models.Job.id == job_id).first()
+
+def update_job(db: Session, db_job: models.Job, job: schemas.JobCreate):
+    db_job.title = job.title
+    db_job.description = job.description
+    db_job.location_area = job.location_area
+    db_job.required_skills = db.query(models.Skill).filter(models.Skill.id.in_(job.required_skill_ids)).all()
+    # Set explicitly: a change to the skills alone doesn't touch the jobs row, so onupdate wouldn't fire.
+    db_job.updated_at = models.utcnow()
     db.commit()
     db.refresh(db_job)
+    # Cached chatbot answers may describe the old version of this job.
+    chat_cache.invalidate()
+    bm25_index.add_job(db_job)
     return db_job
 
+def delete_job(db: Session, db_job: models.Job):
+    # Its outbox rows reference the job; notifications for a deleted job are moot anyway.
+    db.execute(delete(models.NotificationOutbox).where(models.NotificationOutbox.job_id == db_job.id))
+    db.delete(db_job)
+    # Tells the other workers to drop it from their keyword indexes.
+    db.add(models.JobTombstone(job_id=db_job.id))
+    db.commit()
+    # Cached chatbot answers may still list this job.
+    chat_cache.invalidate()
+    bm25_index.remove_job(db_job.id)
+
 # ... (keep all your existing CRUD functions)
 
 def get_jobs(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Job).offset(skip).limit(limit).all()
 
+def get_job_listing(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None,
+    skill_ids: Optional[List[int]] = None,
+    location_area: Optional[str] = None,
+    q: Optional[str] = None,
+):
+    """
+    Loads a page of jobs for the public job board in two queries: the jobs joined
+    with their owners, then the required skills of the whole page.
+    Pass after_id (from a cursor) for keyset pagination; skip is the deprecated fallback.
+
+    Optional filters, each backed by an index:
+    - skill_ids: jobs requiring any of these skills (job_skills(skill_id, job_id))
+    - location_area: prefix of the normalized location (jobs(location_area_norm, id))
+    - q: full-text search over title and description (FULLTEXT(title, description))
+    """
+    query = (
+        db.query(models.Job)
+        .options(joinedload(models.Job.owner), selectinload(models.Job.required_skills))
+        .order_by(models.Job.id)
+    )
+    if skill_ids is not None:
+        job_skills = models.job_skills_association_table
+        query = query.filter(
+            models.Job.id.in_(select(job_skills.c.job_id).where(job_skills.c.skill_id.in_(skill_ids)))
+        )
+    if location_area:
+        query = query.filter(_location_prefix(location_area))
+    if q:
+        query = query.filter(match(models.Job.title, models.Job.description, against=q))
+    if after_id is not None:
+        return query.filter(models.Job.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
 # ... (at the end of the file)
 
-def get_matching_seekers(db: Session, job: models.Job):
+def search_jobs_ranked(
+    db: Session,
+    skill_ids: Optional[List[int]] = None,
+    location_area: Optional[str] = None,
+    limit: int = 10,
+    location_norms: Optional[List[str]] = None,
+):
     """
-    Finds all 'seeker' users who have at least one of the skills required by a job.
+    Top jobs for a skill and/or location search, as compact (id, title, location_area)
+    rows. Jobs matching more of the requested skills rank first, newest first within
+    a tie. Uses the job_skills(skill_id, job_id) and jobs(location_area_norm, id) indexes.
+    location_area matches the start of the area, as on GET /jobs/; location_norms
+    matches exact stored location_area_norm values instead.
     """
-    required_skill_ids = {skill.id for skill in job.required_skills}
-    
-    if not required_skill_ids:
+    query = db.query(models.Job.id, models.Job.title, models.Job.location_area)
+    if skill_ids is not None:
+        job_skills = models.job_skills_association_table
+        matched = func.count(job_skills.c.skill_id)
+        query = (
+            query.join(job_skills, job_skills.c.job_id == models.Job.id)
+            .filter(job_skills.c.skill_id.in_(skill_ids))
+            .group_by(models.Job.id, models.Job.title, models.Job.location_area)
+            .order_by(matched.desc(), models.Job.id.desc())
+        )
+    else:
+        query = query.order_by(models.Job.id.desc())
+    if location_area:
+        query = query.filter(_location_prefix(location_area))
+    if location_norms is not None:
+        query = query.filter(models.Job.location_area_norm.in_(location_norms))
+    return query.limit(limit).all()
+
+def count_matching_seekers_by_owner(db: Session, owner_id: int, job_ids: Optional[List[int]] = None) -> Dict[int, int]:
+    """
+    Counts matching seekers for every job owned by an employer in one grouped query,
+    optionally restricted to job_ids (e.g. one page of postings).
+    Returns {job_id: count}; jobs without any matching seeker are left out.
+    """
+    job_skills = models.job_skills_association_table
+    user_skills = models.user_skills_association_table
+    query = (
+        select(job_skills.c.job_id, func.count(func.distinct(user_skills.c.user_id)))
+        .join(models.Job, models.Job.id == job_skills.c.job_id)
+        .join(user_skills, user_skills.c.skill_id == job_skills.c.skill_id)
+        .join(models.User, models.User.id == user_skills.c.user_id)
+        .where(models.Job.owner_id == owner_id, models.User.role == 'seeker')
+        .group_by(job_skills.c.job_id)
+    )
+    if job_ids is not None:
+        query = query.where(job_skills.c.job_id.in_(job_ids))
+    return {job_id: count for job_id, count in db.execute(query).all()}
+
+# ... (at the end of the file)
+
+def get_jobs_by_ids(db: Session, job_ids: List[int]):
+    """Loads jobs with their owners and required skills in one query (e.g. search results)."""
+    if not job_ids:
         return []
+    return (
+        db.query(models.Job)
+        .options(joinedload(models.Job.owner), joinedload(models.Job.required_skills))
+        .filter(models.Job.id.in_(job_ids))
+        .all()
+    )
 
-    # Find users who are 'seekers' and whose skills overlap with the job's required skills.
-    matching_users = (
-        db.query(models.User)
-        .filter(models.User.role == 'seeker')
-        .join(models.User.skills)
-        .filter(models.Skill.id.in_(required_skill_ids))
-        .distinct()
+def get_jobs_by_owner(db: Session, owner_id: int, after_id: Optional[int] = None, limit: Optional[int] = None):
+    query = (
+        db.query(models.Job)
+        .options(selectinload(models.Job.required_skills))
+        .filter(models.Job.owner_id == owner_id)
+        .order_by(models.Job.id)
+    )
+    if after_id is not None:
+        query = query.filter(models.Job.id > after_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+# --- Notification Outbox CRUD ---
+class OutboxItem(NamedTuple):
+    id: int
+    kind: str
+    job_id: int
+    user_id: int
+    attempts: int
+
+def claim_outbox_batch(db: Session, batch_size: int, visibility_timeout: int, max_attempts: int) -> List[OutboxItem]:
+    """
+    Claims up to batch_size due outbox rows. SKIP LOCKED lets concurrent workers claim
+    disjoint batches; pushing available_at forward hides the rows from other workers
+    until they are completed or the timeout expires. A row that comes due again after
+    max_attempts claims (its workers kept dying or timing out) is marked failed instead.
+    """
+    now = models.utcnow()
+    rows = (
+        db.query(models.NotificationOutbox)
+        .filter(
+            models.NotificationOutbox.status == 'pending',
+            models.NotificationOutbox.available_at <= now,
+        )
+        .order_by(models.NotificationOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
         .all()
     )
-    
-    return matching_users
+    claimed = []
+    for row in rows:
+        if row.attempts >= max_attempts:
+            row.status = 'failed'
+            row.last_error = f"Not completed after {row.attempts} attempts (worker crashed or timed out)"
+            continue
+        row.attempts += 1
+        row.available_at = now + timedelta(seconds=visibility_timeout)
+        claimed.append(OutboxItem(row.id, row.kind, row.job_id, row.user_id, row.attempts))
+    db.commit()
+    return claimed
 
-# ... (at the end of the file)
+def fan_out_job_notifications(db: Session, job_id: int) -> int:
+    """
+    Inserts one 'job_notification' outbox row per seeker matching the job, in a single
+    INSERT ... SELECT so that no seeker rows travel through Python. Does not commit.
+    """
+    job_skills = models.job_skills_association_table
+    user_skills = models.user_skills_association_table
+    outbox = models.NotificationOutbox.__table__
+    now = models.utcnow()
+    matching_seekers = (
+        select(
+            literal('job_notification'),
+            literal(job_id),
+            user_skills.c.user_id,
+            literal('pending'),
+            literal(0),
+            literal(now),
+            literal(now),
+        )
+        .select_from(job_skills)
+        .join(user_skills, user_skills.c.skill_id == job_skills.c.skill_id)
+        .join(models.User, models.User.id == user_skills.c.user_id)
+        .where(job_skills.c.job_id == job_id, models.User.role == 'seeker')
+        .distinct()
+    )
+    result = db.execute(
+        insert(outbox).from_select(
+            ['kind', 'job_id', 'user_id', 'status', 'attempts', 'available_at', 'created_at'],
+            matching_seekers,
+        )
+    )
+    return result.rowcount
+
+def mark_outbox_sent(db: Session, outbox_ids: List[int]):
+    if not outbox_ids:
+        return
+    db.execute(
+        update(models.NotificationOutbox)
+        .where(models.NotificationOutbox.id.in_(outbox_ids))
+        .values(status='sent', last_error=None)
+    )
+    db.commit()
+
+def mark_outbox_failed(db: Session, item: OutboxItem, error: str, retry_delay: float, max_attempts: int):
+    """Schedules a retry after retry_delay seconds, or gives up after max_attempts."""
+    values = {'last_error': error[:500]}
+    if item.attempts >= max_attempts:
+        values['status'] = 'failed'
+    else:
+        values['available_at'] = models.utcnow() + timedelta(seconds=retry_delay)
+    db.execute(
+        update(models.NotificationOutbox)
+        .where(models.NotificationOutbox.id == item.id)
+        .values(**values)
+    )
+    db.commit()
 
-def get_jobs_by_owner(db: Session, owner_id: int):
-    return db.query(models.Job).filter(models.Job.owner_id == owner_id).all()
\ No newline at end of file
+def get_outbox_depth(db: Session) -> Dict[str, int]:
+    """Number of outbox rows per status."""
+    rows = (
+        db.query(models.NotificationOutbox.status, func.count(models.NotificationOutbox.id))
+        .group_by(models.NotificationOutbox.status)
+        .all()
+    )
+    return {status: count for status, count in rows}
+
+def prune_outbox(db: Session, older_than: timedelta, batch_size: int = 5000) -> int:
+    """
+    Deletes 'sent' rows completed more than older_than ago, batch_size rows per
+    transaction so that no long lock is held. Returns the number of rows deleted.
+    Failed rows are kept for inspection.
+    """
+    outbox = models.NotificationOutbox
+    cutoff = models.utcnow() - older_than
+    deleted = 0
+    while True:
+        # available_at of a sent row is when its last claim expired; the claim index covers it.
+        ids = [row_id for (row_id,) in (
+            db.query(outbox.id)
+            .filter(outbox.status == 'sent', outbox.available_at < cutoff)
+            .limit(batch_size)
+            .all()
+        )]
+        if not ids:
+            return deleted
+        db.execute(delete(outbox).where(outbox.id.in_(ids)))
+        db.commit()
+        deleted += len(ids)
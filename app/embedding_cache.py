@@ -0,0 +1,233 @@
+"""
+Persistent, content-addressed embedding cache.
+
+Vectors are keyed by sha256 of the whitespace-normalized text, one cache
+directory per model. Each directory holds two append-only files:
+
+    vectors.f32   row-major float32 vectors, memory-mapped for reads
+    index.bin     one 32-byte sha256 digest per row, in the same order
+
+A row is only visible once its digest is in index.bin, and vectors are written
+before digests, so a crash can at worst leave unreferenced bytes at the end of
+vectors.f32 (trimmed on the next open). Appends take an exclusive file lock where
+the platform supports it, so ingestion and API workers can share a directory.
+
+This module must stay importable without the database: ingest_job.py uses it.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends from several processes are not serialized
+    fcntl = None
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+DIGEST_SIZE = 32
+# Query vectors kept in memory per model and process; queries are never persisted.
+QUERY_CACHE_SIZE = int(os.getenv("EMBEDDING_QUERY_CACHE_SIZE", "2048"))
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def text_digest(text: str) -> bytes:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, directory: str = EMBEDDING_CACHE_DIR):
+        self.model_name = model_name
+        self.directory = os.path.join(directory, re.sub(r"[^\w.-]", "_", model_name))
+        os.makedirs(self.directory, exist_ok=True)
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._index_path = os.path.join(self.directory, "index.bin")
+        self._meta_path = os.path.join(self.directory, "meta.json")
+        self._lock_path = os.path.join(self.directory, ".lock")
+
+        self._lock = threading.Lock()
+        self._rows: Dict[bytes, int] = {}
+        self._index_bytes_read = 0
+        self._vectors: Optional[np.ndarray] = None
+        self.dim: Optional[int] = self._read_dim()
+        self.hits = 0
+        self.misses = 0
+
+    # --- Files ---
+    def _read_dim(self) -> Optional[int]:
+        try:
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        if meta["model_name"] != self.model_name:
+            raise ValueError(f"{self.directory} holds vectors for {meta['model_name']}, not {self.model_name}")
+        return meta["dim"]
+
+    def _write_dim(self, dim: int):
+        with open(self._meta_path, "w") as f:
+            json.dump({"model_name": self.model_name, "dim": dim}, f)
+        self.dim = dim
+
+    def _refresh(self):
+        """Picks up rows appended since the last read, by this or another process."""
+        try:
+            size = os.path.getsize(self._index_path)
+        except FileNotFoundError:
+            return
+        if size <= self._index_bytes_read:
+            return
+        if self.dim is None:
+            # Opened before the first append; meta.json is written before any row.
+            self.dim = self._read_dim()
+        with open(self._index_path, "rb") as f:
+            f.seek(self._index_bytes_read)
+            new_bytes = f.read(size - self._index_bytes_read)
+        complete = len(new_bytes) - len(new_bytes) % DIGEST_SIZE
+        first_row = self._index_bytes_read // DIGEST_SIZE
+        for offset in range(0, complete, DIGEST_SIZE):
+            self._rows.setdefault(new_bytes[offset:offset + DIGEST_SIZE], first_row + offset // DIGEST_SIZE)
+        self._index_bytes_read += complete
+        self._vectors = None  # re-map lazily to cover the new rows
+
+    def _matrix(self) -> np.ndarray:
+        if self._vectors is None:
+            rows = self._index_bytes_read // DIGEST_SIZE
+            if rows == 0 or self.dim is None:
+                self._vectors = np.empty((0, self.dim or 0), dtype=np.float32)
+            else:
+                self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._vectors
+
+    # --- Lookup / Store ---
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for the texts, None where missing. Counts hits and misses."""
+        digests = [text_digest(text) for text in texts]
+        with self._lock:
+            self._refresh()
+            matrix = self._matrix()
+            results = []
+            for digest in digests:
+                row = self._rows.get(digest)
+                results.append(np.array(matrix[row]) if row is not None else None)
+        found = sum(result is not None for result in results)
+        self.hits += found
+        self.misses += len(results) - found
+        return results
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        if not texts:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        digests = [text_digest(text) for text in texts]
+        with self._lock, open(self._lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if self.dim is None:
+                self._write_dim(array.shape[1])
+            elif array.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got {array.shape[1]}")
+            self._refresh()
+
+            new_rows = []
+            seen = set()
+            for i, digest in enumerate(digests):
+                if digest not in self._rows and digest not in seen:
+                    seen.add(digest)
+                    new_rows.append(i)
+            if not new_rows:
+                return
+
+            rows_on_disk = self._index_bytes_read // DIGEST_SIZE
+            with open(self._vectors_path, "r+b" if os.path.exists(self._vectors_path) else "wb") as f:
+                # Drop any bytes left behind by a crashed append before adding ours.
+                f.truncate(rows_on_disk * self.dim * 4)
+                f.seek(0, os.SEEK_END)
+                f.write(array[new_rows].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._index_path, "ab") as f:
+                f.write(b"".join(digests[i] for i in new_rows))
+            self._refresh()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._rows), "hits": self.hits, "misses": self.misses}
+
+
+class CachedEmbeddings:
+    """
+    Wraps a LangChain embeddings object (e.g. HuggingFaceEmbeddings) so that texts
+    already in the cache are not embedded again. Usable anywhere LangChain expects
+    an embedding function, including Chroma.
+
+    Documents (job postings, from ingestion) go to the persistent EmbeddingCache.
+    Queries (chat questions, search terms) are mostly one-off, so they only go to a
+    bounded in-memory LRU: persisting them would fsync on every request and grow
+    the cache files without bound.
+    """
+
+    def __init__(self, embeddings, cache: EmbeddingCache, query_cache_size: int = QUERY_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.query_cache_size = query_cache_size
+        self._queries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._queries_lock = threading.Lock()
+
+    def _cached_query(self, text: str) -> Optional[np.ndarray]:
+        with self._queries_lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+            return vector
+
+    def _remember_query(self, text: str, vector: np.ndarray):
+        with self._queries_lock:
+            self._queries[text] = vector
+            self._queries.move_to_end(text)
+            while len(self._queries) > self.query_cache_size:
+                self._queries.popitem(last=False)
+
+    def embed(self, documents: Sequence[str], queries: Sequence[str] = ()) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Vectors for documents and for queries, embedding everything that is in
+        neither cache with one model call (the embedding server relies on this to
+        keep its micro-batches whole).
+        """
+        documents = [normalize_text(text) for text in documents]
+        queries = [normalize_text(text) for text in queries]
+        document_vectors = self.cache.get_many(documents) if documents else []
+        query_vectors = [self._cached_query(text) for text in queries]
+        # Identical texts within one call (e.g. duplicate job postings) are embedded once.
+        missing: Dict[str, List[Tuple[List, int]]] = {}
+        for targets, texts in ((document_vectors, documents), (query_vectors, queries)):
+            for i, vector in enumerate(targets):
+                if vector is None:
+                    missing.setdefault(texts[i], []).append((targets, i))
+        if missing:
+            unique_texts = list(missing)
+            # HuggingFaceEmbeddings embeds queries and documents alike, so one call serves both.
+            fresh = np.asarray(self.embeddings.embed_documents(unique_texts), dtype=np.float32)
+            persist = [j for j, text in enumerate(unique_texts)
+                       if any(targets is document_vectors for targets, _ in missing[text])]
+            if persist:
+                self.cache.put_many([unique_texts[j] for j in persist], fresh[persist])
+            for text, vector in zip(unique_texts, fresh):
+                for targets, i in missing[text]:
+                    targets[i] = vector
+                    if targets is query_vectors:
+                        self._remember_query(text, vector)
+        return document_vectors, query_vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [vector.tolist() for vector in self.embed(texts)[0]]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed((), [text])[1][0].tolist()
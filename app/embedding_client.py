@@ -0,0 +1,122 @@
+"""
+Thin client for the shared embedding server (app/embedding_server.py).
+
+Wire protocol over a Unix socket, one request at a time per connection:
+
+    request:   <u32 length> JSON {"model": "...", "inference": "fp32", "texts": ["...", ...], "query": false}
+    response:  <i32 rows> <i32 dim> rows * dim little-endian float32
+    error:     <i32 -1> <i32 length> UTF-8 message
+
+"inference" is the mode to run the model in (app/embedding_inference.py).
+"query": true marks the texts as queries, which the server caches in memory
+only (see CachedEmbeddings). RemoteEmbeddings has the LangChain embeddings interface, so it drops in
+wherever get_embedder() is used. Each thread keeps its own connection.
+"""
+import json
+import socket
+import struct
+import threading
+from typing import Callable, List, Optional
+
+import numpy as np
+
+REQUEST_HEADER = struct.Struct("<I")
+RESPONSE_HEADER = struct.Struct("<ii")
+CONNECT_TIMEOUT_SECONDS = 1.0
+REQUEST_TIMEOUT_SECONDS = 60.0
+
+
+class EmbeddingServerError(Exception):
+    pass
+
+
+class EmbeddingServerUnavailable(EmbeddingServerError):
+    pass
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks, remaining = [], size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Embedding server closed the connection")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def encode_request(model_name: str, inference: str, texts: List[str], query: bool = False) -> bytes:
+    payload = json.dumps({"model": model_name, "inference": inference, "texts": texts, "query": query}).encode("utf-8")
+    return REQUEST_HEADER.pack(len(payload)) + payload
+
+
+class RemoteEmbeddings:
+    def __init__(self, socket_path: str, model_name: str, inference: str = "fp32",
+                 fallback: Optional[Callable[[], object]] = None):
+        """fallback returns an in-process embedder, used while the server is unreachable."""
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.inference = inference
+        self.fallback = fallback
+        self._local = threading.local()
+        self._warned = False
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(CONNECT_TIMEOUT_SECONDS)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            sock.settimeout(REQUEST_TIMEOUT_SECONDS)
+            self._local.sock = sock
+        return sock
+
+    def _disconnect(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _request(self, texts: List[str], query: bool) -> np.ndarray:
+        request = encode_request(self.model_name, self.inference, texts, query)
+        # A pooled connection may have been dropped by a server restart: retry once on a new one.
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.sendall(request)
+                rows, dim = RESPONSE_HEADER.unpack(recv_exactly(sock, RESPONSE_HEADER.size))
+                if rows < 0:
+                    raise EmbeddingServerError(recv_exactly(sock, dim).decode("utf-8"))
+                body = recv_exactly(sock, rows * dim * 4)
+                return np.frombuffer(body, dtype="<f4").reshape(rows, dim)
+            except OSError as e:  # refused, reset, timed out, no such socket, ...
+                self._disconnect()
+                if attempt:
+                    raise EmbeddingServerUnavailable(f"Embedding server at {self.socket_path} is unavailable: {e}") from e
+
+    def embed_array(self, texts: List[str], query: bool = False) -> np.ndarray:
+        """Embeddings as a (len(texts), dim) float32 array, straight from the wire."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        try:
+            return self._request(texts, query)
+        except EmbeddingServerUnavailable:
+            if self.fallback is None:
+                raise
+            if not self._warned:
+                print(f"Embedding server at {self.socket_path} is unavailable, embedding in-process")
+                self._warned = True
+            embedder = self.fallback()
+            if query:
+                return np.asarray([embedder.embed_query(text) for text in texts], dtype=np.float32)
+            return np.asarray(embedder.embed_documents(texts), dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text], query=True)[0].tolist()
@@ -0,0 +1,99 @@
+"""
+CPU inference for the sentence embedding models.
+
+BucketedEmbeddings runs a sentence-transformers model directly instead of
+through HuggingFaceEmbeddings, with two changes for CPU throughput:
+
+- quantize=True converts the model's Linear layers to torch dynamic int8
+  (int8 weights, activations quantized on the fly), which is where nearly all
+  of a MiniLM forward pass goes.
+- Texts are tokenized once up front, sorted by token count and encoded in
+  buckets of bucket_size neighbours (length_buckets()), so each forward pass
+  holds texts of similar length and short job postings are not padded to the
+  length of the longest one in the call. (SentenceTransformer.encode sorts by
+  characters, which only roughly tracks tokens.) Results come back in input
+  order.
+
+int8 vectors differ slightly from fp32 ones. cosine_parity() measures by how
+much; benchmarks/bench_embedding_inference.py reports it against
+PARITY_MIN_COSINE together with throughput, and is the check to run before
+setting EMBEDDING_INFERENCE=int8 (app/embeddings.py) in production.
+"""
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+import psutil
+
+# --- Inference Settings ---
+INFERENCE_MODES = ("fp32", "int8")
+# Texts per batch. Bigger batches amortize more per forward pass but pad more.
+BUCKET_SIZE = int(os.getenv("EMBEDDING_BUCKET_SIZE", "32"))
+# Lowest per-text cosine between int8 and fp32 vectors accepted for production.
+PARITY_MIN_COSINE = 0.99
+
+
+def physical_cores() -> int:
+    # Hyper-threads share the vector units the matmuls saturate, so count cores, not threads.
+    return psutil.cpu_count(logical=False) or os.cpu_count() or 1
+
+
+def quantize_model(model):
+    import torch
+    engines = torch.backends.quantized.supported_engines
+    if "x86" not in engines and "fbgemm" not in engines and "qnnpack" in engines:
+        torch.backends.quantized.engine = "qnnpack"  # ARM
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def length_buckets(lengths: Sequence[int], bucket_size: int) -> List[np.ndarray]:
+    """Positions of the texts, shortest first, split into buckets of up to bucket_size."""
+    order = np.argsort(np.asarray(lengths, dtype=np.int64), kind="stable")
+    return [order[start:start + bucket_size] for start in range(0, len(order), bucket_size)]
+
+
+class BucketedEmbeddings:
+    """LangChain-style embeddings for one sentence-transformers model on CPU."""
+
+    def __init__(self, model_name: str, quantize: bool = False, bucket_size: int = BUCKET_SIZE,
+                 threads: Optional[int] = None):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            torch.set_num_threads(threads)
+        self.model_name = model_name
+        self.quantize = quantize
+        self.bucket_size = bucket_size
+        model = SentenceTransformer(model_name, device="cpu")
+        model.eval()
+        self.model = quantize_model(model) if quantize else model
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        """Tokens per text as the model sees them (with special tokens, truncated)."""
+        encoded = self.model.tokenizer(
+            texts, add_special_tokens=True, truncation=True, max_length=self.model.max_seq_length,
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        for bucket in length_buckets(self.token_lengths(texts) if texts else [], self.bucket_size):
+            # One forward pass per bucket, padded only to its longest text.
+            vectors[bucket] = self.model.encode(
+                [texts[i] for i in bucket], batch_size=len(bucket), convert_to_numpy=True, show_progress_bar=False,
+            )
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+
+def cosine_parity(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """Per-row cosine similarity between two embeddings of the same texts."""
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    return np.einsum("ij,ij->i", reference, candidate) / np.maximum(norms, 1e-12)
@@ -0,0 +1,192 @@
+"""
+Shared embedding server.
+
+Run one per machine, next to the API:
+
+    python -m app.embedding_server --socket /tmp/skillsetu-embed.sock
+
+and set EMBEDDING_SERVER_SOCKET to the same path for the API workers and
+ingest_job.py. The model is loaded once here instead of once per process. Only
+the models given with --model (default EMBEDDING_MODEL_NAME) are served; a
+request for another one is refused rather than loading it. Each model is loaded
+in EMBEDDING_INFERENCE mode at startup, and in the other mode on the first
+request for it (an index version built in that mode).
+Requests arriving within EMBED_SERVER_MAX_WAIT_MS of each other are coalesced
+into one micro-batch (up to EMBED_SERVER_MAX_BATCH texts), which the model runs
+far more efficiently than one text at a time; requests that arrive while a
+batch is running form the next one. Documents go through the persistent
+embedding cache first, queries through its in-memory LRU. See app/embedding_client.py for the wire protocol.
+"""
+import argparse
+import asyncio
+import json
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .embedding_client import REQUEST_HEADER, RESPONSE_HEADER
+from .embedding_inference import INFERENCE_MODES
+from .embeddings import EMBEDDING_INFERENCE, EMBEDDING_MODEL_NAME, EMBEDDING_SERVER_SOCKET, get_local_embedder
+
+# --- Server Settings ---
+MAX_BATCH_TEXTS = int(os.getenv("EMBED_SERVER_MAX_BATCH", "256"))
+MAX_WAIT_MS = float(os.getenv("EMBED_SERVER_MAX_WAIT_MS", "2"))
+DEFAULT_SOCKET = "/tmp/skillsetu-embed.sock"
+# Requests larger than this are refused instead of buffered.
+MAX_REQUEST_BYTES = 16 * 2**20
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests for one model and mode into batches; one batch runs at a time."""
+
+    def __init__(self, model_name: str, inference: str):
+        self.model_name = model_name
+        self.inference = inference
+        self.embedder = None
+        self._queue: "asyncio.Queue[Tuple[List[str], bool, asyncio.Future]]" = asyncio.Queue()
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.embedder = await loop.run_in_executor(None, get_local_embedder, self.model_name, self.inference)
+        asyncio.create_task(self._run())
+        print(f"Embedding server: loaded {self.model_name} ({self.inference})")
+
+    async def embed(self, texts: List[str], query: bool = False) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype="<f4")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, query, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[List[str], bool, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        count = len(batch[0][0])
+        deadline = loop.time() + MAX_WAIT_MS / 1000
+        while count < MAX_BATCH_TEXTS:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+            batch.append(item)
+            count += len(item[0])
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            documents = [text for texts, query, _ in batch if not query for text in texts]
+            queries = [text for texts, query, _ in batch if query for text in texts]
+            try:
+                document_vectors, query_vectors = await loop.run_in_executor(
+                    None, self.embedder.embed, documents, queries
+                )
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            starts = {False: 0, True: 0}
+            vectors = {False: document_vectors, True: query_vectors}
+            for texts, query, future in batch:
+                start = starts[query]
+                if not future.done():  # the client may have gone away
+                    future.set_result(np.asarray(vectors[query][start:start + len(texts)], dtype="<f4"))
+                starts[query] = start + len(texts)
+
+
+def parse_request(body: bytes) -> Tuple[str, str, List[str], bool]:
+    """(model, inference mode, texts, query) of a request; ValueError if it is malformed."""
+    request = json.loads(body)
+    model_name, texts = request.get("model"), request.get("texts")
+    inference = request.get("inference", EMBEDDING_INFERENCE)
+    if not isinstance(model_name, str):
+        raise ValueError("'model' must be a string")
+    if inference not in INFERENCE_MODES:
+        raise ValueError(f"'inference' must be one of {INFERENCE_MODES}")
+    # Checked here: a bad text reaching the batcher would fail everyone's batch, not just this request.
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        raise ValueError("'texts' must be a list of strings")
+    return model_name, inference, texts, bool(request.get("query"))
+
+
+class EmbeddingServer:
+    def __init__(self, socket_path: str, models: List[str]):
+        """models: the only models served, all loaded at startup."""
+        self.socket_path = socket_path
+        self.models = models
+        self._batchers: Dict[Tuple[str, str], MicroBatcher] = {}
+        self._starting = asyncio.Lock()
+
+    async def batcher(self, model_name: str, inference: str = EMBEDDING_INFERENCE) -> MicroBatcher:
+        if model_name not in self.models:
+            raise ValueError(f"Model {model_name!r} is not served here (serving {', '.join(self.models)})")
+        key = (model_name, inference)
+        batcher = self._batchers.get(key)
+        if batcher is None:
+            async with self._starting:
+                batcher = self._batchers.get(key)
+                if batcher is None:
+                    batcher = MicroBatcher(model_name, inference)
+                    await batcher.start()
+                    self._batchers[key] = batcher
+        return batcher
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    (length,) = REQUEST_HEADER.unpack(await reader.readexactly(REQUEST_HEADER.size))
+                except asyncio.IncompleteReadError:
+                    break  # client disconnected
+                if length > MAX_REQUEST_BYTES:
+                    message = b"Request too large"
+                    writer.write(RESPONSE_HEADER.pack(-1, len(message)) + message)
+                    break
+                try:
+                    model_name, inference, texts, query = parse_request(await reader.readexactly(length))
+                    batcher = await self.batcher(model_name, inference)
+                    matrix = await batcher.embed(texts, query)
+                    writer.write(RESPONSE_HEADER.pack(*matrix.shape) + matrix.tobytes())
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as e:
+                    message = str(e).encode("utf-8")
+                    writer.write(RESPONSE_HEADER.pack(-1, len(message)) + message)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self):
+        for model_name in self.models:
+            await self.batcher(model_name)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)  # left behind by a previous run
+        server = await asyncio.start_unix_server(self.handle, path=self.socket_path)
+        print(f"Embedding server listening on {self.socket_path} "
+              f"(batches up to {MAX_BATCH_TEXTS} texts, {MAX_WAIT_MS:g} ms window)")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve sentence embeddings to SkillSetu processes over a Unix socket.")
+    parser.add_argument("--socket", default=EMBEDDING_SERVER_SOCKET or DEFAULT_SOCKET)
+    parser.add_argument("--model", action="append", help="model to serve, loaded at startup (repeatable)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(EmbeddingServer(args.socket, args.model or [EMBEDDING_MODEL_NAME]).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
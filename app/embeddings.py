@@ -0,0 +1,139 @@
+"""
+The sentence embedding models shared by ingestion, the chat cache and search.
+
+When EMBEDDING_SERVER_SOCKET is set, get_embedder() returns a client for the
+shared embedding server (app/embedding_server.py), which holds the only copy of
+the model and micro-batches requests from every process. Otherwise, or while
+the server is unreachable, the model is loaded lazily in this process.
+
+Either way documents go through the persistent content-hash cache, so a job
+posting embedded before (by any process sharing EMBEDDING_CACHE_DIR) is never
+embedded again; queries are only cached in memory. Importable without the
+database.
+
+EMBEDDING_INFERENCE=int8 runs the model int8-quantized in length-sorted batches
+(app/embedding_inference.py). Its vectors are cached apart from fp32 ones.
+Documents and questions must be embedded alike, so the mode is part of an index
+version: ingest_job.py --mode full records EMBEDDING_INFERENCE in the version's
+manifest, and ingestion and search then embed with the version's mode, whatever
+EMBEDDING_INFERENCE says in their own process.
+"""
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple, Union
+
+from .embedding_cache import CachedEmbeddings, EmbeddingCache
+from .embedding_client import RemoteEmbeddings
+from .embedding_inference import INFERENCE_MODES
+
+# Same model for job documents and questions, so they share one vector space.
+# Changing it takes a full re-ingest (ingest_job.py --mode full), which builds a
+# new index version; search keeps using the model of the version it serves.
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+# Unix socket of the shared embedding server; unset loads the model in every process.
+EMBEDDING_SERVER_SOCKET = os.getenv("EMBEDDING_SERVER_SOCKET")
+# "fp32" (HuggingFaceEmbeddings, the default) or "int8", for new index versions.
+EMBEDDING_INFERENCE = os.getenv("EMBEDDING_INFERENCE", "fp32")
+if EMBEDDING_INFERENCE not in INFERENCE_MODES:
+    raise ValueError(f"EMBEDDING_INFERENCE must be one of {INFERENCE_MODES}, not {EMBEDDING_INFERENCE!r}")
+# Torch threads for in-process inference; 0 leaves torch's default.
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+
+_lock = threading.Lock()
+_embedders: Dict[Tuple[str, str], CachedEmbeddings] = {}
+_remote_embedders: Dict[Tuple[str, str], RemoteEmbeddings] = {}
+
+
+def get_embedder(
+    model_name: str = EMBEDDING_MODEL_NAME, inference: str = EMBEDDING_INFERENCE
+) -> Union[RemoteEmbeddings, CachedEmbeddings]:
+    if not EMBEDDING_SERVER_SOCKET:
+        return get_local_embedder(model_name, inference)
+    key = (model_name, inference)
+    embedder = _remote_embedders.get(key)
+    if embedder is None:
+        with _lock:
+            embedder = _remote_embedders.setdefault(key, RemoteEmbeddings(
+                EMBEDDING_SERVER_SOCKET, model_name, inference,
+                fallback=lambda: get_local_embedder(model_name, inference),
+            ))
+    return embedder
+
+
+def get_local_embedder(model_name: str = EMBEDDING_MODEL_NAME, inference: str = EMBEDDING_INFERENCE) -> CachedEmbeddings:
+    """The model loaded in this process (the embedding server uses this itself)."""
+    if inference not in INFERENCE_MODES:
+        raise ValueError(f"Unknown inference mode {inference!r}, expected one of {INFERENCE_MODES}")
+    key = (model_name, inference)
+    embedder = _embedders.get(key)
+    if embedder is None:
+        with _lock:
+            embedder = _embedders.get(key)
+            if embedder is None:
+                if inference == "int8":
+                    from .embedding_inference import BucketedEmbeddings
+                    embedder = CachedEmbeddings(
+                        BucketedEmbeddings(model_name, quantize=True, threads=EMBEDDING_THREADS or None),
+                        EmbeddingCache(f"{model_name}@int8"),
+                    )
+                else:
+                    from langchain_huggingface import HuggingFaceEmbeddings
+                    if EMBEDDING_THREADS:
+                        import torch
+                        torch.set_num_threads(EMBEDDING_THREADS)
+                    embedder = CachedEmbeddings(
+                        HuggingFaceEmbeddings(model_name=model_name),
+                        EmbeddingCache(model_name),
+                    )
+                _embedders[key] = embedder
+    return embedder
+
+
+def _model_file(model_name: str, filename: str) -> Optional[dict]:
+    """A JSON file of the model, from its directory or the Hugging Face Hub (cached there like the model)."""
+    if os.path.isdir(model_name):
+        path = os.path.join(model_name, filename)
+        if not os.path.exists(path):
+            return None
+    else:
+        from huggingface_hub import hf_hub_download
+        from huggingface_hub.errors import EntryNotFoundError
+        # Bare names are sentence-transformers models, as SentenceTransformer resolves them.
+        repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        try:
+            path = hf_hub_download(repo_id, filename)
+        except EntryNotFoundError:
+            return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _pooling_dimension(config: dict) -> int:
+    # sentence-transformers 5 writes word_embedding_dimension and one flag per mode,
+    # later versions embedding_dimension and the modes by name. Modes are concatenated.
+    dim = config.get("word_embedding_dimension") or config["embedding_dimension"]
+    modes = config.get("pooling_mode")
+    if modes is None:
+        count = sum(bool(value) for key, value in config.items() if key.startswith("pooling_mode_"))
+    else:
+        count = len(modes) if isinstance(modes, list) else 1
+    return dim * max(count, 1)
+
+
+def embedding_dimension(model_name: str = EMBEDDING_MODEL_NAME) -> int:
+    """
+    The model's output dimension, from its configuration files alone: the last
+    Pooling or Dense module of a sentence-transformers model, else the hidden
+    size of a plain transformer. No weights are downloaded or loaded.
+    """
+    dim = None
+    for module in _model_file(model_name, "modules.json") or ():
+        kind = module["type"].rsplit(".", 1)[-1]
+        if kind in ("Pooling", "Dense"):
+            config = _model_file(model_name, f"{module['path']}/config.json")
+            dim = _pooling_dimension(config) if kind == "Pooling" else config["out_features"]
+    if dim is not None:
+        return dim
+    from transformers import AutoConfig
+    return AutoConfig.from_pretrained(model_name).hidden_size
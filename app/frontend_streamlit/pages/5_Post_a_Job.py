@@ -8,12 +8,20 @@ API_URL = "http://127.0.0.1:8000"
 
 # --- Helper Function to fetch all skills (can copy from Profile page) ---
 def fetch_all_skills():
+    # Revalidate the cached catalog with its ETag; the server answers 304 when unchanged.
+    cached = st.session_state.get("skill_catalog")
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
     try:
-        response = requests.get(f"{API_URL}/skills/")
+        response = requests.get(f"{API_URL}/skills/catalog/", headers=headers)
+        if response.status_code == 304 and cached:
+            return cached["skills"]
         if response.status_code == 200:
-            return response.json()
+            skills = response.json()
+            st.session_state["skill_catalog"] = {"etag": response.headers.get("ETag"), "skills": skills}
+            return skills
     except:
-        return []
+        pass
+    return cached["skills"] if cached else []
 
 st.title("💼 Post a New Job")
 
@@ -0,0 +1,72 @@
+"""
+Password hashing off the request threads.
+
+bcrypt takes ~100-300 ms of CPU per call. Running it in Starlette's shared
+threadpool lets a login burst starve every other sync endpoint, so hashing and
+verification run in a dedicated process pool sized to the cores, behind their
+own admission limit. When that limit is reached only signup/login are refused.
+
+This module must stay importable without the database: the pool's worker
+processes import it to find the functions they run.
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from .admission import AdmissionLimiter
+
+# --- Hashing Settings ---
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+# How many hashing calls may wait for a free worker before new ones are refused.
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", "64"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# --- Functions run inside the worker processes ---
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+# --- Pool and admission control (API process side) ---
+_executor: Optional[ProcessPoolExecutor] = None
+# Raises admission.QueueFull once HASH_MAX_QUEUE calls are already waiting.
+hash_limiter = AdmissionLimiter(max_in_flight=HASH_WORKERS, max_waiting=HASH_MAX_QUEUE)
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # 'spawn' keeps the workers free of the API's threads, sockets and DB pool.
+        _executor = ProcessPoolExecutor(
+            max_workers=HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+async def _run(func, *args):
+    async with hash_limiter.slot():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), func, *args)
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run(_verify, plain_password, hashed_password)
+
+def stats() -> dict:
+    """Queue depth metrics for the hashing pool."""
+    return hash_limiter.stats()
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,168 @@
+"""
+Versioned job index directories, for switching embedding models without downtime.
+
+Each version is built with one embedding model and lives in its own directory,
+named by creation time, model and dimension:
+
+    job_index/
+        ACTIVE                                   name of the version being served
+        versions/<time>-<model>-<dim>d/
+            manifest.json                        {"model_name": ..., "dim": ..., "inference": ...}
+            ACTIVATED                            present once the version has been served
+            chroma/                              vector store + ingestion watermark
+            CURRENT, segments/                   published segments (app/vector_index.py)
+
+ingest_job.py --mode full builds a new version next to the active one while the
+API keeps serving the old one, then activate() flips ACTIVE atomically. API
+workers notice the flip on their next check and switch model and index without
+restarting. Older versions are garbage-collected, keeping the previous one for
+rollback, and so are builds that never became active (a full run that failed
+or was killed). An ingestion run holds locked(version) while it writes a
+version, so two runs (say a scheduled incremental one and a manual one) never
+write the same vector store at once, and garbage collection skips it.
+
+No database access: ingest_job.py uses this module directly.
+"""
+import json
+import os
+import re
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: runs are not kept apart
+    fcntl = None
+
+JOB_INDEX_DIR = os.getenv("JOB_INDEX_DIR", "job_index")
+# Versions kept besides the active one (the previous, for rolling back).
+KEEP_OLD_VERSIONS = 1
+# A build locks its version right after creating it; until then, leave it alone.
+ABANDONED_AFTER_SECONDS = 600
+ACTIVATED_MARKER = "ACTIVATED"
+
+
+class VersionLocked(Exception):
+    pass
+
+
+class IndexVersion(NamedTuple):
+    name: str
+    path: str
+    model_name: str
+    dim: int
+    # How the model runs (app/embedding_inference.py); documents and queries must match.
+    inference: str = "fp32"
+
+    @property
+    def chroma_path(self) -> str:
+        return os.path.join(self.path, "chroma")
+
+
+def _versions_dir(root: str) -> str:
+    return os.path.join(root, "versions")
+
+
+def list_versions(root: str = JOB_INDEX_DIR) -> List[str]:
+    """Version names, oldest first."""
+    try:
+        return sorted(name for name in os.listdir(_versions_dir(root)) if not name.startswith("."))
+    except FileNotFoundError:
+        return []
+
+
+def load_version(name: str, root: str = JOB_INDEX_DIR) -> IndexVersion:
+    path = os.path.join(_versions_dir(root), name)
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    # Versions built before the mode was recorded were all fp32.
+    return IndexVersion(name, path, manifest["model_name"], manifest["dim"], manifest.get("inference", "fp32"))
+
+
+def active_version(root: str = JOB_INDEX_DIR) -> Optional[IndexVersion]:
+    try:
+        with open(os.path.join(root, "ACTIVE")) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return load_version(name, root) if name else None
+
+
+def create_version(model_name: str, dim: int, inference: str = "fp32", root: str = JOB_INDEX_DIR) -> IndexVersion:
+    slug = re.sub(r"[^\w.-]", "_", model_name)
+    name = f"{time.time_ns()}-{slug}-{dim}d"
+    path = os.path.join(_versions_dir(root), name)
+    os.makedirs(path)
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump({"model_name": model_name, "dim": dim, "inference": inference}, f)
+    return IndexVersion(name, path, model_name, dim, inference)
+
+
+@contextmanager
+def locked(version: IndexVersion) -> Iterator[None]:
+    """Holds the version's ingestion lock; raises VersionLocked if another process has it."""
+    with open(os.path.join(version.path, ".ingest.lock"), "a") as lock_file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise VersionLocked(f"Another ingestion run is writing index version {version.name}") from None
+        yield  # released when the file is closed
+
+
+def activate(version: IndexVersion, root: str = JOB_INDEX_DIR):
+    """Makes version the one served by the API, then removes versions older than the previous one."""
+    open(os.path.join(version.path, ACTIVATED_MARKER), "a").close()
+    tmp_path = os.path.join(root, f"ACTIVE.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(version.name)
+    os.replace(tmp_path, os.path.join(root, "ACTIVE"))
+    collect_garbage(root)
+
+
+def _remove_unless_locked(path: str):
+    """Deletes a version directory, unless an ingestion run holds its lock."""
+    try:
+        lock_file = open(os.path.join(path, ".ingest.lock"), "a")
+    except FileNotFoundError:
+        return  # already removed
+    with lock_file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+        # Workers still mapping its segments keep reading them until they switch.
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _created_at(name: str) -> float:
+    try:
+        return int(name.split("-", 1)[0]) / 1e9
+    except ValueError:
+        return 0.0
+
+
+def collect_garbage(root: str = JOB_INDEX_DIR):
+    """
+    Deletes versions that were active before the current one, except the newest
+    KEEP_OLD_VERSIONS of them, and versions that never became active and are no
+    longer being built. Versions an ingestion run has locked are left alone.
+    """
+    active = active_version(root)
+    if active is None:
+        return
+    served, abandoned = [], []
+    for name in list_versions(root):
+        path = os.path.join(_versions_dir(root), name)
+        if name == active.name:
+            continue
+        if os.path.exists(os.path.join(path, ACTIVATED_MARKER)):
+            if name < active.name:
+                served.append(path)
+        elif time.time() - _created_at(name) > ABANDONED_AFTER_SECONDS:
+            abandoned.append(path)
+    for path in served[:max(0, len(served) - KEEP_OLD_VERSIONS)] + abandoned:
+        _remove_unless_locked(path)
@@ -0,0 +1,227 @@
+"""
+Rule-based fast path for structured job questions.
+
+Questions shaped like "<skill> jobs in <area>" are answered straight from the
+job tables without calling the LLM. Skill names and location areas are found
+with one Aho-Corasick pass over the question; anything that leaves unknown
+words behind is treated as open-ended and goes to the agent instead.
+"""
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import crud, models
+from .database import SessionLocal
+
+# How often a worker checks whether skills or jobs changed through another process.
+RECHECK_SECONDS = 30
+ROUTED_TOP_K = 10
+
+_WORD = re.compile(r"\w+")
+
+# Words that may surround the skill and location in a structured question.
+_JOB_WORDS = {"job", "jobs", "work", "vacancy", "vacancies", "opening", "openings", "naukri", "kaam"}
+_FILLER_WORDS = {
+    "a", "an", "any", "are", "around", "at", "available", "can", "do", "for", "find", "get",
+    "give", "have", "hi", "hello", "i", "in", "is", "list", "looking", "me", "near", "nearby",
+    "new", "of", "open", "please", "show", "some", "the", "there", "what", "which", "with",
+    "you", "your", "want", "need", "area", "all", "latest",
+}
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+class Match(NamedTuple):
+    start: int
+    end: int
+    kind: str      # 'skill' or 'location'
+    value: object  # skill id or normalized location area
+
+
+class AhoCorasick:
+    """Multi-pattern matcher over characters; patterns are plain normalized strings."""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[int, str, object]]] = [[]]
+
+    def add(self, pattern: str, kind: str, value):
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = next_node
+        self._outputs[node].append((len(pattern), kind, value))
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+    def find_all(self, text: str) -> List[Match]:
+        matches = []
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, kind, value in self._outputs[node]:
+                matches.append(Match(index - length + 1, index + 1, kind, value))
+        return matches
+
+
+class Vocabulary(NamedTuple):
+    automaton: AhoCorasick
+    # Normalized location pattern -> the stored location_area_norm values it stands for,
+    # e.g. "adajan gam" -> {"adajan-gam", "adajan  gam"}. Jobs are filtered on these.
+    locations: Dict[str, FrozenSet[str]]
+
+
+class IntentRouter:
+    """Answers '<skill> jobs in <area>' questions without the LLM, or returns None."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vocabulary: Optional[Vocabulary] = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._vocabulary = None
+
+    @staticmethod
+    def _current_version(db: Session):
+        skills = db.query(func.count(models.Skill.id), func.max(models.Skill.id)).one()
+        jobs = db.query(func.count(models.Job.id), func.max(models.Job.id)).one()
+        return tuple(skills) + tuple(jobs)
+
+    def _get_vocabulary(self, db: Session) -> Vocabulary:
+        vocabulary = self._vocabulary
+        if vocabulary is not None and time.monotonic() - self._checked_at < RECHECK_SECONDS:
+            return vocabulary
+        with self._lock:
+            version = self._current_version(db)
+            self._checked_at = time.monotonic()
+            if self._vocabulary is None or self._version != version:
+                self._vocabulary = self._build(db)
+                self._version = version
+            return self._vocabulary
+
+    @staticmethod
+    def _build(db: Session) -> Vocabulary:
+        automaton = AhoCorasick()
+        for skill_id, name in db.query(models.Skill.id, models.Skill.name).all():
+            pattern = _normalize(name)
+            if pattern:
+                automaton.add(pattern, "skill", skill_id)
+                automaton.add(pattern + "s", "skill", skill_id)  # "plumbers", "electricians"
+        locations: Dict[str, set] = {}
+        for (location_norm,) in db.query(models.Job.location_area_norm).distinct().all():
+            pattern = _normalize(location_norm or "")
+            if pattern:
+                # Punctuation is dropped from the pattern, so "Adajan-Gam" and "adajan gam"
+                # are one area; the jobs are looked up by their stored values.
+                locations.setdefault(pattern, set()).add(location_norm)
+        for pattern in locations:
+            automaton.add(pattern, "location", pattern)
+        automaton.build()
+        return Vocabulary(automaton, {pattern: frozenset(norms) for pattern, norms in locations.items()})
+
+    @staticmethod
+    def _select_matches(text: str, matches: List[Match]) -> List[Match]:
+        """Keeps whole-word matches, longest first, without overlaps."""
+        def on_word_boundary(match):
+            before_ok = match.start == 0 or text[match.start - 1] == " "
+            after_ok = match.end == len(text) or text[match.end] == " "
+            return before_ok and after_ok
+
+        chosen = []
+        for match in sorted(filter(on_word_boundary, matches), key=lambda m: (-(m.end - m.start), m.start)):
+            if all(match.end <= other.start or match.start >= other.end for other in chosen):
+                chosen.append(match)
+        return sorted(chosen, key=lambda m: m.start)
+
+    def _find(self, vocabulary: Vocabulary, text: str) -> List[Match]:
+        return self._select_matches(text, vocabulary.automaton.find_all(text))
+
+    def entities(self, question: str) -> Tuple[FrozenSet[int], FrozenSet[str]]:
+        """(skill ids, normalized location areas) named in the question. Blocking (DB)."""
+        text = _normalize(question)
+        if not text:
+            return frozenset(), frozenset()
+        db = SessionLocal()
+        try:
+            matches = self._find(self._get_vocabulary(db), text)
+        finally:
+            db.close()
+        return (
+            frozenset(m.value for m in matches if m.kind == "skill"),
+            frozenset(m.value for m in matches if m.kind == "location"),
+        )
+
+    def route(self, question: str) -> Optional[str]:
+        """Blocking (DB); call it from a worker thread."""
+        text = _normalize(question)
+        if not text:
+            return None
+
+        db = SessionLocal()
+        try:
+            vocabulary = self._get_vocabulary(db)
+            matches = self._find(vocabulary, text)
+            skill_ids = sorted({m.value for m in matches if m.kind == "skill"})
+            locations = {m.value for m in matches if m.kind == "location"}
+            if not skill_ids and not locations:
+                return None
+            if len(locations) > 1:
+                return None  # "plumber jobs in Adajan or Vesu": let the agent handle it
+
+            # Everything that isn't a skill or location must be a job word or filler,
+            # and the question has to be about jobs at all.
+            leftover = text
+            for match in reversed(matches):
+                leftover = leftover[:match.start] + " " + leftover[match.end:]
+            leftover_words = set(leftover.split())
+            if not leftover_words & _JOB_WORDS or leftover_words - _JOB_WORDS - _FILLER_WORDS:
+                return None
+
+            location = next(iter(locations), None)
+            jobs = crud.search_jobs_ranked(
+                db,
+                skill_ids=skill_ids or None,
+                location_norms=sorted(vocabulary.locations[location]) if location else None,
+                limit=ROUTED_TOP_K,
+            )
+        finally:
+            db.close()
+
+        where = f" in {location.title()}" if location else ""
+        if not jobs:
+            return f"Sorry, I couldn't find any matching jobs{where} right now. Please check back later!"
+        lines = [f"- '{job.title}' in {job.location_area}" for job in jobs]
+        return f"Here are the jobs I found{where}:\n" + "\n".join(lines)
+
+
+# A single shared router for the whole process.
+intent_router = IntentRouter()
@@ -0,0 +1,133 @@
+"""
+Job search: semantic (vectors built by ingest_job.py), keyword (BM25) or both.
+
+Each API worker memory-maps the current job vector segment of the active index
+version (see app/index_versions.py and app/vector_index.py), so all workers
+share one copy of the vectors, and loads that version's embedding model once.
+A newly published segment, or a newly activated version with a different
+model, is picked up within RECHECK_SECONDS without restarting the worker.
+The BM25 index (app/bm25_index.py) is kept current as jobs are written.
+
+Hybrid search ranks with both and merges the two rankings with reciprocal rank
+fusion, so a job needs no comparable score across methods, only a good rank in
+either. The winners are loaded from MySQL in one query.
+"""
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import crud, models
+from .bm25_index import bm25_index
+from .database import SessionLocal
+from .embeddings import EMBEDDING_INFERENCE, EMBEDDING_MODEL_NAME, get_embedder
+from .index_versions import active_version
+from .vector_index import JobVectorIndex
+
+# How often a worker checks whether a new segment or index version was published.
+RECHECK_SECONDS = 5
+SEARCH_MODES = ("hybrid", "vector", "keyword")
+# Each ranking contributes 1 / (RRF_K + rank); 60 is the usual constant.
+RRF_K = 60
+# How deep each ranking goes before fusion.
+FUSION_DEPTH = 50
+
+
+class SearchHit(NamedTuple):
+    job: models.Job
+    score: float
+
+
+class LoadedIndex(NamedTuple):
+    index: JobVectorIndex
+    # Queries must be embedded as the index was built: same model, same inference mode.
+    model_name: str
+    inference: str
+
+    def embedder(self):
+        return get_embedder(self.model_name, self.inference)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[List[Tuple[int, float]]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """Merges rankings of (job_id, score) into one, scored by the sum of 1 / (k + rank)."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, (job_id, _) in enumerate(ranking, start=1):
+            fused[job_id] = fused.get(job_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class JobSearch:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded: Optional[LoadedIndex] = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def _get_index(self) -> LoadedIndex:
+        loaded = self._loaded
+        if loaded is not None and time.monotonic() - self._checked_at < RECHECK_SECONDS:
+            return loaded
+        with self._lock:
+            active = active_version()
+            segment = JobVectorIndex.current_segment(active.path) if active else None
+            version = (active.name if active else None, segment)
+            self._checked_at = time.monotonic()
+            if self._loaded is None or version != self._version:
+                if active is None:
+                    self._loaded = LoadedIndex(JobVectorIndex.empty(), EMBEDDING_MODEL_NAME, EMBEDDING_INFERENCE)
+                else:
+                    # Load the version's model before switching, so no query pairs
+                    # the new index with the old model.
+                    get_embedder(active.model_name, active.inference)
+                    index = JobVectorIndex.open(active.path, segment) or JobVectorIndex.empty()
+                    self._loaded = LoadedIndex(index, active.model_name, active.inference)
+                self._version = version
+            return self._loaded
+
+    def query_embedding(self) -> Tuple[str, str]:
+        """(model, inference mode) of the served index version: questions compared with it must use them."""
+        loaded = self._get_index()
+        return loaded.model_name, loaded.inference
+
+    def warm(self):
+        """Loads the model and both indexes up front, so the first search isn't slow."""
+        self._get_index().embedder()
+        bm25_index.load()
+        with SessionLocal() as db:
+            bm25_index.refresh(db)
+
+    def search(
+        self,
+        db: Session,
+        q: str,
+        k: int = 10,
+        skill_ids: Optional[Sequence[int]] = None,
+        location_area: Optional[str] = None,
+        mode: str = "hybrid",
+    ) -> List[SearchHit]:
+        """
+        Blocking (embedding + DB); call it from a worker thread. The score is the
+        cosine similarity in 'vector' mode, BM25 in 'keyword' mode and the fused
+        reciprocal-rank score in 'hybrid' mode; higher is better in all three.
+        """
+        location = models.normalize_location(location_area) if location_area else None
+        depth = max(k, FUSION_DEPTH) if mode == "hybrid" else k
+        rankings = []
+        if mode in ("hybrid", "vector"):
+            loaded = self._get_index()
+            query = np.asarray(loaded.embedder().embed_query(q), dtype=np.float32)
+            rankings.append(loaded.index.search(query, depth, skill_ids=skill_ids, location_area=location))
+        if mode in ("hybrid", "keyword"):
+            bm25_index.refresh(db)
+            rankings.append(bm25_index.search(q, depth, skill_ids=skill_ids, location_area=location))
+        ranked = (reciprocal_rank_fusion(rankings) if len(rankings) > 1 else rankings[0])[:k]
+        jobs = {job.id: job for job in crud.get_jobs_by_ids(db, [job_id for job_id, _ in ranked])}
+        # Jobs deleted since the last ingestion are simply left out.
+        return [SearchHit(jobs[job_id], score) for job_id, score in ranked if job_id in jobs]
+
+
+# A single shared search service for the whole process.
+job_search = JobSearch()
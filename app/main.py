@@ -1,20 +1,58 @@
 from typing import List
-from fastapi import Depends, FastAPI, HTTPException, status, BackgroundTasks
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from . import crud, models, schemas, auth,database # Import everything
 from .database import SessionLocal, engine
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 from typing import List, Optional # Make sure Optional is imported at the top
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from . import chatbot
-from . import notifications
+from . import pagination
+from . import migrations
+from . import hashing
+from .admission import QueueFull
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+import json
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import joinedload
+from contextlib import asynccontextmanager
+from .matching import skill_index
+from .chat_cache import chat_cache
+from .conversation_store import conversation_store, is_valid_session_id, issue_session_id
+from .intent_router import intent_router
+from .job_search import SEARCH_MODES, job_search
+from .bm25_index import bm25_index
+from .skill_catalog import choose_encoding, entity_tag, matches_if_none_match, skill_catalog
 
 models.Base.metadata.create_all(bind=engine)
+migrations.upgrade_schema(engine)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the in-memory skill index once, before serving any request.
+    def load_skill_index():
+        db = SessionLocal()
+        try:
+            skill_index.load(db)
+        finally:
+            db.close()
+    try:
+        await run_in_threadpool(load_skill_index)
+    except Exception as e:
+        print(f"Skill index load failed, match counts will come from the database: {e}")
+    # Load the embedding model and job vectors once per worker, not on the first search.
+    try:
+        await run_in_threadpool(job_search.warm)
+    except Exception as e:
+        print(f"Job search warm-up failed, will retry on the first search: {e}")
+    yield
+    hashing.shutdown()
+    conversation_store.close()
+    bm25_index.close()
+
+app = FastAPI(lifespan=lifespan)
 # Add CORSMiddleware to your imports
 
 # --- ADD THIS CORS MIDDLEWARE CONFIGURATION ---
@@ -30,6 +68,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], # Allows all methods
     allow_headers=["*"], # Allows all headers
+    expose_headers=["Link", "ETag", "X-Session-Id"], # Lets the browser read pagination links, catalog versions and chat sessions
 )
 # ---------------------------------------------
 
@@ -44,38 +83,78 @@ def create_skill_endpoint(skill: schemas.SkillCreate, db: Session = Depends(data
     db_skill = crud.get_skill_by_name(db, name=skill.name.strip())
     if db_skill:
         raise HTTPException(status_code=400, detail="Skill already registered")
-    return crud.create_skill(db=db, skill=skill)
+    db_skill = crud.create_skill(db=db, skill=skill)
+    intent_router.invalidate()
+    return db_skill
 
 # --- Endpoint to Get all Skills ---
 @app.get("/skills/", response_model=List[schemas.Skill])
-def read_skills(skip: int = 0,limit: int = 100,db: Session = Depends(database.get_db)):
+def read_skills(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, deprecated=True),
+    limit: int = Query(100, ge=1),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Lists skills ordered by id. Follow the `Link: rel="next"` header (or pass its
+    `cursor`) to page through; `skip` still works but is deprecated.
+    """
     limit = min(limit, 100)  # Safety cap
-    skills = crud.get_skills(db, skip=skip, limit=limit)
+    rows = crud.get_skills(db, skip=skip, limit=limit + 1, after_id=pagination.decode_cursor(cursor))
+    skills, next_cursor = pagination.split_page(rows, limit)
+    pagination.set_next_link(request, response, next_cursor, limit)
     return skills
 
 
+# --- Endpoint to Get the full Skill Catalog ---
+@app.get("/skills/catalog/", response_model=List[schemas.Skill])
+def read_skill_catalog(request: Request, db: Session = Depends(database.get_db)):
+    """
+    Returns every skill in one response, served from a pre-compressed in-process
+    snapshot. Send the ETag back in If-None-Match to get a 304 when nothing changed.
+    """
+    snapshot = skill_catalog.get(db)
+    encoding = choose_encoding(snapshot, request.headers.get("accept-encoding", ""))
+    headers = {
+        "ETag": entity_tag(snapshot, encoding),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if matches_if_none_match(snapshot, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=snapshot.bodies[encoding], media_type="application/json", headers=headers)
+
+
 # --- Endpoint for User Signup ---# In app/main.py
 @app.post("/signup/", response_model=schemas.User)
-def create_user_endpoint(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    db_user = crud.get_user_by_phone(db, phone_number=user.phone_number)
+async def create_user_endpoint(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+    # Database calls stay on the threadpool; bcrypt runs in the hashing process pool.
+    db_user = await run_in_threadpool(crud.get_user_by_phone, db, phone_number=user.phone_number)
     if db_user:
         raise HTTPException(status_code=400, detail="Phone number already registered")
     
     # Hash the password here, before sending it to the CRUD function
-    hashed_password = auth.get_password_hash(user.password)
+    hashed_password = await _hash_or_503(hashing.hash_password(user.password))
     user.password = hashed_password
     
-    return crud.create_user(db=db, user=user)
+    # Serialize on the threadpool too, so loading the (empty) skills list doesn't block the loop.
+    def create_and_serialize():
+        return schemas.User.model_validate(crud.create_user(db=db, user=user))
+    return await run_in_threadpool(create_and_serialize)
 
 
 # --- Endpoint for User Login / Token Generation ---
 @app.post("/token", response_model=schemas.Token)
-def login_for_access_token(db: Session = Depends(database.get_db), form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(db: Session = Depends(database.get_db), form_data: OAuth2PasswordRequestForm = Depends()):
     # In OAuth2, the 'username' field of the form is used. We'll use it for our phone_number.
-    user = crud.get_user_by_phone(db, phone_number=form_data.username)
+    user = await run_in_threadpool(crud.get_user_by_phone, db, phone_number=form_data.username)
 
     # Verify user exists and password is correct
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    if not user or not await _hash_or_503(hashing.verify_password(form_data.password, user.hashed_password)):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect phone number or password",
@@ -84,10 +163,26 @@ def login_for_access_token(db: Session = Depends(database.get_db), form_data: OA
     # Create the token
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user.phone_number}, expires_delta=access_token_expires
+        data={"sub": user.phone_number, **auth.principal_claims(user)}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+async def _hash_or_503(hashing_call):
+    """Turns a full hashing queue into a 503 that only affects signup/login."""
+    try:
+        return await hashing_call
+    except QueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+@app.get("/auth/hashing-queue/")
+def read_hashing_queue_depth():
+    """Reports in-flight and waiting password hashing calls."""
+    return hashing.stats()
+
 # ... (keep all your existing code and imports) ...
 
 # --- Our First Protected Endpoint ---
@@ -120,10 +215,8 @@ def update_my_skills(
 @app.post("/jobs/", response_model=schemas.Job)
 def create_job_endpoint(
     job: schemas.JobCreate,
-    # Add background_tasks as a parameter. FastAPI will inject it.
-    background_tasks: BackgroundTasks, 
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_principal)
 ):
     if current_user.role != 'employer':
         raise HTTPException(
@@ -131,41 +224,116 @@ def create_job_endpoint(
             detail="Only employers can post jobs"
         )
     
-    # Create the job as before
+    # Creating the job also queues its notifications in the outbox table;
+    # the notification worker pool (app/notification_worker.py) sends them.
     db_job = crud.create_job(db=db, job=job, employer_id=current_user.id)
-    
-    # Add our new function to the background tasks
-    background_tasks.add_task(run_job_matching_and_notifications, db=db, job=db_job)
+    intent_router.invalidate() # New location areas become recognizable right away
     
     return db_job
 
-@app.get("/jobs/")
-def read_jobs(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    # Load related user in a single query if relationship exists (assumes Job.employer or Job.owner)
-    try:
-        # try `employer` relationship first, else `owner`
-        jobs = db.query(models.Job).options(joinedload(models.Job.employer)).offset(skip).limit(limit).all()
-        # if joinedload fails (attribute doesn't exist), try owner:
-    except Exception:
-        jobs = db.query(models.Job).options(joinedload(models.Job.owner)).offset(skip).limit(limit).all()
+def _get_own_job(db: Session, job_id: int, current_user: auth.Principal) -> models.Job:
+    db_job = crud.get_job(db, job_id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if db_job.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the employer who posted a job can change it"
+        )
+    return db_job
 
-    results = []
-    for job in jobs:
-        # prefer job.employer.name or job.owner.name if available
-        employer_name = None
-        try:
-            if getattr(job, "employer", None):
-                employer_name = getattr(job.employer, "name", None)
-            elif getattr(job, "owner", None):
-                employer_name = getattr(job.owner, "name", None)
-        except Exception:
-            employer_name = None
+@app.put("/jobs/{job_id}", response_model=schemas.Job)
+def update_job_endpoint(
+    job_id: int,
+    job: schemas.JobCreate,
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_principal)
+):
+    db_job = crud.update_job(db, _get_own_job(db, job_id, current_user), job)
+    intent_router.invalidate() # The location area may be new
+    return db_job
 
-        job_data = schemas.Job.from_orm(job).dict()
-        job_data["employer_name"] = employer_name
-        results.append(job_data)
+@app.delete("/jobs/{job_id}", status_code=204)
+def delete_job_endpoint(
+    job_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_principal)
+):
+    crud.delete_job(db, _get_own_job(db, job_id, current_user))
+    intent_router.invalidate()
+    return Response(status_code=204)
 
-    return results
+@app.get("/jobs/", response_model=List[schemas.JobListing])
+def read_jobs(
+    request: Request,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, deprecated=True),
+    limit: int = Query(100, ge=1),
+    skill_id: Optional[List[int]] = Query(None),
+    skill: Optional[List[str]] = Query(None),
+    location_area: Optional[str] = None,
+    q: Optional[str] = None,
+    db: Session = Depends(database.get_db)
+):
+    """
+    Lists jobs ordered by id. Follow the `Link: rel="next"` header (or pass its
+    `cursor`) to page through; `skip` still works but is deprecated.
+
+    Filters: `skill_id` and `skill` (a skill name) may be repeated and match jobs
+    requiring any of them; `location_area` matches the start of the job's area,
+    ignoring case; `q` is a full-text search over title and description that
+    filters the listing without ranking it (it stays in id order, so it pages
+    like the rest); use GET /jobs/search for ranked results.
+    """
+    limit = min(limit, 100)  # Safety cap
+    skill_ids = None
+    if skill_id or skill:
+        skill_ids = list(skill_id or [])
+        if skill:
+            skill_ids.extend(crud.get_skill_ids_by_names(db, skill))
+
+    rows = crud.get_job_listing(
+        db,
+        skip=skip,
+        limit=limit + 1,
+        after_id=pagination.decode_cursor(cursor),
+        skill_ids=skill_ids,
+        location_area=location_area,
+        q=q,
+    )
+    jobs, next_cursor = pagination.split_page(rows, limit)
+    # Validate and serialize the whole page in one pass, skipping the per-row dict round trip.
+    page = schemas.JobListingPage.validate_python(jobs, from_attributes=True)
+    response = Response(content=schemas.JobListingPage.dump_json(page), media_type="application/json")
+    pagination.set_next_link(request, response, next_cursor, limit)
+    return response
+
+@app.get("/jobs/search", response_model=List[schemas.JobSearchHit])
+def search_jobs(
+    q: str = Query(..., min_length=1, max_length=500),
+    k: int = Query(10, ge=1, le=50),
+    skill_id: Optional[List[int]] = Query(None),
+    skill: Optional[List[str]] = Query(None),
+    location_area: Optional[str] = None,
+    mode: str = Query("hybrid", pattern="^(" + "|".join(SEARCH_MODES) + ")$"),
+    db: Session = Depends(database.get_db)
+):
+    """
+    The `k` jobs that best match `q`, best first. `mode=hybrid` (default) fuses
+    semantic search over the vectors built by ingest_job.py with BM25 keyword
+    search over title, description and skills; `vector` and `keyword` use one.
+    `skill_id`, `skill` and `location_area` filter the candidates first and
+    behave as on GET /jobs/.
+    """
+    skill_ids = None
+    if skill_id or skill:
+        skill_ids = list(skill_id or [])
+        if skill:
+            skill_ids.extend(crud.get_skill_ids_by_names(db, skill))
+
+    hits = job_search.search(db, q, k=k, skill_ids=skill_ids, location_area=location_area, mode=mode)
+    page = schemas.JobSearchPage.validate_python(hits, from_attributes=True)
+    return Response(content=schemas.JobSearchPage.dump_json(page), media_type="application/json")
 
 
 
@@ -174,73 +342,191 @@ def read_jobs(skip: int = 0, limit: int = 100, db: Session = Depends(database.ge
 # Define the request body for our chat endpoint
 class ChatRequest(BaseModel):
     message: str
+    bypass_cache: bool = False # Always ask the agent, e.g. for a "regenerate" button
+    session_id: Optional[str] = Field(None, max_length=64) # From an earlier response; omit it to start a conversation
+
+async def _load_history(request: ChatRequest) -> list:
+    """
+    History of the request's conversation. Session ids are issued by the server and
+    signed, so a client can't pick another user's; without one a new conversation starts.
+    """
+    if request.session_id is None:
+        request.session_id = issue_session_id()
+        return []
+    if not is_valid_session_id(request.session_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown session_id; omit it to start a new conversation",
+        )
+    return await run_in_threadpool(conversation_store.get_history, request.session_id)
+
+def _remember(request: ChatRequest, answer: str):
+    # Queued only; the store's background writer persists it.
+    conversation_store.append(request.session_id, request.message, answer)
+
+async def _routed_answer(request: ChatRequest):
+    """Answers simple '<skill> jobs in <area>' questions without the LLM; None otherwise."""
+    try:
+        return await run_in_threadpool(intent_router.route, request.message)
+    except Exception as e:
+        print(f"Intent routing failed, asking the agent instead: {e}")
+        return None
+
+async def _cached_answer(request: ChatRequest):
+    """Looks the question up in the semantic cache; None when bypassed or unavailable."""
+    if request.bypass_cache:
+        return None
+    try:
+        return await run_in_threadpool(chat_cache.lookup, request.message)
+    except Exception as e:
+        print(f"Chat cache lookup failed, asking the agent instead: {e}")
+        return None
+
+def _chat_busy():
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="The assistant is busy, please retry shortly",
+        headers={"Retry-After": str(chatbot.CHAT_RETRY_AFTER_SECONDS)},
+    )
 
 @app.post("/chat/")
-def chat_with_agent(request: ChatRequest):
+async def chat_with_agent(request: ChatRequest):
     """
     Receives a message from the user and gets a response from the LangChain agent.
+    Runs on the event loop, so a slow agent run doesn't hold a threadpool worker.
+    Simple structured questions are answered by the intent router and
+    near-duplicate questions from the semantic cache, both without the LLM.
+    Send the returned `session_id` with the next message to continue the conversation.
     """
+    history = await _load_history(request)
+    routed = await _routed_answer(request)
+    if routed is not None:
+        _remember(request, routed)
+        return {"response": routed, "routed": True, "session_id": request.session_id}
+
+    # Cached answers don't know the conversation so far, so only first turns use them.
+    lookup = None if history else await _cached_answer(request)
+    if lookup is not None and lookup.answer is not None:
+        _remember(request, lookup.answer)
+        return {"response": lookup.answer, "cached": True, "session_id": request.session_id}
+
+    try:
+        await chatbot.chat_limiter.acquire()
+    except QueueFull:
+        raise _chat_busy()
     try:
-        response = chatbot.agent_executor.invoke({"input": request.message})
-        return {"response": response['output']}
+        response = await chatbot.agent_executor.ainvoke({"input": request.message, "chat_history": history})
+        if lookup is not None:
+            chat_cache.store(lookup, response['output'])
+        _remember(request, response['output'])
+        return {"response": response['output'], "session_id": request.session_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    
-def run_job_matching_and_notifications(db: Session, job: models.Job):
-    print(f"Starting background task for job '{job.title}' (ID: {job.id})")
-    matching_seekers = crud.get_matching_seekers(db=db, job=job)
-    
-    print(f"Found {len(matching_seekers)} matching seekers.")
-    for seeker in matching_seekers:
-        notifications.send_job_notification(
-            user_name=seeker.name,
-            phone_number=seeker.phone_number,
-            job_title=job.title
+    finally:
+        chatbot.chat_limiter.release()
+
+@app.get("/chat/cache/")
+def read_chat_cache_stats():
+    """Reports the semantic cache size and hit rate."""
+    return chat_cache.stats()
+
+@app.get("/chat/queue/")
+def read_chat_queue_depth():
+    """Reports in-flight, waiting and rejected chat requests."""
+    return chatbot.chat_limiter.stats()
+
+@app.post("/chat/stream/")
+async def chat_with_agent_stream(request: ChatRequest, http_request: Request):
+    """
+    Streams the agent's answer as Server-Sent Events: `token` events carry pieces
+    of text, `tool_start`/`tool_end` report job searches, `done` carries the full
+    answer and `error` reports a failure. If the client goes away, the agent run
+    and its LLM request are cancelled instead of running to completion. The
+    conversation's `session_id` is in the `X-Session-Id` header and the `done` event.
+    """
+    history = await _load_history(request)
+    routed = await _routed_answer(request)
+    lookup = None if routed is not None or history else await _cached_answer(request)
+    if routed is not None or (lookup is not None and lookup.answer is not None):
+        data = {"response": routed, "routed": True} if routed is not None else {"response": lookup.answer, "cached": True}
+        data["session_id"] = request.session_id
+        _remember(request, data["response"])
+        async def instant_source():
+            yield f"event: done\ndata: {json.dumps(data)}\n\n"
+        return StreamingResponse(
+            instant_source(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Session-Id": request.session_id},
         )
-    print(f"Finished background task for job ID: {job.id}")
 
-# ... (at the end of the file)
+    # Take the slot before streaming starts, so a full queue is still a plain 429.
+    try:
+        await chatbot.chat_limiter.acquire()
+    except QueueFull:
+        raise _chat_busy()
 
-@app.get("/jobs/my-postings/", response_model=List[schemas.JobWithMatches])
-def read_my_postings(
+    released = False
+    def release_slot():
+        # Called from the generator and again as a background task, because a
+        # generator that never started (early disconnect) never runs its finally.
+        nonlocal released
+        if not released:
+            released = True
+            chatbot.chat_limiter.release()
+
+    async def event_source():
+        events = chatbot.stream_chat_events(request.message, history)
+        try:
+            async for event, data in events:
+                if await http_request.is_disconnected():
+                    break
+                if event == "done":
+                    if lookup is not None:
+                        chat_cache.store(lookup, data["response"])
+                    _remember(request, data["response"])
+                    data = {**data, "session_id": request.session_id}
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        finally:
+            await events.aclose()
+            release_slot()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Session-Id": request.session_id},
+        background=BackgroundTask(release_slot),
+    )
+    
+@app.get("/notifications/queue/")
+def read_notification_queue_depth(
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    admin: auth.Principal = Depends(auth.get_current_admin)
 ):
     """
-    Retrieve all jobs posted by the currently logged-in employer,
-    along with a count of matching seekers for each job.
+    Reports how many notification outbox rows are in each status,
+    e.g. {"pending": 120, "sent": 5000, "failed": 2}. Admins only.
+    Sent rows are pruned by the worker after NOTIFY_SENT_RETENTION_HOURS.
     """
-    if current_user.role != 'employer':
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only employers can view their job postings."
-        )
-    
-    jobs = crud.get_jobs_by_owner(db, owner_id=current_user.id)
-    jobs_with_counts = []
-    
-    for job in jobs:
-        matching_seekers = crud.get_matching_seekers(db, job=job)
-        job_data = schemas.Job.from_orm(job) # Convert SQLAlchemy object to Pydantic model
-        
-        job_with_count_data = schemas.JobWithMatches(
-            **job_data.dict(),
-            matching_seekers_count=len(matching_seekers)
-        )
-        jobs_with_counts.append(job_with_count_data)
-        
-    return jobs_with_counts
+    return crud.get_outbox_depth(db)
 
 # ... (at the end of the file)
 
 @app.get("/jobs/my-postings/", response_model=List[schemas.JobWithMatches])
 def read_my_postings(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_principal)
 ):
     """
-    Retrieve all jobs posted by the currently logged-in employer,
+    Retrieve the jobs posted by the currently logged-in employer,
     along with a count of matching seekers for each job.
+    Returns every posting unless `limit` (at most 100) is given, in which case the
+    next page is advertised in a `Link: rel="next"` header.
     """
     if current_user.role != 'employer':
         raise HTTPException(
@@ -248,17 +534,36 @@ def read_my_postings(
             detail="Only employers can view their job postings."
         )
     
-    jobs = crud.get_jobs_by_owner(db, owner_id=current_user.id)
+    # A fixed number of queries regardless of how many jobs the employer has:
+    # one for the jobs, one for their skills, and either the skill index's catch-up
+    # scan or, until the index has loaded, one grouped count.
+    after_id = pagination.decode_cursor(cursor)
+    if limit is None:
+        jobs = crud.get_jobs_by_owner(db, owner_id=current_user.id, after_id=after_id)
+    else:
+        limit = min(limit, 100)  # Safety cap
+        rows = crud.get_jobs_by_owner(db, owner_id=current_user.id, after_id=after_id, limit=limit + 1)
+        jobs, next_cursor = pagination.split_page(rows, limit)
+        pagination.set_next_link(request, response, next_cursor, limit)
+    if skill_index.loaded:
+        skill_index.refresh(db)
+        counts = {
+            job.id: skill_index.count_matching_seekers(skill.id for skill in job.required_skills)
+            for job in jobs
+        }
+    else:
+        counts = crud.count_matching_seekers_by_owner(
+            db, owner_id=current_user.id, job_ids=[job.id for job in jobs]
+        )
     jobs_with_counts = []
     
     for job in jobs:
-        matching_seekers = crud.get_matching_seekers(db, job=job)
         job_data = schemas.Job.from_orm(job) # Convert SQLAlchemy object to Pydantic model
         
         job_with_count_data = schemas.JobWithMatches(
             **job_data.dict(),
-            matching_seekers_count=len(matching_seekers)
+            matching_seekers_count=counts.get(job.id, 0)
         )
         jobs_with_counts.append(job_with_count_data)
         
-    return jobs_with_counts
\ No newline at end of file
+    return jobs_with_counts
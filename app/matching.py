@@ -0,0 +1,143 @@
+"""
+In-memory inverted index of skill_id -> seeker ids, for matching seekers to jobs.
+
+Each skill maps to a bitmap stored as a plain Python int, where bit N is set when
+the seeker with user id N has that skill. Matching a job is then an OR over the
+bitmaps of its required skills, and counting is a popcount, so neither touches
+MySQL.
+
+Every worker keeps its own copy. Skill changes made through this process are
+applied as they happen (crud.create_user, crud.update_user_skills); those made by
+other processes are picked up by a throttled scan of users on skills_updated_at,
+which crud.update_user_skills stamps, so a worker is never more than
+RECHECK_SECONDS behind.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+# How often a worker checks for skill changes made through another process.
+RECHECK_SECONDS = 5
+# Re-read users stamped this long before the watermark, in case a slow transaction
+# committed an older timestamp after the last scan.
+WATERMARK_OVERLAP = timedelta(minutes=2)
+
+
+class SkillIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bitmaps: Dict[int, int] = {}
+        self._user_skills: Dict[int, FrozenSet[int]] = {}
+        self._watermark: Optional[datetime] = None
+        self._checked_at = 0.0
+        self.loaded = False
+
+    # --- Building ---
+    def load(self, db: Session):
+        """Rebuilds the whole index from the user_skills table."""
+        # Read the watermark first: a change committed during the scan is re-read by the next refresh().
+        watermark = db.execute(
+            select(func.max(models.User.skills_updated_at)).where(models.User.role == 'seeker')
+        ).scalar()
+        table = models.user_skills_association_table
+        rows = db.execute(
+            select(table.c.user_id, table.c.skill_id)
+            .join(models.User, models.User.id == table.c.user_id)
+            .where(models.User.role == 'seeker')
+        ).all()
+
+        bitmaps: Dict[int, int] = {}
+        user_skills: Dict[int, set] = {}
+        for user_id, skill_id in rows:
+            bitmaps[skill_id] = bitmaps.get(skill_id, 0) | (1 << user_id)
+            user_skills.setdefault(user_id, set()).add(skill_id)
+
+        with self._lock:
+            self._bitmaps = bitmaps
+            self._user_skills = {uid: frozenset(s) for uid, s in user_skills.items()}
+            self._watermark = watermark
+            self._checked_at = time.monotonic()
+            self.loaded = True
+        print(f"Skill index loaded: {len(self._user_skills)} seekers, {len(self._bitmaps)} skills.")
+
+    def refresh(self, db: Session):
+        """Catches up on skill changes made by other processes. Throttled."""
+        if not self.loaded:
+            self.load(db)
+            return
+        if time.monotonic() - self._checked_at < RECHECK_SECONDS:
+            return
+        self._checked_at = time.monotonic()
+        query = (
+            select(models.User.id, models.User.skills_updated_at, models.user_skills_association_table.c.skill_id)
+            .outerjoin(
+                models.user_skills_association_table,
+                models.user_skills_association_table.c.user_id == models.User.id,
+            )
+            .where(models.User.role == 'seeker')
+        )
+        watermark = self._watermark
+        if watermark is not None:
+            query = query.where(models.User.skills_updated_at >= watermark - WATERMARK_OVERLAP)
+        else:
+            query = query.where(models.User.skills_updated_at.is_not(None))
+
+        changed: Dict[int, set] = {}
+        for user_id, updated_at, skill_id in db.execute(query).all():
+            skills = changed.setdefault(user_id, set())
+            if skill_id is not None:
+                skills.add(skill_id)
+            if watermark is None or updated_at > watermark:
+                watermark = updated_at
+        for user_id, skill_ids in changed.items():
+            self.set_user_skills(user_id, skill_ids)
+        with self._lock:
+            self._watermark = watermark
+
+    # --- Incremental updates ---
+    def set_user_skills(self, user_id: int, skill_ids: Iterable[int]):
+        """Replaces the skills recorded for one seeker."""
+        new_skills = frozenset(skill_ids)
+        bit = 1 << user_id
+        with self._lock:
+            old_skills = self._user_skills.get(user_id, frozenset())
+            for skill_id in old_skills - new_skills:
+                remaining = self._bitmaps.get(skill_id, 0) & ~bit
+                if remaining:
+                    self._bitmaps[skill_id] = remaining
+                else:
+                    self._bitmaps.pop(skill_id, None)
+            for skill_id in new_skills - old_skills:
+                self._bitmaps[skill_id] = self._bitmaps.get(skill_id, 0) | bit
+            if new_skills:
+                self._user_skills[user_id] = new_skills
+            else:
+                self._user_skills.pop(user_id, None)
+
+    # --- Queries ---
+    def _match_bitmap(self, skill_ids: Iterable[int]) -> int:
+        bitmaps = self._bitmaps
+        result = 0
+        for skill_id in set(skill_ids):
+            result |= bitmaps.get(skill_id, 0)
+        return result
+
+    def matching_seeker_ids(self, skill_ids: Iterable[int]) -> List[int]:
+        """Ids of seekers that have at least one of the given skills, ascending."""
+        bitmap = self._match_bitmap(skill_ids)
+        # Reverse the binary string so that string position == user id.
+        bits = bin(bitmap)[:1:-1]
+        return [user_id for user_id, bit in enumerate(bits) if bit == '1']
+
+    def count_matching_seekers(self, skill_ids: Iterable[int]) -> int:
+        return self._match_bitmap(skill_ids).bit_count()
+
+
+# A single shared index for the whole process.
+skill_index = SkillIndex()
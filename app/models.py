@@ -1,8 +1,17 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Table
+from sqlalchemy import Boolean, Column, Computed, DateTime, ForeignKey, Index, Integer, String, Table, Text, text
 from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
 
 from .database import Base
 
+def utcnow():
+    # Naive UTC timestamps, so that comparisons don't depend on the MySQL server timezone.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def normalize_location(location_area: str) -> str:
+    # Mirrors the Job.location_area_norm expression.
+    return location_area.strip().lower()
+
 # Association Table for Many-to-Many relationship between Users and Skills
 user_skills_association_table = Table(
     'user_skills', Base.metadata,
@@ -14,7 +23,9 @@ user_skills_association_table = Table(
 job_skills_association_table = Table(
     'job_skills', Base.metadata,
     Column('job_id', Integer, ForeignKey('jobs.id')),
-    Column('skill_id', Integer, ForeignKey('skills.id'))
+    Column('skill_id', Integer, ForeignKey('skills.id')),
+    # Lets skill filters find a skill's jobs from the index alone.
+    Index('ix_job_skills_skill_job', 'skill_id', 'job_id'),
 )
 
 
@@ -28,6 +39,9 @@ class User(Base):
     role = Column(String(50), index=True) # 'seeker' or 'employer'
     location_area = Column(String(100), index=True)
     is_active = Column(Boolean, default=True)
+    # Stamped by crud.update_user_skills, so that every worker's skill index (app/matching.py)
+    # can catch up on skill changes made through other processes.
+    skills_updated_at = Column(DateTime, default=utcnow, index=True)
 
     # Relationships
     skills = relationship("Skill", secondary=user_skills_association_table)
@@ -49,8 +63,85 @@ class Job(Base):
     title = Column(String(100), index=True)
     description = Column(String(500))
     location_area = Column(String(100), index=True)
+    # Maintained by MySQL; compare against normalize_location() of the user's input.
+    location_area_norm = Column(String(100), Computed("lower(trim(location_area))", persisted=True))
     owner_id = Column(Integer, ForeignKey("users.id"))
+    # Change tracking for incremental ingestion (ingest_job.py). The server default only
+    # backfills existing rows when the columns are added; the app always sets UTC itself.
+    # Anything that changes a job (including its skills) must bump updated_at.
+    created_at = Column(DateTime, nullable=False, default=utcnow, server_default=text("(UTC_TIMESTAMP())"))
+    updated_at = Column(DateTime, nullable=False, default=utcnow, onupdate=utcnow, server_default=text("(UTC_TIMESTAMP())"))
 
     # Relationships
     owner = relationship("User", back_populates="jobs_posted")
-    required_skills = relationship("Skill", secondary=job_skills_association_table)
\ No newline at end of file
+    required_skills = relationship("Skill", secondary=job_skills_association_table)
+
+    __table_args__ = (
+        Index("ix_jobs_location_area_norm_id", "location_area_norm", "id"),
+        Index("ix_jobs_title_description_fulltext", "title", "description", mysql_prefix="FULLTEXT"),
+        Index("ix_jobs_updated_at_id", "updated_at", "id"),
+    )
+
+    @property
+    def employer_name(self):
+        # Only cheap when 'owner' was eager-loaded, as in crud.get_job_listing.
+        return self.owner.name if self.owner else None
+
+
+class JobTombstone(Base):
+    """
+    A deleted job, written in the same transaction as the delete, so that every API
+    worker can drop it from its in-process BM25 index (app/bm25_index.py).
+    """
+    __tablename__ = "job_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, nullable=False) # no foreign key: the job is gone
+    deleted_at = Column(DateTime, nullable=False, default=utcnow)
+
+    __table_args__ = (
+        Index("ix_job_tombstones_deleted_at_id", "deleted_at", "id"),
+    )
+
+
+class NotificationOutbox(Base):
+    """
+    Durable queue of notification work, written in the same transaction as the job.
+    A 'job_posted' row is fanned out by a worker into one 'job_notification' row per
+    matching seeker. A row is claimed by pushing available_at into the future, so work
+    held by a crashed worker becomes visible again once that timeout passes.
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(30), nullable=False) # 'job_posted' or 'job_notification'
+    job_id = Column(Integer, ForeignKey("jobs.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    status = Column(String(20), nullable=False, default='pending') # 'pending', 'sent' or 'failed'
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=utcnow)
+    last_error = Column(String(500))
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+
+    # Lets crud.create_job queue the row before the job has an id.
+    job = relationship("Job")
+
+    __table_args__ = (
+        Index("ix_notification_outbox_claim", "status", "available_at", "id"),
+    )
+
+
+class ChatMessage(Base):
+    """One turn of a chatbot conversation, written in batches by app.conversation_store."""
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String(64), nullable=False)
+    role = Column(String(10), nullable=False) # 'human' or 'ai'
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+
+    __table_args__ = (
+        Index("ix_chat_messages_session_id_id", "session_id", "id"),
+    )
+
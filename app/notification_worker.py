@@ -0,0 +1,159 @@
+"""
+Notification worker pool.
+
+Run it next to the API, as a separate process:
+
+    python -m app.notification_worker --processes 4
+
+Each worker process claims batches from the notification_outbox table with
+SELECT ... FOR UPDATE SKIP LOCKED, uses its own database sessions, and retries
+failed rows with exponential backoff. Rows still unfinished after
+NOTIFY_MAX_ATTEMPTS are marked failed, and sent rows are pruned after
+NOTIFY_SENT_RETENTION_HOURS so the table (and the depth query) stays small.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from datetime import timedelta
+
+from . import crud, models, notifications
+from .database import SessionLocal, engine
+
+# --- Worker Settings ---
+BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "200"))
+VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("NOTIFY_VISIBILITY_TIMEOUT", "300"))
+MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))
+BACKOFF_BASE_SECONDS = float(os.getenv("NOTIFY_BACKOFF_BASE", "5"))
+BACKOFF_MAX_SECONDS = float(os.getenv("NOTIFY_BACKOFF_MAX", "900"))
+POLL_INTERVAL_SECONDS = float(os.getenv("NOTIFY_POLL_INTERVAL", "1"))
+SENT_RETENTION = timedelta(hours=float(os.getenv("NOTIFY_SENT_RETENTION_HOURS", "24")))
+DEPTH_REPORT_INTERVAL_SECONDS = 30
+PRUNE_INTERVAL_SECONDS = 600
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with jitter, so retries from one batch don't arrive together."""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _fan_out(item):
+    with SessionLocal() as db:
+        try:
+            count = crud.fan_out_job_notifications(db, job_id=item.job_id)
+            # The new rows are committed together with completing the fan-out row,
+            # so a crash can never leave a job half fanned out.
+            crud.mark_outbox_sent(db, [item.id])
+            print(f"Queued {count} notifications for job ID: {item.job_id}")
+        except Exception as e:
+            db.rollback()
+            crud.mark_outbox_failed(db, item, str(e), backoff_seconds(item.attempts), MAX_ATTEMPTS)
+
+
+def _send_notifications(items):
+    with SessionLocal() as db:
+        # Load everything the batch needs in two queries instead of two per row.
+        users = {
+            user.id: user for user in
+            db.query(models.User).filter(models.User.id.in_({i.user_id for i in items})).all()
+        }
+        jobs = {
+            job.id: job for job in
+            db.query(models.Job).filter(models.Job.id.in_({i.job_id for i in items})).all()
+        }
+
+        sent_ids, failures = [], []
+        for item in items:
+            user, job = users.get(item.user_id), jobs.get(item.job_id)
+            if user is None or job is None:
+                # The user or job was deleted after the row was queued; nothing to send.
+                sent_ids.append(item.id)
+                continue
+            try:
+                notifications.send_job_notification(
+                    user_name=user.name,
+                    phone_number=user.phone_number,
+                    job_title=job.title
+                )
+                sent_ids.append(item.id)
+            except Exception as e:
+                failures.append((item, str(e)))
+
+        crud.mark_outbox_sent(db, sent_ids)
+        for item, error in failures:
+            crud.mark_outbox_failed(db, item, error, backoff_seconds(item.attempts), MAX_ATTEMPTS)
+
+
+def process_batch(batch_size: int = BATCH_SIZE) -> int:
+    """Claims and processes one batch. Returns the number of rows claimed."""
+    with SessionLocal() as db:
+        claimed = crud.claim_outbox_batch(db, batch_size, VISIBILITY_TIMEOUT_SECONDS, MAX_ATTEMPTS)
+
+    for item in claimed:
+        if item.kind == 'job_posted':
+            _fan_out(item)
+    to_send = [item for item in claimed if item.kind == 'job_notification']
+    if to_send:
+        _send_notifications(to_send)
+    return len(claimed)
+
+
+def run_worker(worker_number: int, stop_event):
+    # Never share pooled connections with the parent process.
+    engine.dispose()
+    print(f"Notification worker {worker_number} started (pid {os.getpid()})")
+    last_report = last_prune = 0.0
+    while not stop_event.is_set():
+        try:
+            claimed = process_batch()
+        except Exception as e:
+            print(f"Notification worker {worker_number} error: {e}")
+            claimed = 0
+
+        if worker_number == 0 and time.monotonic() - last_report >= DEPTH_REPORT_INTERVAL_SECONDS:
+            with SessionLocal() as db:
+                print(f"Notification queue depth: {crud.get_outbox_depth(db)}")
+            last_report = time.monotonic()
+
+        if worker_number == 0 and time.monotonic() - last_prune >= PRUNE_INTERVAL_SECONDS:
+            try:
+                with SessionLocal() as db:
+                    pruned = crud.prune_outbox(db, SENT_RETENTION)
+                if pruned:
+                    print(f"Pruned {pruned} sent notification rows")
+            except Exception as e:
+                print(f"Notification worker {worker_number} prune error: {e}")
+            last_prune = time.monotonic()
+
+        if not claimed:
+            stop_event.wait(POLL_INTERVAL_SECONDS)
+    print(f"Notification worker {worker_number} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the SkillSetu notification worker pool.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    # 'spawn' gives every worker a fresh interpreter with its own engine and sessions.
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    workers = [
+        context.Process(target=run_worker, args=(n, stop_event), daemon=True)
+        for n in range(args.processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        stop_event.set()
+        for worker in workers:
+            worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import base64
+import json
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+
+
+# --- Opaque Keyset Cursors ---
+# A cursor holds the id of the last row of the previous page. Pages are ordered by
+# id, so the next page is simply "id > last_id" and MySQL seeks straight to it on
+# the primary key instead of scanning and discarding OFFSET rows.
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+        if not isinstance(last_id, int):
+            raise ValueError("cursor id must be an integer")
+        return last_id
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def split_page(rows: Sequence, limit: int) -> Tuple[List, Optional[str]]:
+    """
+    Takes rows fetched with limit + 1 and returns (page, next_cursor).
+    next_cursor is None on the last page.
+    """
+    page = list(rows[:limit])
+    if len(rows) > limit:
+        return page, encode_cursor(page[-1].id)
+    return page, None
+
+def set_next_link(request: Request, response: Response, next_cursor: Optional[str], limit: int):
+    """Advertises the next page in an RFC 8288 Link header."""
+    if next_cursor is None:
+        return
+    next_url = request.url.remove_query_params("skip").include_query_params(cursor=next_cursor, limit=limit)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
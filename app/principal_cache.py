@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+# --- Cache Settings ---
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "10000"))
+# Must outlive any access token, see auth.ACCESS_TOKEN_EXPIRE_MINUTES.
+INVALIDATION_MEMORY_SECONDS = 2 * 60 * 60
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The minimum needed to authorize a request, without an ORM session attached."""
+    id: int
+    phone_number: str
+    role: str
+    is_active: bool
+
+
+class PrincipalCache:
+    """
+    Short-TTL, size-bounded LRU of authenticated principals keyed by the token's
+    (sub, jti). invalidate() drops every entry for a user and remembers when it
+    happened, so tokens issued before that moment can't be trusted from their claims.
+
+    The cache is per process and invalidate() only reaches this one. A change made
+    anywhere else (another worker, or is_active set in the database) is seen once
+    the entry's TTL runs out, or when the token expires if AUTH_TRUST_TOKEN_CLAIMS
+    is on; keep PRINCIPAL_CACHE_TTL_SECONDS as short as that delay may be.
+    """
+
+    def __init__(self, ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS, max_size: int = PRINCIPAL_CACHE_MAX_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], Tuple[float, Principal]]" = OrderedDict()
+        self._invalidated_at: Dict[str, float] = {}
+
+    def get(self, sub: str, jti: Optional[str]) -> Optional[Principal]:
+        key = (sub, jti)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(self, sub: str, jti: Optional[str], principal: Principal):
+        with self._lock:
+            self._entries[(sub, jti)] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end((sub, jti))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, sub: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == sub]:
+                del self._entries[key]
+            now = time.time()
+            self._invalidated_at = {
+                user: at for user, at in self._invalidated_at.items()
+                if now - at < INVALIDATION_MEMORY_SECONDS
+            }
+            self._invalidated_at[sub] = now
+
+    def invalidated_since(self, sub: str, issued_at: Optional[float]) -> bool:
+        """True if the user was invalidated after a token issued at issued_at (epoch seconds)."""
+        invalidated_at = self._invalidated_at.get(sub)
+        if invalidated_at is None:
+            return False
+        return issued_at is None or issued_at <= invalidated_at
+
+
+# A single shared cache for the whole process.
+principal_cache = PrincipalCache()
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, TypeAdapter
+from typing import List, Literal, Optional
 
 # --- Skill Schemas ---
 class SkillBase(BaseModel):
@@ -15,6 +15,8 @@ class Skill(SkillBase):
     class Config:
         from_attributes = True
 
+SkillList = TypeAdapter(List[Skill])
+
 # --- User Schemas ---
 class UserBase(BaseModel):
     phone_number: str
@@ -23,7 +25,7 @@ class UserBase(BaseModel):
 
 class UserCreate(UserBase):
     password: str
-    role: str # 'seeker' or 'employer'
+    role: Literal['seeker', 'employer'] # 'admin' is only ever granted in the database
 
 class User(UserBase):
     id: int
@@ -51,6 +53,21 @@ class Job(JobBase):
     class Config:
         from_attributes = True
 
+class JobListing(Job):
+    employer_name: Optional[str] = None
+
+# Built once at import time and reused to validate and serialize whole pages of jobs.
+JobListingPage = TypeAdapter(List[JobListing])
+
+class JobSearchHit(BaseModel):
+    job: JobListing
+    score: float # relevance for the search mode used (cosine, BM25 or fused rank); higher is better
+
+    class Config:
+        from_attributes = True
+
+JobSearchPage = TypeAdapter(List[JobSearchHit])
+
 # --- Token Schema for Authentication ---
 class Token(BaseModel):
     access_token: str
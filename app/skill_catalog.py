@@ -0,0 +1,106 @@
+import gzip
+import hashlib
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+# How often a worker checks whether another worker added skills behind its back.
+RECHECK_SECONDS = 30
+
+
+class CatalogSnapshot(NamedTuple):
+    version: Tuple[int, int]      # (skill count, max skill id); skills are never edited or deleted
+    etag: str                     # content hash shared by every encoding of this version
+    bodies: Dict[str, bytes]      # content-encoding ('identity', 'gzip', 'zstd') -> response bytes
+
+
+class SkillCatalog:
+    """
+    The full skill catalog as pre-serialized, pre-compressed response bytes.
+
+    The snapshot is rebuilt when create_skill runs in this process, and at most
+    every RECHECK_SECONDS a cheap COUNT/MAX query picks up skills created through
+    other workers. Between rebuilds, serving the catalog never touches the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < RECHECK_SECONDS:
+            return snapshot
+
+        with self._lock:
+            version = self._current_version(db)
+            self._checked_at = time.monotonic()
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = self._build(db, version)
+            return self._snapshot
+
+    @staticmethod
+    def _current_version(db: Session) -> Tuple[int, int]:
+        count, max_id = db.query(func.count(models.Skill.id), func.max(models.Skill.id)).one()
+        return count, max_id or 0
+
+    @staticmethod
+    def _build(db: Session, version: Tuple[int, int]) -> CatalogSnapshot:
+        skills = db.query(models.Skill).order_by(models.Skill.id).all()
+        body = schemas.SkillList.dump_json(schemas.SkillList.validate_python(skills, from_attributes=True))
+        bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if zstandard is not None:
+            bodies["zstd"] = zstandard.ZstdCompressor(level=19).compress(body)
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        print(f"Skill catalog rebuilt: {len(skills)} skills, {len(body)} bytes.")
+        return CatalogSnapshot(version=version, etag=etag, bodies=bodies)
+
+
+def choose_encoding(snapshot: CatalogSnapshot, accept_encoding: str) -> str:
+    """Picks the smallest pre-compressed body the client accepts."""
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    for encoding in ("zstd", "gzip"):
+        if encoding in accepted and encoding in snapshot.bodies:
+            return encoding
+    return "identity"
+
+
+def entity_tag(snapshot: CatalogSnapshot, encoding: str) -> str:
+    # Strong validators must differ between encodings of the same content.
+    if encoding == "identity":
+        return f'"{snapshot.etag}"'
+    return f'"{snapshot.etag}-{encoding}"'
+
+
+def matches_if_none_match(snapshot: CatalogSnapshot, if_none_match: Optional[str]) -> bool:
+    """True when the client already holds this version, in any encoding."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"').split("-")[0] == snapshot.etag:
+            return True
+    return False
+
+
+# A single shared catalog for the whole process.
+skill_catalog = SkillCatalog()
@@ -0,0 +1,478 @@
+"""
+k-NN index over job embeddings, stored as memory-mapped segments.
+
+Vectors are L2-normalized rows, float32 or int8 with a per-row scale, so
+cosine similarity is one matrix-vector product. Location and skill pre-filters
+are answered from CSR row lists (key -> rows) and applied before ranking.
+
+On disk, an index directory holds immutable segments plus a CURRENT file naming
+the live one:
+
+    job_index/
+        CURRENT                    e.g. "1718000000000000000-4242"
+        segments/<name>/*.npy      job ids, vectors, scales, filter row lists
+
+Segments are written under a temporary name, renamed into place, and published
+by atomically replacing CURRENT. Readers open them with np.load(mmap_mode="r"),
+which takes milliseconds, and every worker shares the same pages through the OS
+page cache instead of holding its own copy.
+
+Large indexes can also carry an IVF (inverted file) structure for approximate
+search: k-means centroids and, per centroid, the rows closest to it. A query
+scores only the rows of its nprobe closest centroids; nprobe trades recall for
+latency (0 searches exactly). Centroids are reused by later segments, so an
+ingestion run only assigns vectors to them, until the index has grown enough
+since training to need new ones.
+
+An incremental ingestion run publishes merged(): the current segment with the
+rows of the jobs it changed replaced and those of deleted jobs dropped, so only
+the changed vectors are read back from Chroma.
+
+No database access: ingest_job.py and the benchmarks use this module directly.
+"""
+import math
+import os
+import shutil
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Below this fraction of candidate rows, score only the candidates instead of
+# scoring every row and masking the rest out.
+SUBSET_SCORING_FRACTION = 0.25
+# int8 rows are widened to float32 this many at a time while scoring.
+INT8_BLOCK_ROWS = 16384
+# Segments kept besides the current one, for workers still reading them.
+KEEP_OLD_SEGMENTS = 1
+CHROMA_PAGE_SIZE = 5000
+
+# --- IVF Settings ---
+# Centroid lists probed per query; more is slower and closer to exact. 0 = exact.
+IVF_NPROBE = int(os.getenv("JOB_SEARCH_NPROBE", "8"))
+# Smaller indexes are searched exactly: brute force is already fast there.
+IVF_MIN_ROWS = 20000
+# Retrain the centroids once the index has this many times the rows they were trained on.
+IVF_RETRAIN_GROWTH = 2.0
+IVF_TRAIN_SAMPLE = 50000
+
+_ARRAYS = (
+    "job_ids", "vectors", "scales",
+    "location_keys", "location_offsets", "location_rows",
+    "skill_keys", "skill_offsets", "skill_rows",
+    "ivf_centroids", "ivf_offsets", "ivf_rows", "ivf_trained_rows",
+)
+_NO_IVF = {
+    "ivf_centroids": np.empty((0, 0), dtype=np.float32),
+    "ivf_offsets": np.zeros(1, dtype=np.int64),
+    "ivf_rows": np.empty(0, dtype=np.int64),
+    "ivf_trained_rows": np.zeros(1, dtype=np.int64),
+}
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize_rows(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization: vectors ~= quantized * scales[:, None]."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best])]
+
+
+def group_rows(keys: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(row, key) pairs -> CSR: sorted unique keys, offsets, and the rows of each key."""
+    if not len(keys):
+        return keys, np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int64)
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(inverse, minlength=len(unique_keys)))])
+    return unique_keys, offsets.astype(np.int64), rows[order].astype(np.int64)
+
+
+def default_ivf_lists(rows: int) -> int:
+    return max(1, min(rows, int(4 * math.sqrt(rows))))
+
+
+def train_ivf_centroids(vectors: np.ndarray, nlist: int) -> np.ndarray:
+    """Spherical k-means (on unit vectors) over a sample of the rows."""
+    from sklearn.cluster import MiniBatchKMeans
+
+    rng = np.random.default_rng(0)
+    sample = vectors
+    if len(vectors) > IVF_TRAIN_SAMPLE:
+        sample = vectors[np.sort(rng.choice(len(vectors), IVF_TRAIN_SAMPLE, replace=False))]
+    kmeans = MiniBatchKMeans(n_clusters=nlist, batch_size=4096, n_init=1, random_state=0)
+    kmeans.fit(np.asarray(sample, dtype=np.float32))
+    return normalize_rows(kmeans.cluster_centers_)
+
+
+def parse_skill_ids(value: str) -> List[int]:
+    """',3,17,' (ingestion metadata) -> [3, 17]"""
+    return [int(part) for part in value.split(",") if part]
+
+
+def _chroma_pages(store, ids: Optional[Sequence[str]] = None):
+    include = ["embeddings", "metadatas"]
+    if ids is not None:
+        for start in range(0, len(ids), CHROMA_PAGE_SIZE):
+            yield store.get(ids=list(ids[start:start + CHROMA_PAGE_SIZE]), include=include)
+        return
+    offset = 0
+    while True:
+        page = store.get(include=include, limit=CHROMA_PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            return
+        yield page
+        offset += len(page["ids"])
+
+
+class JobVectorIndex:
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """Wraps prepared arrays (see build() and open()); use those instead."""
+        # For an index made by merged(): the row of the previous index each row was
+        # copied from, -1 for new rows. None otherwise.
+        self.carried_rows: Optional[np.ndarray] = None
+        self.job_ids = arrays["job_ids"]
+        self.vectors = arrays["vectors"]
+        self.scales = arrays["scales"] if arrays["scales"].size else None
+        self._arrays = {**_NO_IVF, **arrays}
+        self.ivf_centroids = self._arrays["ivf_centroids"] if self._arrays["ivf_centroids"].size else None
+        self._rows_by_location = self._csr_dict("location")
+        self._rows_by_skill = {int(key): rows for key, rows in self._csr_dict("skill").items()}
+
+    def _csr_dict(self, name: str) -> dict:
+        keys, offsets, rows = (self._arrays[f"{name}_{part}"] for part in ("keys", "offsets", "rows"))
+        return {key: rows[offsets[i]:offsets[i + 1]] for i, key in enumerate(keys.tolist())}
+
+    @classmethod
+    def build(
+        cls,
+        job_ids: Sequence[int],
+        vectors: np.ndarray,
+        locations: Sequence[str],
+        skill_ids: Sequence[Iterable[int]],
+        quantize: bool = False,
+    ) -> "JobVectorIndex":
+        """locations are normalized location areas; skill_ids the required skills per row."""
+        job_ids = np.asarray(job_ids, dtype=np.int64)
+        vectors = normalize_rows(vectors) if len(job_ids) else np.empty((0, 0), dtype=np.float32)
+        scales = np.empty(0, dtype=np.float32)
+        if quantize and len(job_ids):
+            vectors, scales = quantize_rows(vectors)
+        skill_pairs = [(row, skill_id) for row, skills in enumerate(skill_ids) for skill_id in skills]
+        return cls._assemble(
+            job_ids, vectors, scales, np.asarray(locations, dtype=str),
+            np.asarray([row for row, _ in skill_pairs], dtype=np.int64),
+            np.asarray([skill_id for _, skill_id in skill_pairs], dtype=np.int64),
+        )
+
+    @classmethod
+    def _assemble(
+        cls,
+        job_ids: np.ndarray,
+        vectors: np.ndarray,
+        scales: np.ndarray,
+        locations: np.ndarray,
+        skill_pair_rows: np.ndarray,
+        skill_pair_keys: np.ndarray,
+    ) -> "JobVectorIndex":
+        """An index from stored (normalized, maybe quantized) rows and (row, skill id) pairs."""
+        location_keys, location_offsets, location_rows = group_rows(locations, np.arange(len(job_ids)))
+        skill_keys, skill_offsets, skill_rows = group_rows(skill_pair_keys, skill_pair_rows)
+        return cls({
+            "job_ids": job_ids, "vectors": vectors, "scales": scales,
+            "location_keys": location_keys, "location_offsets": location_offsets, "location_rows": location_rows,
+            "skill_keys": skill_keys, "skill_offsets": skill_offsets, "skill_rows": skill_rows,
+        })
+
+    def build_ivf(self, nlist: Optional[int] = None, previous: Optional["JobVectorIndex"] = None):
+        """
+        Adds IVF lists for approximate search. The centroids of previous (e.g. the
+        current segment) are reused when compatible, so only the assignment runs,
+        and when this index was merged() from previous, only for its new rows.
+        """
+        centroids, trained_rows, reused = None, len(self), False
+        if previous is not None and previous.ivf_centroids is not None:
+            compatible = previous.ivf_centroids.shape[1] == self.vectors.shape[1] and (
+                nlist is None or nlist == len(previous.ivf_centroids)
+            )
+            previous_trained = int(previous._arrays["ivf_trained_rows"][0])
+            if compatible and len(self) <= IVF_RETRAIN_GROWTH * previous_trained:
+                centroids, trained_rows, reused = np.asarray(previous.ivf_centroids), previous_trained, True
+        if centroids is None:
+            centroids = train_ivf_centroids(self._float_rows(), nlist or default_ivf_lists(len(self)))
+
+        assignments = np.empty(len(self), dtype=np.int64)
+        unassigned = np.arange(len(self))
+        if reused and self.carried_rows is not None:
+            # Rows copied from previous keep their lists.
+            carried = self.carried_rows >= 0
+            assignments[carried] = previous.ivf_assignments()[self.carried_rows[carried]]
+            unassigned = np.flatnonzero(~carried)
+        for start in range(0, len(unassigned), INT8_BLOCK_ROWS):
+            rows = unassigned[start:start + INT8_BLOCK_ROWS]
+            assignments[rows] = np.argmax(self._float_rows(rows) @ centroids.T, axis=1)
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=len(centroids)))])
+        self._arrays.update({
+            "ivf_centroids": centroids.astype(np.float32),
+            "ivf_offsets": offsets.astype(np.int64),
+            "ivf_rows": order.astype(np.int64),
+            "ivf_trained_rows": np.asarray([trained_rows], dtype=np.int64),
+        })
+        self.ivf_centroids = self._arrays["ivf_centroids"]
+
+    def _float_rows(self, rows=slice(None)) -> np.ndarray:
+        """Rows as float32 unit vectors (dequantized if needed)."""
+        vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[rows][:, None]
+        return vectors
+
+    def ivf_assignments(self) -> np.ndarray:
+        """The IVF list of every row."""
+        offsets, rows = self._arrays["ivf_offsets"], self._arrays["ivf_rows"]
+        assignments = np.empty(len(self), dtype=np.int64)
+        assignments[rows] = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        return assignments
+
+    def probe_rows(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Sorted rows in the IVF lists of the nprobe centroids closest to a unit query."""
+        offsets, rows = self._arrays["ivf_offsets"], self._arrays["ivf_rows"]
+        lists = top_k(self.ivf_centroids @ query, nprobe)
+        return np.sort(np.concatenate([rows[offsets[i]:offsets[i + 1]] for i in lists]))
+
+    @classmethod
+    def empty(cls) -> "JobVectorIndex":
+        return cls.build([], np.empty((0, 0)), [], [])
+
+    @classmethod
+    def from_chroma(cls, store, quantize: bool = False, ids: Optional[Sequence[str]] = None) -> "JobVectorIndex":
+        """
+        Builds an index from the vectors in the Chroma collection written by
+        ingest_job.py: all of them, or those with the given ids. Pages are read
+        straight into preallocated arrays.
+        """
+        total = store.count() if ids is None else len(ids)
+        job_ids = np.empty(total, dtype=np.int64)
+        vectors = np.empty((0, 0), dtype=np.float32)
+        locations, skill_ids = [], []
+        filled = 0
+        for page in _chroma_pages(store, ids):
+            # Rows added after count() are left for the next run.
+            count = min(len(page["ids"]), total - filled)
+            if not count:
+                break
+            embeddings, metadatas = page["embeddings"][:count], page["metadatas"][:count]
+            if not filled:
+                vectors = np.empty((total, len(embeddings[0])), dtype=np.float32)
+            vectors[filled:filled + count] = embeddings
+            for i, metadata in enumerate(metadatas, start=filled):
+                job_ids[i] = metadata["job_id"]
+                # Vectors ingested before these fields existed simply never match a filter.
+                locations.append(metadata.get("location_area_norm", ""))
+                skill_ids.append(parse_skill_ids(metadata.get("skill_ids", "")))
+            filled += count
+        return cls.build(job_ids[:filled], vectors[:filled], locations, skill_ids, quantize)
+
+    def merged(self, changed: "JobVectorIndex", removed_job_ids: Iterable[int] = ()) -> "JobVectorIndex":
+        """
+        This index with its rows for the jobs in changed replaced by changed's rows
+        and the rows of removed_job_ids dropped. Rows are copied as stored, so both
+        indexes must be quantized alike. The result's carried_rows maps its rows
+        back to this index.
+        """
+        if len(self) and len(changed) and (
+            (self.scales is None) != (changed.scales is None) or self.vectors.shape[1] != changed.vectors.shape[1]
+        ):
+            raise ValueError("Cannot merge indexes with different vector formats")
+        replaced = np.concatenate([changed.job_ids, np.fromiter(removed_job_ids, dtype=np.int64)])
+        kept = np.flatnonzero(~np.isin(self.job_ids, replaced))
+        new_row = np.full(len(self), -1, dtype=np.int64)
+        new_row[kept] = np.arange(len(kept))
+
+        parts = [part for part in ((self, kept), (changed, np.arange(len(changed)))) if len(part[1])]
+        if not parts:
+            return type(self).empty()
+        vectors = np.concatenate([np.asarray(index.vectors[rows]) for index, rows in parts])
+        scales = (np.concatenate([np.asarray(index.scales[rows]) for index, rows in parts])
+                  if parts[0][0].scales is not None else np.empty(0, dtype=np.float32))
+
+        own_rows, own_keys = self._skill_pairs()
+        own_rows = new_row[own_rows]
+        changed_rows, changed_keys = changed._skill_pairs()
+        carried = own_rows >= 0
+        index = self._assemble(
+            np.concatenate([self.job_ids[kept], changed.job_ids]),
+            vectors,
+            scales,
+            np.concatenate([self._row_locations()[kept], changed._row_locations()]),
+            np.concatenate([own_rows[carried], changed_rows + len(kept)]),
+            np.concatenate([own_keys[carried], changed_keys]),
+        )
+        index.carried_rows = np.concatenate([kept, np.full(len(changed), -1, dtype=np.int64)])
+        return index
+
+    def export_rows(self) -> Tuple[np.ndarray, np.ndarray, List[str], List[List[int]]]:
+        """(job ids, float32 unit vectors, locations, skill ids) per row, as build() takes them."""
+        skills: List[List[int]] = [[] for _ in range(len(self))]
+        for row, skill_id in zip(*(part.tolist() for part in self._skill_pairs())):
+            skills[row].append(skill_id)
+        return np.asarray(self.job_ids), self._float_rows(), self._row_locations().tolist(), skills
+
+    def _row_locations(self) -> np.ndarray:
+        keys, offsets, rows = (self._arrays[f"location_{part}"] for part in ("keys", "offsets", "rows"))
+        locations = np.empty(len(self), dtype=keys.dtype if len(keys) else str)
+        locations[rows] = np.repeat(keys, np.diff(offsets))
+        return locations
+
+    def _skill_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(row, skill id) pairs, as two arrays."""
+        keys, offsets, rows = (self._arrays[f"skill_{part}"] for part in ("keys", "offsets", "rows"))
+        return np.asarray(rows, dtype=np.int64), np.repeat(np.asarray(keys, dtype=np.int64), np.diff(offsets))
+
+    # --- Segments ---
+    def save(self, directory: str) -> str:
+        """Writes this index as a new segment and makes it the current one. Returns its name."""
+        segments = os.path.join(directory, "segments")
+        os.makedirs(segments, exist_ok=True)
+        name = f"{time.time_ns()}-{os.getpid()}"
+        tmp_path = os.path.join(segments, f".{name}.tmp")
+        os.makedirs(tmp_path)
+        for key in _ARRAYS:
+            np.save(os.path.join(tmp_path, f"{key}.npy"), self._arrays[key], allow_pickle=False)
+        os.rename(tmp_path, os.path.join(segments, name))
+
+        # Publish: readers see either the old CURRENT or the new one, never a partial file.
+        current_tmp = os.path.join(directory, f"CURRENT.{os.getpid()}.tmp")
+        with open(current_tmp, "w") as f:
+            f.write(name)
+        os.replace(current_tmp, os.path.join(directory, "CURRENT"))
+        self._remove_old_segments(segments, keep=name)
+        return name
+
+    @staticmethod
+    def _remove_old_segments(segments: str, keep: str):
+        names = sorted(n for n in os.listdir(segments) if not n.startswith(".") and n != keep)
+        for name in names[:max(0, len(names) - KEEP_OLD_SEGMENTS)]:
+            # Workers that still have it mapped keep reading it; on Windows the
+            # delete fails while it is open and is retried after the next ingest.
+            shutil.rmtree(os.path.join(segments, name), ignore_errors=True)
+
+    @staticmethod
+    def current_segment(directory: str) -> Optional[str]:
+        try:
+            with open(os.path.join(directory, "CURRENT")) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def open(cls, directory: str, segment: Optional[str] = None) -> Optional["JobVectorIndex"]:
+        """Memory-maps the current (or given) segment, or returns None if there is none yet."""
+        segment = segment or cls.current_segment(directory)
+        if segment is None:
+            return None
+        path = os.path.join(directory, "segments", segment)
+        return cls({
+            key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r")
+            for key in _ARRAYS if os.path.exists(os.path.join(path, f"{key}.npy"))
+        })
+
+    # --- Searching ---
+    def __len__(self) -> int:
+        return len(self.job_ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def candidate_rows(
+        self, skill_ids: Optional[Sequence[int]] = None, location_area: Optional[str] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Sorted rows passing the filters, or None when there are no filters.
+        skill_ids matches rows requiring any of the skills; location_area is a
+        prefix of the normalized location, as on GET /jobs/.
+        """
+        rows = None
+        if skill_ids is not None:
+            parts = [self._rows_by_skill[s] for s in set(skill_ids) if s in self._rows_by_skill]
+            rows = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        if location_area:
+            parts = [r for location, r in self._rows_by_location.items() if location.startswith(location_area)]
+            location_rows = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+            rows = location_rows if rows is None else np.intersect1d(rows, location_rows, assume_unique=True)
+        return rows
+
+    def scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of a unit query with every row (or the given rows)."""
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        if self.scales is None:
+            return vectors @ query
+        scores = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), INT8_BLOCK_ROWS):
+            block = vectors[start:start + INT8_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        return scores * (self.scales if rows is None else self.scales[rows])
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        skill_ids: Optional[Sequence[int]] = None,
+        location_area: Optional[str] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        (job_id, cosine similarity) for the k nearest jobs, best first. With IVF
+        lists, only the rows of the nprobe closest lists are scored (default
+        IVF_NPROBE; 0 or >= the number of lists is exact). Filters that leave few
+        rows are always searched exactly, and so is any search whose probed lists
+        hold fewer than k candidates, so a filter never costs results.
+        """
+        if not len(self):
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        rows = self.candidate_rows(skill_ids, location_area)
+        nprobe = IVF_NPROBE if nprobe is None else nprobe
+        approximate = self.ivf_centroids is not None and 0 < nprobe < len(self.ivf_centroids)
+        if approximate and (rows is None or len(rows) >= SUBSET_SCORING_FRACTION * len(self)):
+            probed = self.probe_rows(query, nprobe)
+            probed = probed if rows is None else np.intersect1d(rows, probed, assume_unique=True)
+            # Too few of the candidates sit in the probed lists: search them all exactly instead.
+            if len(probed) >= k:
+                scores = self.scores(query, probed)
+                best = top_k(scores, k)
+                return [(int(self.job_ids[probed[i]]), float(scores[i])) for i in best]
+        if rows is None:
+            scores = self.scores(query)
+            best = top_k(scores, k)
+            return [(int(self.job_ids[i]), float(scores[i])) for i in best]
+        if not len(rows):
+            return []
+        if len(rows) < SUBSET_SCORING_FRACTION * len(self):
+            scores = self.scores(query, rows)
+            best = top_k(scores, k)
+            return [(int(self.job_ids[rows[i]]), float(scores[i])) for i in best]
+        scores = self.scores(query)
+        masked = np.full(len(self), -np.inf, dtype=np.float32)
+        masked[rows] = scores[rows]
+        best = top_k(masked, min(k, len(rows)))
+        return [(int(self.job_ids[i]), float(scores[i])) for i in best]
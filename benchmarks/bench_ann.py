@@ -0,0 +1,83 @@
+"""
+Approximate vs exact job search benchmark.
+
+Builds a JobVectorIndex with IVF lists over a synthetic corpus and, for a range
+of nprobe values, reports recall@k against exact brute-force search and single
+query throughput. Use it to pick JOB_SEARCH_NPROBE (and INGEST_IVF_LISTS).
+
+Clustered random vectors are kinder to IVF than real embeddings, so check the
+chosen nprobe on the real vectors of an index version published by
+ingest_job.py with --index: its jobs are re-indexed (with fresh IVF lists)
+without --queries randomly held-out jobs, which then serve as the queries.
+
+    python -m benchmarks.bench_ann --jobs 100000
+    python -m benchmarks.bench_ann --jobs 200000 --lists 1024 --nprobe 4 8 16 32
+    python -m benchmarks.bench_ann --index index_versions/<version>
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from app.vector_index import JobVectorIndex, default_ivf_lists
+from benchmarks.bench_job_search import make_corpus
+
+
+def run_queries(index, queries, k, nprobe):
+    started = time.perf_counter()
+    results = [[job_id for job_id, _ in index.search(query, k, nprobe=nprobe)] for query in queries]
+    return results, len(queries) / (time.perf_counter() - started)
+
+
+def load_exported(directory, queries, seed=1):
+    """Real rows from an exported segment: (job ids, vectors, locations, skills) and held-out query vectors."""
+    exported = JobVectorIndex.open(directory)
+    if exported is None or len(exported) <= queries:
+        sys.exit(f"No index segment with more than {queries} jobs in {directory}")
+    job_ids, vectors, locations, skills = exported.export_rows()
+    held_out = np.zeros(len(job_ids), dtype=bool)
+    held_out[np.random.default_rng(seed).choice(len(job_ids), queries, replace=False)] = True
+    rest = np.flatnonzero(~held_out)
+    return (job_ids[rest], vectors[rest], [locations[i] for i in rest], [skills[i] for i in rest]), vectors[held_out]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure IVF recall@k and QPS against exact search.")
+    parser.add_argument("--jobs", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=0, help="IVF lists (0: about 4 * sqrt(jobs))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--quantize", action="store_true", help="int8 vectors instead of float32")
+    parser.add_argument("--index", help="directory of a published index (e.g. an index version) to use "
+                                        "instead of a synthetic corpus; --jobs and --dim are ignored")
+    args = parser.parse_args()
+
+    if args.index:
+        (job_ids, vectors, locations, skills), queries = load_exported(args.index, args.queries)
+    else:
+        job_ids, vectors, locations, skills = make_corpus(args.jobs, args.dim, locations=100, skills=200)
+        rng = np.random.default_rng(1)
+        queries = vectors[rng.integers(0, args.jobs, args.queries)] + 0.3 * rng.standard_normal(
+            (args.queries, args.dim)).astype(np.float32)
+    index = JobVectorIndex.build(job_ids, vectors, locations, skills, quantize=args.quantize)
+    nlist = args.lists or default_ivf_lists(len(index))
+    started = time.perf_counter()
+    index.build_ivf(nlist=nlist)
+    print(f"{len(index)} {'real' if args.index else 'synthetic'} jobs x {vectors.shape[1]} dims, "
+          f"{nlist} IVF lists trained and assigned in {time.perf_counter() - started:.1f} s")
+
+    exact, exact_qps = run_queries(index, queries, args.k, nprobe=0)
+    print(f"{'exact':<12} recall@{args.k} 1.000   {exact_qps:8.1f} QPS")
+    for nprobe in args.nprobe:
+        if nprobe >= nlist:
+            continue
+        approximate, qps = run_queries(index, queries, args.k, nprobe=nprobe)
+        recall = np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approximate, exact)])
+        print(f"nprobe={nprobe:<5} recall@{args.k} {recall:.3f}   {qps:8.1f} QPS   ({qps / exact_qps:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
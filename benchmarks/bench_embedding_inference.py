@@ -0,0 +1,143 @@
+"""
+Embedding inference throughput and int8 parity benchmark.
+
+Embeds synthetic job documents (formatted like ingest_job.prepare_documents,
+with descriptions of varying length, no database needed) with the real model,
+bypassing the embedding cache, in three configurations:
+
+    fp32            HuggingFaceEmbeddings, what EMBEDDING_INFERENCE=fp32 runs
+    fp32 bucketed   BucketedEmbeddings without quantization
+    int8 bucketed   BucketedEmbeddings with dynamic int8, EMBEDDING_INFERENCE=int8
+
+and reports documents per second for each thread count given. It then compares
+the int8 vectors with the fp32 ones: per-document cosine similarity, and how
+many of each query's top 10 documents are the same. The exit status is 1 when
+the lowest cosine is under PARITY_MIN_COSINE, so it can gate turning int8 on.
+
+Synthetic postings are only a stand-in: before turning int8 on in production,
+run the gate on real ones. --from-db reads up to --docs jobs from MySQL and
+formats them exactly as ingest_job.py does; --postings reads one document per
+line from a file instead (e.g. exported from another environment).
+
+    python -m benchmarks.bench_embedding_inference
+    python -m benchmarks.bench_embedding_inference --docs 5000 --threads 1 2 4 8
+    python -m benchmarks.bench_embedding_inference --from-db --docs 20000
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from app.embedding_inference import PARITY_MIN_COSINE, BucketedEmbeddings, cosine_parity, physical_cores
+from app.embeddings import EMBEDDING_MODEL_NAME
+
+TITLES = ["Plumber", "Electrician", "Carpenter", "Painter", "Welder", "Mason", "Driver", "Cook",
+          "Security Guard", "Housekeeper", "AC Technician", "Tailor", "Delivery Partner", "Mechanic"]
+AREAS = ["Andheri West", "Kothrud", "Whitefield", "Salt Lake", "Gachibowli", "Navrangpura", "Adyar"]
+WORDS = ("experienced reliable urgent daily wages weekly payment site work residential commercial "
+         "repair installation maintenance tools provided morning shift night shift overtime helper "
+         "license required two wheeler food accommodation contract permanent immediate joining").split()
+QUERIES = ["plumber needed for bathroom repair", "night shift security guard job",
+           "electrician for new flats wiring", "cook for a small restaurant", "driver with license",
+           "painter for an office building", "AC service technician", "tailor for boutique"]
+
+
+def make_documents(count, seed=0):
+    rng = np.random.default_rng(seed)
+    documents = []
+    for _ in range(count):
+        title = rng.choice(TITLES)
+        # Postings range from one line to a few paragraphs; bucketing pays off on that spread.
+        description = " ".join(rng.choice(WORDS, size=int(rng.lognormal(3.0, 0.8))))
+        skills = ", ".join(rng.choice(TITLES, size=rng.integers(1, 4), replace=False))
+        documents.append(
+            f"Job Title: {title}. Location: {rng.choice(AREAS)}. "
+            f"Description: {description}. Required Skills: {skills}."
+        )
+    return documents
+
+
+def read_postings(path, count):
+    with open(path, encoding="utf-8") as f:
+        documents = [line.strip() for line in f if line.strip()]
+    return documents[:count]
+
+
+def fetch_postings(count):
+    """Up to count real job documents, formatted as ingest_job.py embeds them."""
+    # Imported here: ingest_job connects to MySQL and needs chromadb, which the synthetic run doesn't.
+    from ingest_job import EPOCH, prepare_documents, stream_changed_jobs
+    documents = []
+    for jobs in stream_changed_jobs(EPOCH, 0, min(count, 1000)):
+        documents.extend(prepare_documents(jobs)[0])
+        if len(documents) >= count:
+            break
+    return documents[:count]
+
+
+def throughput(embed, documents):
+    embed(documents[:64])  # warm up
+    started = time.perf_counter()
+    vectors = np.asarray(embed(documents), dtype=np.float32)
+    return vectors, len(documents) / (time.perf_counter() - started)
+
+
+def top_k(queries, documents, k):
+    return np.argsort(-(queries @ documents.T), axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure embedding throughput and int8 parity against fp32.")
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[physical_cores()])
+    parser.add_argument("--batch-size", type=int, default=32, help="texts per batch or bucket")
+    parser.add_argument("--k", type=int, default=10)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--from-db", action="store_true", help="real postings from MySQL instead of synthetic ones")
+    source.add_argument("--postings", help="file with one real posting per line")
+    args = parser.parse_args()
+
+    import torch
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    if args.from_db:
+        documents = fetch_postings(args.docs)
+    elif args.postings:
+        documents = read_postings(args.postings, args.docs)
+    else:
+        documents = make_documents(args.docs)
+    if not documents:
+        sys.exit("No postings to embed")
+    configurations = {
+        "fp32": HuggingFaceEmbeddings(model_name=args.model, encode_kwargs={"batch_size": args.batch_size}),
+        "fp32 bucketed": BucketedEmbeddings(args.model, bucket_size=args.batch_size),
+        "int8 bucketed": BucketedEmbeddings(args.model, quantize=True, bucket_size=args.batch_size),
+    }
+    kind = "synthetic" if not (args.from_db or args.postings) else "real"
+    print(f"{len(documents)} {kind} documents, {args.model}, {physical_cores()} physical cores")
+    vectors = {}
+    for threads in args.threads:
+        torch.set_num_threads(threads)
+        for name, embeddings in configurations.items():
+            vectors[name], docs_per_second = throughput(embeddings.embed_documents, documents)
+            print(f"{threads:>2} threads  {name:<14} {docs_per_second:8.1f} docs/s")
+
+    cosines = cosine_parity(vectors["fp32"], vectors["int8 bucketed"])
+    print(f"int8 vs fp32 cosine: mean {cosines.mean():.5f}  p1 {np.percentile(cosines, 1):.5f}  "
+          f"min {cosines.min():.5f}  (required {PARITY_MIN_COSINE})")
+    queries = {name: np.asarray(configurations[name].embed_documents(QUERIES), dtype=np.float32)
+               for name in ("fp32", "int8 bucketed")}
+    reference = top_k(queries["fp32"], vectors["fp32"], args.k)
+    candidate = top_k(queries["int8 bucketed"], vectors["int8 bucketed"], args.k)
+    overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(reference, candidate)])
+    print(f"int8 top-{args.k} overlap with fp32: {overlap:.3f}")
+    if cosines.min() < PARITY_MIN_COSINE:
+        print("int8 parity check FAILED: keep EMBEDDING_INFERENCE=fp32 for this model")
+        sys.exit(1)
+    print("int8 parity check passed")
+
+
+if __name__ == "__main__":
+    main()
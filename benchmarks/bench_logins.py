@@ -0,0 +1,77 @@
+"""
+Login throughput benchmark.
+
+Hammers POST /token on a running API with concurrent logins and, at the same
+time, probes a cheap endpoint to show whether the rest of the API stays responsive.
+
+    uvicorn app.main:app --workers 1 &
+    python benchmarks/bench_logins.py --phone 9999999999 --password secret
+
+The user must already exist (sign up through /signup/ first).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def login_loop(client, args, deadline, results):
+    form = {"username": args.phone, "password": args.password}
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.post("/token", data=form)
+        results.setdefault(response.status_code, []).append(time.perf_counter() - started)
+
+
+async def probe_loop(client, deadline, latencies):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await client.get("/")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.05)
+
+
+def median(values):
+    # The probe can starve completely during a storm, leaving no samples.
+    return statistics.median(values) if values else float("nan")
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure logins per second against a running API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--phone", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    args = parser.parse_args()
+
+    results, probe_latencies = {}, []
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(
+            probe_loop(client, deadline, probe_latencies),
+            *(login_loop(client, args, deadline, results) for _ in range(args.concurrency)),
+        )
+
+    ok = results.get(200, [])
+    print(f"Duration:           {args.duration:.1f} s, concurrency {args.concurrency}")
+    print(f"Successful logins:  {len(ok)} ({len(ok) / args.duration:.1f} logins/sec)")
+    for code, latencies in sorted(results.items()):
+        print(f"  HTTP {code}: {len(latencies)} responses, "
+              f"p50 {median(latencies) * 1000:.0f} ms, p95 {percentile(latencies, 0.95) * 1000:.0f} ms")
+    print(f"GET / during storm: p50 {median(probe_latencies) * 1000:.1f} ms, "
+          f"p95 {percentile(probe_latencies, 0.95) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
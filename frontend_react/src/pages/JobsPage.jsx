@@ -1,5 +1,5 @@
 // src/pages/JobsPage.jsx
-import React, { useEffect, useState, useContext } from "react";
+import React, { useEffect, useRef, useState, useContext } from "react";
 import {
   Toolbar,
   Typography,
@@ -73,52 +73,63 @@ export default function JobsPage() {
   const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState("");
   const [search, setSearch] = useState("");
+  const [skill, setSkill] = useState("");
+  const [location, setLocation] = useState("");
   const [limit] = useState(8);
   const [hasMore, setHasMore] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
 
   const [selectedJob, setSelectedJob] = useState(null);
   const [dialogOpen, setDialogOpen] = useState(false);
 
+  // Only the latest request may update the page, so a slow response for old filters can't overwrite it.
+  const requestId = useRef(0);
+
+  // The server filters the whole board (GET /jobs/?q=&skill=&location_area=), not just the loaded pages.
+  const filters = {};
+  if (search.trim()) filters.q = search.trim();
+  if (skill.trim()) filters.skill = [skill.trim()];
+  if (location.trim()) filters.location_area = location.trim();
+
   useEffect(() => {
-    loadJobs(0, true);
+    // Reload from the first page once typing pauses.
+    const timer = setTimeout(() => loadJobs(null, true), 300);
+    return () => clearTimeout(timer);
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, []);
+  }, [search, skill, location]);
 
-  async function loadJobs(skip = 0, replace = false) {
+  async function loadJobs(cursor = null, replace = false) {
+    const current = ++requestId.current;
     try {
-      if (skip === 0) setLoading(true);
+      if (!cursor) setLoading(true);
       else setLoadingMore(true);
       setError("");
 
-      const data = await fetchJobs(skip, limit);
-      let arr = Array.isArray(data) ? data : data?.items ?? data?.results ?? [];
+      const { items, nextCursor: cursorAfter } = await fetchJobs(cursor, limit, filters);
+      if (current !== requestId.current) return;
+      let arr = Array.isArray(items) ? items : items?.items ?? items?.results ?? [];
 
       if (!Array.isArray(arr)) throw new Error("Unexpected jobs response format");
 
       if (replace) setJobs(arr);
       else setJobs((prev) => [...prev, ...arr]);
 
-      setHasMore(arr.length === limit);
+      setNextCursor(cursorAfter);
+      setHasMore(Boolean(cursorAfter));
     } catch (err) {
+      if (current !== requestId.current) return;
       console.error("Failed to fetch jobs:", err);
       setError(err.response?.data || err.message || "Failed to load jobs");
       setJobs([]);
     } finally {
-      setLoading(false);
-      setLoadingMore(false);
+      if (current === requestId.current) {
+        setLoading(false);
+        setLoadingMore(false);
+      }
     }
   }
 
-  const handleLoadMore = () => loadJobs(jobs.length, false);
-
-  const filteredJobs = jobs.filter((job) => {
-    if (!search) return true;
-    const q = search.toLowerCase();
-    const title = (job?.title ?? job?.job_title ?? "").toString().toLowerCase();
-    const company = (getEmployerName(job) || "").toString().toLowerCase();
-    const loc = (job?.location ?? job?.location_area ?? job?.city ?? "").toString().toLowerCase();
-    return title.includes(q) || company.includes(q) || loc.includes(q);
-  });
+  const handleLoadMore = () => loadJobs(nextCursor, false);
 
   const openDetails = (job) => {
     setSelectedJob(job);
@@ -134,20 +145,36 @@ export default function JobsPage() {
         <Stack direction={{ xs: "column", sm: "row" }} justifyContent="space-between" alignItems="center" spacing={2} mb={3}>
           <Typography variant="h4" fontWeight={700}>Browse Jobs</Typography>
 
-          <TextField
-            size="small"
-            placeholder="Search by title, company or location"
-            value={search}
-            onChange={(e) => setSearch(e.target.value)}
-            InputProps={{
-              startAdornment: (
-                <InputAdornment position="start">
-                  <SearchIcon />
-                </InputAdornment>
-              ),
-            }}
-            sx={{ width: { xs: "100%", sm: 360 } }}
-          />
+          <Stack direction={{ xs: "column", md: "row" }} spacing={1} sx={{ width: { xs: "100%", md: "auto" } }}>
+            <TextField
+              size="small"
+              placeholder="Search title or description"
+              value={search}
+              onChange={(e) => setSearch(e.target.value)}
+              InputProps={{
+                startAdornment: (
+                  <InputAdornment position="start">
+                    <SearchIcon />
+                  </InputAdornment>
+                ),
+              }}
+              sx={{ width: { xs: "100%", md: 280 } }}
+            />
+            <TextField
+              size="small"
+              placeholder="Skill, e.g. Plumber"
+              value={skill}
+              onChange={(e) => setSkill(e.target.value)}
+              sx={{ width: { xs: "100%", md: 180 } }}
+            />
+            <TextField
+              size="small"
+              placeholder="Location, e.g. Adajan"
+              value={location}
+              onChange={(e) => setLocation(e.target.value)}
+              sx={{ width: { xs: "100%", md: 180 } }}
+            />
+          </Stack>
         </Stack>
 
         {loading ? (
@@ -157,20 +184,20 @@ export default function JobsPage() {
         ) : error ? (
           <Box textAlign="center" py={6}>
             <Typography color="error">{String(error)}</Typography>
-            <Button sx={{ mt: 2 }} variant="contained" onClick={() => loadJobs(0, true)}>Retry</Button>
+            <Button sx={{ mt: 2 }} variant="contained" onClick={() => loadJobs(null, true)}>Retry</Button>
           </Box>
         ) : (
           <>
             <Grid container spacing={3}>
-              {filteredJobs.length === 0 ? (
+              {jobs.length === 0 ? (
                 <Grid item xs={12}>
                   <Box textAlign="center" py={6}>
                     <Typography variant="h6" color="text.secondary">No jobs found.</Typography>
-                    <Button sx={{ mt: 2 }} variant="outlined" onClick={() => loadJobs(0, true)}>Refresh</Button>
+                    <Button sx={{ mt: 2 }} variant="outlined" onClick={() => loadJobs(null, true)}>Refresh</Button>
                   </Box>
                 </Grid>
               ) : (
-                filteredJobs.map((job, idx) => (
+                jobs.map((job, idx) => (
                   <Grid key={job.id ?? `${idx}`} item xs={12} sm={6} md={4}>
                     <Card sx={{ height: "100%", display: "flex", flexDirection: "column", borderRadius: 2, boxShadow: 3 }}>
                       <CardContent sx={{ flex: 1 }}>
@@ -66,14 +66,31 @@ export async function login(phone_number, password) {
 }
 // Add this to src/services/api.js (near other exported API helpers)
 
-export async function fetchJobs(skip = 0, limit = 6) {
+/**
+ * Reads the opaque cursor out of a `Link: <...?cursor=abc>; rel="next"` header.
+ */
+function nextCursorFromLink(linkHeader) {
+  if (!linkHeader) return null;
+  const match = linkHeader.match(/<([^>]+)>;\s*rel="next"/);
+  if (!match) return null;
+  return new URL(match[1]).searchParams.get("cursor");
+}
+
+/**
+ * Fetch one page of jobs. Pass the `nextCursor` from the previous page to continue;
+ * it is null on the last page.
+ * Optional server-side filters: { skill_id: [1, 2], skill: ["Plumbing"], location_area, q }
+ */
+export async function fetchJobs(cursor = null, limit = 6, filters = {}) {
   try {
-    // server endpoint supports skip & limit query params
+    const params = { limit, ...filters };
+    if (cursor) params.cursor = cursor;
     const res = await apiClient.get("/jobs/", {
-      params: { skip, limit },
+      params,
+      // FastAPI expects repeated keys (skill_id=1&skill_id=2), not skill_id[]=1
+      paramsSerializer: { indexes: null },
     });
-    // Expect res.data to be an array of jobs
-    return res.data;
+    return { items: res.data, nextCursor: nextCursorFromLink(res.headers.link) };
   } catch (err) {
     // Bubble up for the caller to show errors
     throw err;
@@ -89,9 +106,13 @@ export async function getProfile() {
   }
 }
 
+/**
+ * Full skill catalog. The endpoint sends an ETag with Cache-Control: no-cache,
+ * so the browser revalidates and repeat calls come back as cheap 304s.
+ */
 export async function getAllSkills() {
   try {
-    const res = await apiClient.get("/skills/");
+    const res = await apiClient.get("/skills/catalog/");
     return res.data;
   } catch (err) {
     throw err;
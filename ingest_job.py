@@ -1,9 +1,25 @@
+import argparse
+import json
+import multiprocessing
 import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import psutil
+import chromadb
 from sqlalchemy import create_engine, text
-from langchain.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 
-embedding_function = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+from app import index_versions
+from app.embedding_inference import physical_cores
+from app.embeddings import (
+    EMBEDDING_INFERENCE, EMBEDDING_MODEL_NAME, EMBEDDING_SERVER_SOCKET, embedding_dimension, get_embedder,
+)
+from app.vector_index import IVF_MIN_ROWS, JobVectorIndex
 
 # --- 1. Database Connection ---
 # Make sure your .env file has your DB credentials if you're using them
@@ -15,33 +31,79 @@ DB_NAME = "skillsetu_db"
 db_url = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
 engine = create_engine(db_url)
 
+# Every index version (app/index_versions.py) has its own ChromaDB store and
+# memory-mapped segments the API searches (app/vector_index.py, app/job_search.py)
+# The ChromaDB collection (named as LangChain's Chroma wrapper named it in earlier stores)
+CHROMA_COLLECTION = "langchain"
+# Store segment vectors as int8 with a per-row scale: 4x smaller, slightly less exact
+QUANTIZE_INDEX = os.getenv("INGEST_QUANTIZE_INDEX", "0") == "1"
+# IVF lists for approximate search in large indexes; 0 picks about 4 * sqrt(jobs)
+IVF_LISTS = int(os.getenv("INGEST_IVF_LISTS", "0"))
+# Where the incremental mode remembers how far it got (inside the version's vector store directory)
+STATE_FILE_NAME = 'ingest_state.json'
+# Jobs are streamed, embedded and checkpointed this many at a time
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+# Embedding worker processes; each holds its own copy of the model (~100 MB).
+# 0 embeds in this process, which is simplest for small runs and debugging.
+EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Embedded batches waiting for the vector-store writer. When it falls behind,
+# embedding (and reading from MySQL) pauses instead of piling batches up in memory.
+WRITE_QUEUE_SIZE = int(os.getenv("INGEST_WRITE_QUEUE_SIZE", "4"))
+# Re-read jobs updated this long before the watermark, in case a slow transaction
+# committed a row with an older updated_at after the previous run. Upserts make it harmless.
+WATERMARK_OVERLAP = timedelta(minutes=2)
+# Starting position when there is no watermark yet
+EPOCH = datetime(1970, 1, 1)
+
 # --- 2. Fetch Job Data from MySQL ---
-def fetch_job_data():
-    """Fetches all jobs and their associated skills from the database."""
-    print("Fetching job data from MySQL...")
-    # This SQL query joins jobs with skills through the association table
-    query = text("""
-        SELECT 
-            j.id as job_id, 
-            j.title, 
-            j.description, 
-            j.location_area, 
-            GROUP_CONCAT(s.name SEPARATOR ', ') as skills
-        FROM jobs j
-        LEFT JOIN job_skills js ON j.id = js.job_id
-        LEFT JOIN skills s ON js.skill_id = s.id
-        GROUP BY j.id;
+JOB_COLUMNS = """
+    SELECT
+        j.id as job_id,
+        j.title,
+        j.description,
+        j.location_area,
+        j.location_area_norm,
+        j.updated_at,
+        GROUP_CONCAT(s.name SEPARATOR ', ') as skills,
+        GROUP_CONCAT(s.id) as skill_ids
+    FROM jobs j
+    LEFT JOIN job_skills js ON j.id = js.job_id
+    LEFT JOIN skills s ON js.skill_id = s.id
+"""
+
+def stream_changed_jobs(after_updated_at, after_id, batch_size):
+    """
+    Yields lists of up to batch_size jobs changed after the (updated_at, id) position,
+    in (updated_at, id) order so that the position can be checkpointed after each batch.
+    Every batch is its own keyset query (on ix_jobs_updated_at_id) on a short-lived
+    connection, so memory stays flat however many jobs changed, and no cursor is
+    left open (and timed out by MySQL) while the writer holds the pipeline back.
+    """
+    query = text(JOB_COLUMNS + """
+        WHERE j.updated_at > :after_updated_at
+           OR (j.updated_at = :after_updated_at AND j.id > :after_id)
+        GROUP BY j.id
+        ORDER BY j.updated_at, j.id
+        LIMIT :batch_size;
     """)
+    while True:
+        with engine.connect() as connection:
+            jobs = connection.execute(
+                query, {"after_updated_at": after_updated_at, "after_id": after_id, "batch_size": batch_size}
+            ).fetchall()
+        if jobs:
+            yield jobs
+        if len(jobs) < batch_size:
+            return
+        after_updated_at, after_id = jobs[-1].updated_at, jobs[-1].job_id
+
+def fetch_all_job_ids():
     with engine.connect() as connection:
-        result = connection.execute(query)
-        jobs = result.fetchall()
-        print(f"Found {len(jobs)} jobs in the database.")
-        return jobs
+        return {row[0] for row in connection.execute(text("SELECT id FROM jobs"))}
 
 # --- 3. Prepare Documents for Embedding ---
 def prepare_documents(jobs):
     """Formats the job data into clean text documents for embedding."""
-    print("Preparing documents for embedding...")
     documents = []
     metadatas = []
     for job in jobs:
@@ -53,33 +115,305 @@ def prepare_documents(jobs):
             f"Required Skills: {job.skills if job.skills else 'None specified'}."
         )
         documents.append(content)
-        # Store the original job ID in the metadata
-        metadatas.append({"job_id": job.job_id})
+        # Store the original job ID in the metadata, plus what GET /jobs/search filters on.
+        # Skill ids are stored as ",3,17," because metadata values must be scalars.
+        metadatas.append({
+            "job_id": job.job_id,
+            "location_area_norm": job.location_area_norm or "",
+            "skill_ids": f",{job.skill_ids}," if job.skill_ids else "",
+        })
     return documents, metadatas
 
-# --- Main Ingestion Logic ---
-if __name__ == "__main__":
-    job_data = fetch_job_data()
-    
-    if not job_data:
-        print("No jobs to ingest. Please add jobs to the database first.")
-    else:
-        docs, metas = prepare_documents(job_data)
-        
-        # Initialize the embedding model
-        print("Initializing embedding model... (This may download the model the first time)")
-        
-        
-        # Define the path for the local ChromaDB database
-        db_directory = 'chroma_db'
-        
-        # Create the ChromaDB vector store
-        print(f"Creating and persisting vector database in '{db_directory}'...")
-        db = Chroma.from_documents(
-            docs, 
-            embedding_function, 
+def vector_id(job_id):
+    # Stable document ids make re-ingesting a job an overwrite instead of a duplicate.
+    return f"job-{job_id}"
+
+def job_id_of(vector_id):
+    return int(vector_id.rsplit("-", 1)[1])
+
+# --- 4. Ingestion State (watermark) ---
+def load_state(version):
+    """
+    (updated_at, job_id, published): the watermark, and whether the index segment
+    covers everything up to it. It doesn't when a run stopped between writing to
+    Chroma and publishing, and the next publish then exports every vector.
+    """
+    try:
+        with open(os.path.join(version.chroma_path, STATE_FILE_NAME)) as f:
+            state = json.load(f)
+        return datetime.fromisoformat(state["updated_at"]), state["job_id"], state.get("published", False)
+    except FileNotFoundError:
+        return EPOCH, 0, False
+
+def save_state(version, updated_at, job_id, published=False):
+    # Write-then-rename, so a crash never leaves a half-written state file.
+    os.makedirs(version.chroma_path, exist_ok=True)
+    state_file = os.path.join(version.chroma_path, STATE_FILE_NAME)
+    tmp_path = state_file + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"updated_at": updated_at.isoformat(), "job_id": job_id, "published": published}, f)
+    os.replace(tmp_path, state_file)
+
+# --- 5. Embedding Workers ---
+_worker_embedder = None
+
+def _init_embed_worker(model_name, inference, torch_threads=None):
+    # Runs once per worker process: the model is loaded once and reused for every batch.
+    global _worker_embedder
+    _worker_embedder = get_embedder(model_name, inference)
+    if torch_threads:
+        # Split the cores between workers instead of every worker using all of them
+        # (after loading, so this overrides EMBEDDING_THREADS).
+        import torch
+        torch.set_num_threads(torch_threads)
+
+def _embed_batch(documents):
+    """Returns (vectors, cache hits, cache misses) for one batch."""
+    cache = getattr(_worker_embedder, "cache", None)
+    if cache is None:
+        # Sent to the shared embedding server, which keeps the cache (and its counts) itself.
+        return _worker_embedder.embed_array(documents), 0, 0
+    hits, misses = cache.hits, cache.misses
+    vectors = _worker_embedder.embed_documents(documents)
+    return vectors, cache.hits - hits, cache.misses - misses
+
+def embed_batches(batches, workers, model_name, inference):
+    """
+    Yields (jobs, documents, metadatas, embedded) for each batch, in input order.
+    At most two batches per worker are in flight, so the MySQL cursor is only read
+    as fast as the workers can embed.
+    """
+    if workers <= 0:
+        _init_embed_worker(model_name, inference)
+        for jobs in batches:
+            docs, metas = prepare_documents(jobs)
+            yield jobs, docs, metas, _embed_batch(docs)
+        return
+
+    # 'spawn' gives every worker a fresh interpreter without the parent's DB connections.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_embed_worker,
+        initargs=(model_name, inference, max(1, physical_cores() // workers)),
+    ) as executor:
+        in_flight = deque()
+        for jobs in batches:
+            docs, metas = prepare_documents(jobs)
+            in_flight.append((jobs, docs, metas, executor.submit(_embed_batch, docs)))
+            if len(in_flight) >= workers * 2:
+                jobs, docs, metas, future = in_flight.popleft()
+                yield jobs, docs, metas, future.result()
+        while in_flight:
+            jobs, docs, metas, future = in_flight.popleft()
+            yield jobs, docs, metas, future.result()
+
+# --- 6. Vector Store Writer ---
+def process_tree_rss():
+    """Resident memory of this process and its embedding workers, in bytes."""
+    process = psutil.Process()
+    total = process.memory_info().rss
+    for child in process.children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return total
+
+class VectorStoreWriter:
+    """
+    Single writer thread fed through a bounded queue. Batches are upserted with
+    their precomputed vectors and the watermark is saved after each one.
+    """
+
+    def __init__(self, collection, version, queue_size=WRITE_QUEUE_SIZE):
+        self.collection = collection
+        self.version = version
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.upserted = 0
+        # Vector ids written by this run, for the incremental publish.
+        self.written_ids = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.peak_rss = process_tree_rss()
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="vector-store-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, batch):
+        if self.error is not None:
+            raise RuntimeError("Vector store writer failed") from self.error
+        self.queue.put(batch)
+
+    def close(self):
+        self.queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise RuntimeError("Vector store writer failed") from self.error
+
+    def docs_per_second(self):
+        return self.upserted / max(time.monotonic() - self.started_at, 1e-9)
+
+    def _run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            if self.error is not None:
+                continue  # keep draining so the producer never blocks on a dead writer
+            try:
+                self._write(*batch)
+            except Exception as e:
+                self.error = e
+
+    def _write(self, jobs, docs, metas, embedded):
+        vectors, hits, misses = embedded
+        # The vectors are already computed, so write them straight to the collection.
+        self.collection.upsert(
+            ids=[vector_id(job.job_id) for job in jobs],
+            embeddings=[list(vector) for vector in vectors],
             metadatas=metas,
-            persist_directory=db_directory
+            documents=docs,
         )
-        
-        print(f"\nSuccessfully ingested {len(docs)} jobs into ChromaDB!")
\ No newline at end of file
+        save_state(self.version, jobs[-1].updated_at, jobs[-1].job_id)
+        self.written_ids.extend(vector_id(job.job_id) for job in jobs)
+        self.upserted += len(jobs)
+        self.cache_hits += hits
+        self.cache_misses += misses
+        self.peak_rss = max(self.peak_rss, process_tree_rss())
+        print(f"Upserted {self.upserted} changed jobs so far ({self.docs_per_second():.1f} docs/sec)...")
+
+# --- 7. Ingestion Modes ---
+def open_vector_store(version):
+    # No embedding function: documents are written with vectors from the embedding workers.
+    client = chromadb.PersistentClient(path=version.chroma_path)
+    return client.get_or_create_collection(CHROMA_COLLECTION, embedding_function=None)
+
+def publish_index(version, collection, written_ids, removed_ids, complete=True,
+                  quantize=QUANTIZE_INDEX, ivf_lists=IVF_LISTS):
+    """
+    Writes a new segment of the version and swaps it in for the API workers. When
+    the current segment is complete (covers every run before this one) and stored
+    alike, only the vectors written by this run are read back from Chroma and
+    merged into it; otherwise every vector is exported.
+    """
+    started = time.monotonic()
+    previous = JobVectorIndex.open(version.path)
+    if previous is not None and complete and len(previous) and (previous.scales is not None) == quantize:
+        if not written_ids and not removed_ids:
+            print("Index segment is up to date, nothing to publish.")
+            return
+        changed = JobVectorIndex.from_chroma(collection, quantize=quantize, ids=written_ids)
+        index = previous.merged(changed, [job_id_of(i) for i in removed_ids])
+        source = f"{len(changed)} changed, {len(removed_ids)} removed"
+    else:
+        index = JobVectorIndex.from_chroma(collection, quantize=quantize)
+        source = "full export"
+    if len(index) >= IVF_MIN_ROWS:
+        # New and changed vectors are assigned to the current segment's centroids;
+        # k-means only runs again once the index has outgrown them.
+        index.build_ivf(nlist=ivf_lists or None, previous=previous)
+    segment = index.save(version.path)
+    ivf = f", {len(index.ivf_centroids)} IVF lists" if index.ivf_centroids is not None else ""
+    print(
+        f"Published index segment {segment} ({source}): {len(index)} jobs, "
+        f"{index.nbytes / 2**20:.1f} MiB{' (int8)' if quantize else ''}{ivf} in {time.monotonic() - started:.1f} s"
+    )
+
+def ingest_into(version, batch_size=BATCH_SIZE, workers=EMBED_WORKERS, quantize=QUANTIZE_INDEX, publish=True):
+    """
+    Embeds and upserts only the jobs changed since the version's watermark, then deletes
+    vectors of jobs that no longer exist. The watermark is saved after every batch,
+    so an interrupted run resumes where it stopped; re-running is always safe.
+    """
+    if EMBEDDING_SERVER_SOCKET and workers > 1:
+        # The server runs one batch at a time whoever sends it, and one worker keeps
+        # it busy; more would only add processes waiting on it (each loading its own
+        # model if the server goes away).
+        print(f"Embedding through the shared server: using 1 embedding worker instead of {workers}")
+        workers = 1
+    collection = open_vector_store(version)
+    after_updated_at, after_id, published = load_state(version)
+    if after_updated_at != EPOCH:
+        print(f"Resuming from watermark {after_updated_at.isoformat()} (job {after_id})")
+        after_updated_at, after_id = after_updated_at - WATERMARK_OVERLAP, 0
+
+    writer = VectorStoreWriter(collection, version)
+    try:
+        changed = stream_changed_jobs(after_updated_at, after_id, batch_size)
+        # The version's mode, not EMBEDDING_INFERENCE: every vector of a version is embedded alike.
+        for batch in embed_batches(changed, workers, version.model_name, version.inference):
+            writer.put(batch)
+    finally:
+        writer.close()
+
+    # Remove vectors whose jobs were deleted from MySQL.
+    stored_ids = set(collection.get(include=[])["ids"])
+    live_ids = {vector_id(job_id) for job_id in fetch_all_job_ids()}
+    stale_ids = sorted(stored_ids - live_ids)
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+    if publish:
+        publish_index(version, collection, writer.written_ids, stale_ids, complete=published, quantize=quantize)
+        save_state(version, *load_state(version)[:2], published=True)
+
+    print(f"\nSuccessfully upserted {writer.upserted} jobs and removed {len(stale_ids)} deleted jobs in ChromaDB!")
+    print(
+        f"Throughput: {writer.docs_per_second():.1f} docs/sec with {workers} embedding workers "
+        f"(batch size {batch_size}); peak RSS {writer.peak_rss / 2**20:.0f} MiB"
+    )
+    if EMBEDDING_SERVER_SOCKET:
+        print(f"Embedded through the shared embedding server at {EMBEDDING_SERVER_SOCKET}")
+    else:
+        print(f"Embedding cache: {writer.cache_hits} hits, {writer.cache_misses} misses")
+
+def run_full(batch_size=BATCH_SIZE, workers=EMBED_WORKERS, quantize=QUANTIZE_INDEX, model_name=EMBEDDING_MODEL_NAME,
+             inference=EMBEDDING_INFERENCE):
+    """
+    Blue/green rebuild: embeds every job with model_name, run in the given inference
+    mode, into a new index version while the API keeps serving the active one, then
+    flips the API over to it.
+    """
+    version = index_versions.create_version(model_name, embedding_dimension(model_name), inference)
+    print(f"Building index version {version.name} ({inference} inference)")
+    # Held until the version is active, so an incremental run can't start on it before then.
+    with index_versions.locked(version):
+        ingest_into(version, batch_size, workers, quantize, publish=False)
+        # The first pass read from one snapshot; pick up jobs changed while it ran.
+        ingest_into(version, batch_size, workers, quantize)
+        index_versions.activate(version)
+    print(f"Activated index version {version.name}; API workers switch over on their next check.")
+
+def run_incremental(batch_size=BATCH_SIZE, workers=EMBED_WORKERS, quantize=QUANTIZE_INDEX):
+    """Brings the active index version up to date, building a first one if there is none."""
+    version = index_versions.active_version()
+    if version is None:
+        print("No active index version yet, building one.")
+        return run_full(batch_size, workers, quantize)
+    with index_versions.locked(version):
+        ingest_into(version, batch_size, workers, quantize)
+
+# --- Main Ingestion Logic ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embed SkillSetu jobs into the local ChromaDB store.")
+    parser.add_argument(
+        "--mode",
+        choices=["incremental", "full"],
+        default="incremental",
+        help="incremental: only jobs changed since the last run (default); "
+             "full: rebuild everything into a new index version, then switch the API to it",
+    )
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME, help="embedding model for --mode full")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="jobs per embedding batch")
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS, help="embedding worker processes (0: in-process)")
+    parser.add_argument("--quantize", action="store_true", default=QUANTIZE_INDEX, help="publish int8 index segments")
+    args = parser.parse_args()
+
+    try:
+        if args.mode == "full":
+            run_full(args.batch_size, args.workers, args.quantize, args.model)
+        else:
+            run_incremental(args.batch_size, args.workers, args.quantize)
+    except index_versions.VersionLocked as e:
+        sys.exit(f"{e}; try again once it has finished.")
@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+# Settings are read when the app modules are imported, so they are set before any test imports them.
+# app.main creates its tables at import; give it a scratch SQLite database instead of MySQL.
+_scratch = tempfile.mkdtemp(prefix="skillsetu-tests-")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(_scratch, "app.db"))
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("GROQ_API_KEY", "test-groq-key")  # the chat client is built at import, never called
+os.environ.setdefault("CHAT_HISTORY_DIR", os.path.join(_scratch, "chat_history"))
+os.environ.setdefault("JOB_INDEX_DIR", os.path.join(_scratch, "job_index"))
+os.environ.setdefault("BM25_INDEX_PATH", os.path.join(_scratch, "bm25.npz"))
+os.environ.setdefault("EMBEDDING_CACHE_DIR", os.path.join(_scratch, "embedding_cache"))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory SQLite database built from the models."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def client(db):
+    """A TestClient whose requests use the `db` session. Startup (model warm-up) is not run."""
+    from fastapi.testclient import TestClient
+    from app import database
+    from app.main import app
+
+    app.dependency_overrides[database.get_db] = lambda: db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def bm25(tmp_path, monkeypatch):
+    """A fresh BM25 index in place of the process-wide one that crud's job writes update."""
+    from app import bm25_index, crud
+
+    index = bm25_index.BM25Index(str(tmp_path / "bm25.npz"))
+    monkeypatch.setattr(crud, "bm25_index", index)
+    try:
+        yield index
+    finally:
+        index.close()
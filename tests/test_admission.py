@@ -0,0 +1,69 @@
+"""
+Tests for semaphore admission control (app/admission.py) and the chat endpoints' 429s.
+"""
+import asyncio
+
+import pytest
+
+from app import chatbot
+from app.admission import AdmissionLimiter, QueueFull
+
+
+def test_limiter_admits_queues_then_refuses():
+    async def scenario():
+        limiter = AdmissionLimiter(max_in_flight=1, max_waiting=1)
+        release = asyncio.Event()
+
+        async def work():
+            async with limiter.slot():
+                await release.wait()
+
+        running = asyncio.create_task(work())
+        waiting = asyncio.create_task(work())
+        await asyncio.sleep(0)
+        during = limiter.stats()
+        with pytest.raises(QueueFull):
+            await limiter.acquire()
+        release.set()
+        await asyncio.gather(running, waiting)
+        return during, limiter.stats()
+
+    during, after = asyncio.run(scenario())
+    assert (during["in_flight"], during["waiting"]) == (1, 1)
+    assert (after["in_flight"], after["waiting"], after["rejected"]) == (0, 0, 1)
+
+
+class Agent:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        return {"output": "No jobs right now."}
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    fake = Agent()
+    monkeypatch.setattr(chatbot, "agent_executor", fake)
+    return fake
+
+
+def test_chat_runs_the_agent_within_a_slot(client, agent, monkeypatch):
+    monkeypatch.setattr(chatbot, "chat_limiter", AdmissionLimiter(max_in_flight=1, max_waiting=0))
+    response = client.post("/chat/", json={"message": "anything for a driver?", "bypass_cache": True})
+    assert response.status_code == 200 and response.json()["response"] == "No jobs right now."
+    assert agent.calls == 1
+    assert client.get("/chat/queue/").json()["in_flight"] == 0
+
+
+@pytest.mark.parametrize("path", ["/chat/", "/chat/stream/"])
+def test_a_full_queue_is_a_429_with_retry_after(client, agent, monkeypatch, path):
+    # No free slot and no room to wait.
+    monkeypatch.setattr(chatbot, "chat_limiter", AdmissionLimiter(max_in_flight=0, max_waiting=0))
+    response = client.post(path, json={"message": "anything for a driver?", "bypass_cache": True})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(chatbot.CHAT_RETRY_AFTER_SECONDS)
+    assert agent.calls == 0
+    assert client.get("/chat/queue/").json()["rejected"] == 1
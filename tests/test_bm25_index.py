@@ -0,0 +1,136 @@
+"""
+Tests for the BM25 keyword index (app/bm25_index.py): incremental adds and
+removals, catching up on other processes' writes, and save/load.
+"""
+from datetime import timedelta
+
+import pytest
+
+from app import bm25_index, crud, models, schemas
+from app.bm25_index import BM25Index
+
+
+@pytest.fixture
+def board(db, bm25, monkeypatch):
+    """An employer and three skills; jobs are written through crud, which keeps `bm25` current."""
+    monkeypatch.setattr(crud.chat_cache, "invalidate", lambda: None)
+    owner = models.User(phone_number="8000000000", hashed_password="x", name="Employer", role="employer")
+    skills = [models.Skill(name=name, category="Trade") for name in ("CNC", "AutoCAD", "Plumbing")]
+    db.add_all([owner, *skills])
+    db.commit()
+    return owner, skills
+
+
+def post(db, board, title, description, location="Adajan", skill_ids=()):
+    owner, _ = board
+    job = schemas.JobCreate(
+        title=title, description=description, location_area=location, required_skill_ids=list(skill_ids)
+    )
+    return crud.create_job(db, job, owner.id)
+
+
+def job_ids(hits):
+    return [job_id for job_id, _ in hits]
+
+
+def test_tokenize_drops_stopwords_and_case():
+    assert bm25_index.tokenize("The CNC operator, for 3-axis machines!") == ["cnc", "operator", "3", "axis", "machines"]
+
+
+def test_ranks_by_term_rarity_and_frequency(db, bm25, board):
+    cnc, autocad, _ = board[1]
+    operator = post(db, board, "CNC operator", "Run CNC machines, CNC setup", skill_ids=[cnc.id])
+    drafter = post(db, board, "Drafter", "AutoCAD drawings for machines", skill_ids=[autocad.id])
+    helper = post(db, board, "Helper", "General help")
+
+    assert job_ids(bm25.search("cnc", 10)) == [operator.id]
+    assert job_ids(bm25.search("autocad machines", 10)) == [drafter.id, operator.id]
+    # Skill names are indexed along with title and description.
+    assert job_ids(bm25.search("plumbing", 10)) == []
+    assert job_ids(bm25.search("help", 10)) == [helper.id]
+    # Same term frequency: the shorter posting ranks first.
+    assert job_ids(bm25.search("machines", 1)) == [drafter.id]
+
+
+def test_filters(db, bm25, board):
+    cnc, autocad, _ = board[1]
+    adajan = post(db, board, "CNC operator", "machines", "Adajan", [cnc.id])
+    vesu = post(db, board, "CNC programmer", "machines", "Vesu Road", [cnc.id, autocad.id])
+
+    assert job_ids(bm25.search("cnc", 10, location_area="vesu")) == [vesu.id]
+    assert job_ids(bm25.search("cnc", 10, skill_ids=[autocad.id])) == [vesu.id]
+    assert sorted(job_ids(bm25.search("machines", 10, skill_ids=[cnc.id]))) == [adajan.id, vesu.id]
+    assert bm25.search("cnc", 10, skill_ids=[]) == []
+
+
+def test_changed_and_deleted_jobs(db, bm25, board):
+    job = post(db, board, "CNC operator", "machines")
+    other = post(db, board, "Lathe operator", "machines")
+    crud.update_job(db, job, schemas.JobCreate(
+        title="AutoCAD drafter", description="drawings", location_area="Adajan", required_skill_ids=[]
+    ))
+    assert bm25.search("cnc", 10) == []
+    assert job_ids(bm25.search("autocad", 10)) == [job.id]
+
+    crud.delete_job(db, other)
+    assert bm25.search("lathe", 10) == []
+    assert bm25.search("machines", 10) == []
+
+
+def test_refresh_catches_up_on_other_processes(db, bm25, board, tmp_path, monkeypatch):
+    monkeypatch.setattr(bm25_index, "RECHECK_SECONDS", 0)
+    kept = post(db, board, "CNC operator", "machines")
+    deleted = post(db, board, "Lathe operator", "machines")
+    changed = post(db, board, "Welder", "steel")
+
+    # Another worker, started after these jobs were written.
+    other = BM25Index(str(tmp_path / "other.npz"))
+    other.refresh(db)
+    assert sorted(job_ids(other.search("operator", 10))) == [kept.id, deleted.id]
+
+    crud.delete_job(db, deleted)
+    crud.update_job(db, changed, schemas.JobCreate(
+        title="Welder", description="AutoCAD and steel", location_area="Vesu", required_skill_ids=[]
+    ))
+    other.refresh(db)
+    assert job_ids(other.search("operator", 10)) == [kept.id]
+    assert job_ids(other.search("autocad", 10, location_area="vesu")) == [changed.id]
+    other.close()
+
+
+def test_save_and_load(db, bm25, board, tmp_path):
+    cnc, autocad, _ = board[1]
+    jobs = [
+        post(db, board, "CNC operator", "machines", "Adajan", [cnc.id]),
+        post(db, board, "AutoCAD drafter", "drawings machines", "Vesu", [autocad.id]),
+        post(db, board, "Lathe operator", "machines", "Vesu"),
+    ]
+    crud.delete_job(db, jobs[2])
+    queries = [("machines", {}), ("operator drafter", {}), ("machines", {"location_area": "vesu"}),
+               ("machines", {"skill_ids": [cnc.id]})]
+    expected = [bm25.search(q, 10, **filters) for q, filters in queries]
+
+    bm25.save()
+    loaded = BM25Index(bm25.path)
+    assert loaded.load()
+    assert [loaded.search(q, 10, **filters) for q, filters in queries] == expected
+    # Tombstoned rows are compacted away on save.
+    assert loaded._job_ids == [jobs[0].id, jobs[1].id]
+    assert loaded._watermark == bm25._watermark
+
+    # Jobs added after a save are searched alongside the saved (compacted) postings.
+    latest = post(db, board, "CNC programmer", "machines", "Adajan", [cnc.id])
+    loaded.add_job(latest)
+    assert sorted(job_ids(loaded.search("cnc", 10))) == sorted([jobs[0].id, latest.id])
+    loaded.close()
+    assert not BM25Index(str(tmp_path / "missing.npz")).load()
+
+
+def test_unchanged_jobs_are_not_re_added(db, bm25, board):
+    job = post(db, board, "CNC operator", "machines")
+    rows = len(bm25._job_ids)
+    bm25.add_job(job)
+    assert len(bm25._job_ids) == rows
+    job.updated_at += timedelta(seconds=1)
+    bm25.add_job(job)
+    assert len(bm25._job_ids) == rows + 1 and job_ids(bm25.search("cnc", 10)) == [job.id]
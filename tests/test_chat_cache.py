@@ -0,0 +1,122 @@
+"""
+Tests for the semantic chat answer cache (app/chat_cache.py).
+
+Embeddings and entity extraction are replaced with fixed vectors and a word list,
+so the tests don't load a model.
+"""
+import numpy as np
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import chat_cache, chatbot, models
+
+VECTORS = {
+    "any plumber jobs in adajan": [1.0, 0.0, 0.0],
+    "plumber jobs in adajan please": [0.99, 0.14, 0.0],
+    "plumber jobs in vesu": [0.99, 0.0, 0.14],
+    "how do i reset my password": [0.0, 1.0, 0.0],
+}
+AREAS = ("adajan", "vesu")
+
+
+class Cache(chat_cache.ChatResponseCache):
+    def _embed(self, text):
+        vector = np.asarray(VECTORS.get(text, [0.0, 0.0, 1.0]), dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    @staticmethod
+    def _entities(text):
+        words = set(text.split())
+        return frozenset({1} if "plumber" in words else ()), frozenset(words & set(AREAS))
+
+
+@pytest.fixture
+def cache(db, monkeypatch):
+    monkeypatch.setattr(chat_cache, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    fresh = Cache()
+    for module in ("app.main", "app.crud"):
+        monkeypatch.setattr(f"{module}.chat_cache", fresh)
+    return fresh
+
+
+def ask(cache, question, answer=None):
+    """Looks the question up; on a miss, stores `answer` as the agent would."""
+    lookup = cache.lookup(question)
+    if lookup.answer is None and answer is not None:
+        cache.store(lookup, answer)
+    return lookup.answer
+
+
+def test_normalize_question():
+    assert chat_cache.normalize_question("  Any  Plumber jobs in Adajan?? ") == "any plumber jobs in adajan"
+
+
+def test_exact_and_similar_questions_hit(cache):
+    assert ask(cache, "Any plumber jobs in Adajan?", "Two jobs.") is None
+    assert ask(cache, "ANY plumber jobs, in adajan") == "Two jobs."
+    assert ask(cache, "Plumber jobs in Adajan please") == "Two jobs."
+    assert ask(cache, "How do I reset my password?") is None
+    assert cache.stats() == {"entries": 1, "hits": 2, "misses": 2, "hit_rate": 0.5}
+
+
+def test_similar_questions_about_other_places_miss(cache):
+    ask(cache, "Any plumber jobs in Adajan?", "Two jobs.")
+    assert ask(cache, "Plumber jobs in Vesu") is None
+
+
+def test_answers_computed_before_an_invalidation_are_not_stored(cache):
+    lookup = cache.lookup("Any plumber jobs in Adajan?")
+    cache.invalidate()  # a job changed while the agent was answering
+    cache.store(lookup, "Stale answer.")
+    assert cache.stats()["entries"] == 0
+
+
+def test_job_writes_through_crud_invalidate(cache, db, bm25):
+    from app import crud, schemas
+
+    owner = models.User(phone_number="8000000001", hashed_password="x", role="employer")
+    db.add(owner)
+    db.commit()
+    ask(cache, "Any plumber jobs in Adajan?", "None yet.")
+    crud.create_job(db, schemas.JobCreate(title="Plumber", description="", location_area="Adajan", required_skill_ids=[]), owner.id)
+    assert ask(cache, "Any plumber jobs in Adajan?") is None
+
+
+def test_job_writes_by_other_processes_invalidate_after_the_recheck(cache, db, monkeypatch):
+    monkeypatch.setattr(chat_cache, "RECHECK_SECONDS", 0)
+    ask(cache, "Any plumber jobs in Adajan?", "None yet.")
+    db.add(models.Job(title="Plumber", description="", location_area="Adajan"))
+    db.commit()
+    assert ask(cache, "Any plumber jobs in Adajan?") is None
+
+
+def test_entries_expire_and_the_least_recently_used_is_evicted(cache, monkeypatch):
+    monkeypatch.setattr(chat_cache, "CHAT_CACHE_MAX_ENTRIES", 2)
+    ask(cache, "Any plumber jobs in Adajan?", "A")
+    ask(cache, "How do I reset my password?", "B")
+    ask(cache, "Any plumber jobs in Adajan?")  # now the most recently used
+    ask(cache, "Plumber jobs in Vesu", "C")
+    assert ask(cache, "How do I reset my password?") is None
+    assert ask(cache, "Any plumber jobs in Adajan?") == "A"
+
+    monkeypatch.setattr(chat_cache, "CHAT_CACHE_TTL_SECONDS", -1)
+    ask(cache, "How do I reset my password?", "D")
+    assert ask(cache, "How do I reset my password?") is None
+
+
+def test_chat_endpoint_serves_cached_answers_unless_bypassed(client, cache, monkeypatch):
+    class Agent:
+        calls = 0
+
+        async def ainvoke(self, inputs):
+            Agent.calls += 1
+            return {"output": f"Answer {Agent.calls}."}
+
+    monkeypatch.setattr(chatbot, "agent_executor", Agent())
+    question = {"message": "How do I reset my password?"}
+
+    assert client.post("/chat/", json=question).json()["response"] == "Answer 1."
+    cached = client.post("/chat/", json=question).json()
+    assert (cached["response"], cached["cached"]) == ("Answer 1.", True)
+    assert client.post("/chat/", json={**question, "bypass_cache": True}).json()["response"] == "Answer 2."
+    assert client.get("/chat/cache/").json()["hits"] == 1
@@ -0,0 +1,107 @@
+"""
+Tests for streamed chat answers (chatbot.stream_chat_events and POST /chat/stream/).
+
+The agent is replaced by a scripted one that emits the astream_events the real
+agent produces, so no LLM is called.
+"""
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from app import chatbot
+from app.admission import AdmissionLimiter
+
+
+class ScriptedAgent:
+    """Emits a fixed astream_events (v2) sequence: a tool call, two tokens, then the end of the run."""
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.closed = False
+        self.inputs = []
+
+    async def astream_events(self, inputs, version):
+        self.inputs.append(inputs)
+        events = [
+            {"event": "on_chain_start", "name": "AgentExecutor", "data": {}, "parent_ids": []},
+            {"event": "on_tool_start", "name": "find_jobs_tool", "data": {"input": {"skill": "plumber"}}, "parent_ids": ["r"]},
+            {"event": "on_tool_end", "name": "find_jobs_tool", "data": {"output": "- 'Pipe fitting' in Adajan"}, "parent_ids": ["r"]},
+            {"event": "on_chat_model_stream", "name": "ChatGroq", "data": {"chunk": AIMessageChunk(content="One ")}, "parent_ids": ["r"]},
+            {"event": "on_chat_model_stream", "name": "ChatGroq", "data": {"chunk": AIMessageChunk(content="")}, "parent_ids": ["r"]},
+            {"event": "on_chat_model_stream", "name": "ChatGroq", "data": {"chunk": AIMessageChunk(content="job.")}, "parent_ids": ["r"]},
+            {"event": "on_chain_end", "name": "RunnableSequence", "data": {"output": {}}, "parent_ids": ["r"]},
+            {"event": "on_chain_end", "name": "AgentExecutor", "data": {"output": {"output": "One job."}}, "parent_ids": []},
+        ]
+        try:
+            for n, event in enumerate(events):
+                if n == self.fail_after:
+                    raise RuntimeError("Groq is down")
+                yield event
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    scripted = ScriptedAgent()
+    monkeypatch.setattr(chatbot, "agent_executor", scripted)
+    monkeypatch.setattr(chatbot, "chat_limiter", AdmissionLimiter(max_in_flight=2, max_waiting=0))
+    return scripted
+
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def collect(generator, stop_at=None):
+    seen = []
+    async for event, data in generator:
+        seen.append((event, data))
+        if event == stop_at:
+            break
+    await generator.aclose()
+    return seen
+
+
+def test_stream_chat_events_maps_agent_events(agent):
+    seen = asyncio.run(collect(chatbot.stream_chat_events("plumber jobs?", [("human", "hi")])))
+    assert seen == [
+        ("tool_start", {"tool": "find_jobs_tool", "input": {"skill": "plumber"}}),
+        ("tool_end", {"tool": "find_jobs_tool", "output": "- 'Pipe fitting' in Adajan"}),
+        ("token", {"text": "One "}),
+        ("token", {"text": "job."}),
+        ("done", {"response": "One job."}),
+    ]
+    assert agent.inputs == [{"input": "plumber jobs?", "chat_history": [("human", "hi")]}]
+
+
+def test_closing_the_stream_stops_the_agent_run(agent):
+    seen = asyncio.run(collect(chatbot.stream_chat_events("plumber jobs?"), stop_at="tool_start"))
+    assert [event for event, _ in seen] == ["tool_start"]
+    assert agent.closed
+
+
+def test_chat_stream_endpoint_sends_server_sent_events(client, agent):
+    response = client.post("/chat/stream/", json={"message": "any good work for me?", "bypass_cache": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["tool_start", "tool_end", "token", "token", "done"]
+    done = events[-1][1]
+    assert done["response"] == "One job." and done["session_id"] == response.headers["X-Session-Id"]
+    assert chatbot.chat_limiter.stats()["in_flight"] == 0
+
+
+def test_agent_failures_become_an_error_event(client, agent):
+    agent.fail_after = 3
+    response = client.post("/chat/stream/", json={"message": "any good work for me?", "bypass_cache": True})
+    events = parse_sse(response.text)
+    assert events[-1] == ("error", {"detail": "Groq is down"})
+    assert agent.closed and chatbot.chat_limiter.stats()["in_flight"] == 0
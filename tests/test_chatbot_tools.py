@@ -0,0 +1,84 @@
+"""
+Tests for the chatbot's job search tool (chatbot.find_jobs_tool), which queries the
+database directly instead of calling the API over HTTP.
+"""
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app import chatbot, crud, models
+
+
+@pytest.fixture
+def tool_db(db, monkeypatch):
+    """The tool opens its own session; give it one on the test database."""
+    monkeypatch.setattr(chatbot, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    return db
+
+
+def add_jobs(db):
+    plumber = models.Skill(name="Pipe Plumber", category="Trade")
+    fitter = models.Skill(name="Pipe Fitter", category="Trade")
+    welder = models.Skill(name="Welder", category="Trade")
+    owner = models.User(phone_number="8000000001", hashed_password="x", role="employer")
+    db.add_all([plumber, fitter, welder, owner])
+    jobs = [
+        ("Bathroom repair", "Adajan", [plumber]),
+        ("Pipeline crew", "Adajan Gam", [plumber, fitter]),
+        ("Gate welding", "Adajan", [welder]),
+        ("Kitchen sink", "Vesu", [plumber]),
+    ]
+    for title, area, skills in jobs:
+        job = models.Job(title=title, description="", location_area=area, owner=owner)
+        job.required_skills.extend(skills)
+        db.add(job)
+    db.commit()
+
+
+def test_jobs_matching_more_skills_rank_first(tool_db):
+    add_jobs(tool_db)
+    answer = chatbot.find_jobs_tool.invoke({"skill": "pipe", "location": "adajan"})
+    assert answer.splitlines() == [
+        "I found the following jobs:",
+        "- 'Pipeline crew' in Adajan Gam",
+        "- 'Bathroom repair' in Adajan",
+    ]
+
+
+def test_results_are_capped_at_top_k(tool_db, monkeypatch):
+    add_jobs(tool_db)
+    monkeypatch.setattr(chatbot, "FIND_JOBS_TOP_K", 2)
+    answer = chatbot.find_jobs_tool.invoke({"location": "a"})
+    assert answer.splitlines()[1:] == ["- 'Gate welding' in Adajan", "- 'Pipeline crew' in Adajan Gam"]
+
+
+def test_unknown_skills_and_missing_arguments(tool_db):
+    add_jobs(tool_db)
+    assert chatbot.find_jobs_tool.invoke({"skill": "carpenter"}) == "No jobs found matching your criteria."
+    assert chatbot.find_jobs_tool.invoke({"skill": "pipe", "location": "surat"}) == "No jobs found matching your criteria."
+    assert chatbot.find_jobs_tool.invoke({}).startswith("Error:")
+
+
+def test_skill_words_match_whole_words_only(tool_db):
+    add_jobs(tool_db)
+    assert len(crud.find_skill_ids_by_words(tool_db, ["pipe"])) == 2
+    assert crud.find_skill_ids_by_words(tool_db, ["pip", "weld"]) == []
+
+
+def test_ranking_is_one_query(tool_db):
+    add_jobs(tool_db)
+    # Exact case: SQLite compares names case-sensitively, unlike the MySQL collation.
+    skill_ids = crud.find_skill_ids_by_words(tool_db, ["pipe", "Welder"])
+    statements = []
+    engine = tool_db.get_bind()
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        rows = crud.search_jobs_ranked(tool_db, skill_ids=skill_ids, location_area="Adajan", limit=10)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert len(statements) == 1
+    assert [row.title for row in rows] == ["Pipeline crew", "Gate welding", "Bathroom repair"]
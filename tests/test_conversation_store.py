@@ -0,0 +1,74 @@
+"""
+Tests for chat sessions and history (app/conversation_store.py).
+"""
+import pytest
+
+from app import conversation_store
+from app.conversation_store import ConversationStore, FileBackend, is_valid_session_id, issue_session_id
+
+
+def test_issued_session_ids_validate():
+    session_id = issue_session_id()
+    assert len(session_id) == 55 and is_valid_session_id(session_id)
+    assert issue_session_id() != session_id
+
+
+@pytest.mark.parametrize("forged", [
+    "",
+    ".",
+    "token",
+    "token.",
+    "token." + "0" * 32,
+    "ä.ö",  # non-ASCII must be rejected, not raise
+    "töken." + "0" * 32,
+    "token.signätüre",
+])
+def test_forged_session_ids_are_rejected(forged):
+    assert is_valid_session_id(forged) is False
+
+
+def test_tampering_with_either_half_is_rejected():
+    token, signature = issue_session_id().split(".")
+    other_token, other_signature = issue_session_id().split(".")
+    assert not is_valid_session_id(f"{token}.{other_signature}")
+    assert not is_valid_session_id(f"{other_token}.{signature}")
+
+
+def test_chat_rejects_unknown_sessions_with_400(client):
+    for session_id in ("made-up", "ünïcode.ünïcode"):
+        response = client.post("/chat/", json={"message": "hi", "session_id": session_id})
+        assert response.status_code == 400, response.text
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ConversationStore(FileBackend(str(tmp_path)), token_budget=40)
+    try:
+        yield store
+    finally:
+        store.close()
+
+
+def test_history_reads_back_before_and_after_the_flush(store, tmp_path):
+    session_id = issue_session_id()
+    store.append(session_id, "plumber jobs?", "Two jobs.")
+    assert [m.content for m in store.get_history(session_id)] == ["plumber jobs?", "Two jobs."]
+
+    store.close()  # flushes
+    fresh = ConversationStore(FileBackend(str(tmp_path)))  # another worker, nothing unflushed
+    assert [type(m).__name__ for m in fresh.get_history(session_id)] == ["HumanMessage", "AIMessage"]
+    assert fresh.get_history(issue_session_id()) == []
+
+
+def test_old_turns_fold_into_a_bounded_summary(store, monkeypatch):
+    monkeypatch.setattr(conversation_store, "SUMMARY_MAX_CHARS", 100)
+    session_id = issue_session_id()
+    for n in range(6):
+        store.append(session_id, f"question number {n} about jobs", f"answer number {n}")
+    messages = store.get_history(session_id)
+
+    summary, *turns = messages
+    assert type(summary).__name__ == "SystemMessage"
+    assert "The user asked: question number 4 about jobs" in summary.content
+    assert len(summary.content.split(": ", 1)[1]) <= 100 + len("...")
+    assert 0 < len(turns) < 12 and turns[-1].content == "answer number 5"
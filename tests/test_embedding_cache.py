@@ -0,0 +1,111 @@
+"""
+Tests for the persistent embedding cache and the query LRU (app/embedding_cache.py).
+"""
+import os
+
+import numpy as np
+import pytest
+
+from app.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class CountingEmbeddings:
+    """Embeds a text as [len(text), word count], and records every text it was asked for."""
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), float(len(text.split()))] for text in texts]
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path)
+
+
+def test_miss_then_hit(directory):
+    cache = EmbeddingCache("model", directory)
+    assert cache.get_many(["plumber in adajan"]) == [None]
+    cache.put_many(["plumber in adajan"], [[1.0, 2.0]])
+    vector, missing = cache.get_many(["plumber  in\nadajan", "welder"])
+    assert vector.tolist() == [1.0, 2.0] and missing is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2}
+
+
+def test_vectors_persist_and_are_shared_between_processes(directory):
+    writer = EmbeddingCache("model", directory)
+    reader = EmbeddingCache("model", directory)
+    writer.put_many(["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    # Another instance on the same directory sees rows appended after it opened.
+    assert [v.tolist() for v in reader.get_many(["b", "a"])] == [[0.0, 1.0], [1.0, 0.0]]
+    reader.put_many(["c", "a"], [[2.0, 2.0], [9.0, 9.0]])
+
+    reopened = EmbeddingCache("model", directory)
+    assert reopened.dim == 2
+    # "a" was stored first; the second put of it is ignored.
+    assert [v.tolist() for v in reopened.get_many(["a", "b", "c"])] == [[1.0, 0.0], [0.0, 1.0], [2.0, 2.0]]
+    assert os.path.getsize(os.path.join(reopened.directory, "vectors.f32")) == 3 * 2 * 4
+
+
+def test_bytes_left_by_a_crashed_append_are_dropped(directory):
+    cache = EmbeddingCache("model", directory)
+    cache.put_many(["a"], [[1.0, 2.0]])
+    # A crash after writing vectors but before their digests reached index.bin.
+    with open(os.path.join(cache.directory, "vectors.f32"), "ab") as f:
+        f.write(np.asarray([[7.0, 7.0]], dtype=np.float32).tobytes())
+
+    reopened = EmbeddingCache("model", directory)
+    reopened.put_many(["b"], [[3.0, 4.0]])
+    assert [v.tolist() for v in reopened.get_many(["a", "b"])] == [[1.0, 2.0], [3.0, 4.0]]
+
+
+def test_rejects_other_dimensions_and_models(directory):
+    cache = EmbeddingCache("org/model", directory)
+    cache.put_many(["a"], [[1.0, 2.0]])
+    with pytest.raises(ValueError):
+        cache.put_many(["b"], [[1.0, 2.0, 3.0]])
+    # Models whose names map to the same directory never read each other's vectors.
+    with pytest.raises(ValueError):
+        EmbeddingCache("org_model", directory)
+
+
+def test_documents_are_embedded_once(directory):
+    model = CountingEmbeddings()
+    embedder = CachedEmbeddings(model, EmbeddingCache("model", directory))
+    first = embedder.embed_documents(["plumber", "welder", "plumber"])
+    assert model.embedded == ["plumber", "welder"]
+    assert embedder.embed_documents(["welder", " plumber "]) == [first[1], first[0]]
+    assert model.embedded == ["plumber", "welder"]
+
+    # A fresh process reads them from disk.
+    model = CountingEmbeddings()
+    CachedEmbeddings(model, EmbeddingCache("model", directory)).embed_documents(["plumber"])
+    assert model.embedded == []
+
+
+def test_queries_stay_in_memory(directory):
+    model = CountingEmbeddings()
+    embedder = CachedEmbeddings(model, EmbeddingCache("model", directory), query_cache_size=2)
+    embedder.embed_query("plumber jobs")
+    embedder.embed_query("plumber jobs")
+    assert model.embedded == ["plumber jobs"]
+    assert EmbeddingCache("model", directory).stats()["entries"] == 0
+
+    # Least recently used queries are evicted first.
+    embedder.embed_query("welder jobs")
+    embedder.embed_query("plumber jobs")
+    embedder.embed_query("driver jobs")
+    embedder.embed_query("plumber jobs")
+    embedder.embed_query("welder jobs")
+    assert model.embedded == ["plumber jobs", "welder jobs", "driver jobs", "welder jobs"]
+
+
+def test_documents_and_queries_share_one_model_call(directory):
+    model = CountingEmbeddings()
+    embedder = CachedEmbeddings(model, EmbeddingCache("model", directory))
+    documents, queries = embedder.embed(["plumber", "welder"], ["welder", "driver"])
+    assert model.embedded == ["plumber", "welder", "driver"]
+    assert documents[1].tolist() == queries[0].tolist()
+    assert embedder.cache.stats()["entries"] == 2
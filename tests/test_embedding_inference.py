@@ -0,0 +1,71 @@
+"""
+Tests for CPU embedding inference (app/embedding_inference.py): length
+bucketing and parity.
+
+The sentence-transformers model is replaced with a fake whose tokenizer counts
+words and whose encode() records the batches it runs.
+"""
+import numpy as np
+import pytest
+
+from app.embedding_inference import BucketedEmbeddings, cosine_parity, length_buckets
+
+
+class FakeSentenceTransformer:
+    max_seq_length = 8
+
+    def __init__(self, model_name, device=None):
+        self.batches = []
+
+    def eval(self):
+        return self
+
+    def tokenizer(self, texts, add_special_tokens, truncation, max_length):
+        # [CLS] words [SEP], truncated like a real tokenizer.
+        return {"input_ids": [[0] * min(len(text.split()) + 2, max_length) for text in texts]}
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+    def encode(self, texts, batch_size, convert_to_numpy, show_progress_bar):
+        self.batches.append((list(texts), batch_size))
+        return np.asarray([[len(text.split()), len(text)] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    pytest.importorskip("torch")
+    sentence_transformers = pytest.importorskip("sentence_transformers")
+    monkeypatch.setattr(sentence_transformers, "SentenceTransformer", FakeSentenceTransformer)
+    return BucketedEmbeddings("fake-model", bucket_size=2)
+
+
+def test_length_buckets():
+    buckets = length_buckets([5, 1, 3, 1, 9], 2)
+    assert [bucket.tolist() for bucket in buckets] == [[1, 3], [2, 0], [4]]
+    assert length_buckets([], 2) == []
+
+
+def test_texts_are_encoded_in_buckets_of_similar_length(embeddings):
+    texts = ["a b c d e f g", "a", "a b c", "a b", "a b c d", "a b c d e f g h i"]
+    vectors = embeddings.embed_array(texts)
+
+    # Results are in input order.
+    assert vectors.tolist() == [[len(text.split()), len(text)] for text in texts]
+    # One encode() per bucket, shortest first. Texts beyond max_seq_length tokens tie
+    # and keep their input order.
+    assert embeddings.model.batches == [
+        (["a", "a b"], 2),
+        (["a b c", "a b c d"], 2),
+        (["a b c d e f g", "a b c d e f g h i"], 2),
+    ]
+    assert embeddings.embed_array([]).shape == (0, 2)
+    assert embeddings.embed_query("a b") == [2.0, 3.0]
+
+
+def test_cosine_parity():
+    reference = np.asarray([[1.0, 0.0], [0.0, 2.0], [1.0, 1.0]])
+    candidate = np.asarray([[2.0, 0.0], [1.0, 0.0], [1.0, 0.9]])
+    parity = cosine_parity(reference, candidate)
+    assert parity[:2].tolist() == [1.0, 0.0]
+    assert 0.99 < parity[2] < 1.0
@@ -0,0 +1,188 @@
+"""
+Tests for the shared embedding server (app/embedding_server.py) and its client
+(app/embedding_client.py), talking over a real Unix socket under tmp_path.
+
+The server's model is replaced with a small fake that records the batches it
+is asked to embed.
+"""
+import asyncio
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app import embedding_client, embedding_server
+from app.embedding_cache import CachedEmbeddings, EmbeddingCache
+from app.embedding_client import EmbeddingServerError, EmbeddingServerUnavailable, RemoteEmbeddings
+
+MODEL = "test-model"
+
+
+class RecordingEmbeddings:
+    """Embeds a text as [length, number of "a"s], recording each batch."""
+
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def vector(text):
+    return [float(len(text)), float(text.count("a"))]
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    recording = RecordingEmbeddings()
+    embedder = CachedEmbeddings(recording, EmbeddingCache(MODEL, str(tmp_path / "cache")))
+    monkeypatch.setattr(embedding_server, "get_local_embedder", lambda model_name, inference: embedder)
+    return recording
+
+
+@pytest.fixture
+def start_server(model):
+    """Starts servers on an event loop thread each; all are stopped after the test."""
+    running = []
+
+    def start(path):
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(embedding_server.EmbeddingServer(path, [MODEL]).serve())
+
+        def run():
+            try:
+                loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                pending = asyncio.all_tasks(loop)
+                for other in pending:
+                    other.cancel()
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                loop.close()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+
+        def stop():
+            if thread.is_alive():
+                loop.call_soon_threadsafe(task.cancel)
+                thread.join(timeout=5)
+
+        running.append(stop)
+        wait_until_listening(path)
+        return stop
+
+    yield start
+    for stop in running:
+        stop()
+
+
+def wait_until_listening(path, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(path)
+                return
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "embed.sock")
+
+
+def test_parse_request():
+    request = embedding_client.encode_request(MODEL, "int8", ["a", "b"], query=True)
+    (length,) = embedding_client.REQUEST_HEADER.unpack(request[:4])
+    assert embedding_server.parse_request(request[4:4 + length]) == (MODEL, "int8", ["a", "b"], True)
+    assert embedding_server.parse_request(b'{"model": "m", "texts": []}')[3] is False
+
+    for body in (
+        b'{"texts": ["a"]}',
+        b'{"model": "m", "texts": "a"}',
+        b'{"model": "m", "texts": ["a", 1]}',
+        b'{"model": "m", "texts": ["a"], "inference": "fp16"}',
+        b"not json",
+    ):
+        with pytest.raises(ValueError):
+            embedding_server.parse_request(body)
+
+
+def test_documents_and_queries_round_trip(start_server, socket_path, model):
+    start_server(socket_path)
+    client = RemoteEmbeddings(socket_path, MODEL)
+
+    matrix = client.embed_array(["plumber", "data analyst"])
+    assert matrix.dtype == np.dtype("<f4") and matrix.tolist() == [vector("plumber"), vector("data analyst")]
+    assert client.embed_documents(["plumber"]) == [vector("plumber")]
+    assert client.embed_query("banana") == vector("banana")
+    # The document was embedded once, then served from the server's cache.
+    assert model.batches == [["plumber", "data analyst"], ["banana"]]
+    assert client.embed_array([]).shape == (0, 0)
+
+
+def test_server_errors_are_reported_on_the_same_connection(start_server, socket_path):
+    start_server(socket_path)
+    client = RemoteEmbeddings(socket_path, "other-model", fallback=lambda: pytest.fail("server was reachable"))
+    with pytest.raises(EmbeddingServerError, match="not served here"):
+        client.embed_documents(["plumber"])
+
+    client.model_name = MODEL
+    assert client.embed_documents(["plumber"]) == [vector("plumber")]
+
+
+def test_concurrent_requests_are_micro_batched(start_server, socket_path, model, monkeypatch):
+    monkeypatch.setattr(embedding_server, "MAX_WAIT_MS", 200)
+    start_server(socket_path)
+    client = RemoteEmbeddings(socket_path, MODEL)
+    texts = [f"{'a' * n}job" for n in range(8)]
+    barrier = threading.Barrier(len(texts))
+    results = {}
+
+    def request(text):
+        client._connection()  # connect first, so the requests go out together
+        barrier.wait()
+        results[text] = client.embed_documents([text])[0]
+
+    threads = [threading.Thread(target=request, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert results == {text: vector(text) for text in texts}
+    assert len(model.batches) < len(texts)
+    assert sorted(text for batch in model.batches for text in batch) == sorted(texts)
+
+
+def test_client_reconnects_after_a_server_restart(start_server, socket_path):
+    stop = start_server(socket_path)
+    client = RemoteEmbeddings(socket_path, MODEL)
+    assert client.embed_documents(["plumber"]) == [vector("plumber")]
+    stop()
+    start_server(socket_path)
+    assert client.embed_documents(["welder"]) == [vector("welder")]
+
+
+def test_unreachable_server_falls_back_to_local_model(tmp_path):
+    local = RecordingEmbeddings()
+    missing = RemoteEmbeddings(str(tmp_path / "missing.sock"), MODEL)
+    with pytest.raises(EmbeddingServerUnavailable):
+        missing.embed_documents(["plumber"])
+
+    # Any socket error counts, not only refused connections: here the path is too long to connect to.
+    unusable = RemoteEmbeddings(str(tmp_path / ("x" * 120)), MODEL, fallback=lambda: local)
+    assert unusable.embed_documents(["plumber"]) == [vector("plumber")]
+    assert unusable.embed_query("welder") == vector("welder")
+    assert local.batches == [["plumber"], ["welder"]]
@@ -0,0 +1,47 @@
+"""
+Tests for reading a model's embedding dimension (app/embeddings.py) from its
+configuration. The model directories hold configuration files only, no weights.
+"""
+import json
+
+import pytest
+
+from app.embeddings import embedding_dimension
+
+TRANSFORMER = {"idx": 0, "name": "0", "path": "", "type": "sentence_transformers.models.Transformer"}
+POOLING = {"idx": 1, "name": "1", "path": "1_Pooling", "type": "sentence_transformers.models.Pooling"}
+DENSE = {"idx": 2, "name": "2", "path": "2_Dense", "type": "sentence_transformers.models.Dense"}
+
+
+def model_dir(tmp_path, modules=None, **configs):
+    if modules is not None:
+        (tmp_path / "modules.json").write_text(json.dumps(modules))
+    for path, config in configs.items():
+        target = tmp_path / path.replace("__", "/")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(json.dumps(config))
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("pooling, dim", [
+    ({"word_embedding_dimension": 384, "pooling_mode_mean_tokens": True, "pooling_mode_cls_token": False}, 384),
+    ({"word_embedding_dimension": 384, "pooling_mode_mean_tokens": True, "pooling_mode_max_tokens": True}, 768),
+    ({"embedding_dimension": 384, "pooling_mode": "mean"}, 384),
+])
+def test_pooling_dimension(tmp_path, pooling, dim):
+    assert embedding_dimension(model_dir(tmp_path, [TRANSFORMER, POOLING], **{"1_Pooling__config.json": pooling})) == dim
+
+
+def test_dense_projection(tmp_path):
+    path = model_dir(
+        tmp_path, [TRANSFORMER, POOLING, DENSE],
+        **{"1_Pooling__config.json": {"word_embedding_dimension": 768, "pooling_mode_mean_tokens": True},
+           "2_Dense__config.json": {"in_features": 768, "out_features": 256}},
+    )
+    assert embedding_dimension(path) == 256
+
+
+def test_plain_transformer_hidden_size(tmp_path):
+    pytest.importorskip("transformers")
+    path = model_dir(tmp_path, **{"config.json": {"model_type": "bert", "hidden_size": 312, "num_attention_heads": 12}})
+    assert embedding_dimension(path) == 312
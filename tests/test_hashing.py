@@ -0,0 +1,50 @@
+"""
+Tests for password hashing in the process pool (app/hashing.py) and its admission limit.
+"""
+import asyncio
+
+import pytest
+
+from app import hashing
+from app.admission import AdmissionLimiter
+
+
+SIGNUP = {"phone_number": "9000000001", "password": "s3cret", "name": "Asha", "role": "seeker", "location_area": "Adajan"}
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A one-process hashing pool, shut down after the test."""
+    monkeypatch.setattr(hashing, "HASH_WORKERS", 1)
+    hashing.shutdown()
+    try:
+        yield
+    finally:
+        hashing.shutdown()
+
+
+def test_hash_and_verify_run_in_the_pool(pool):
+    async def round_trip():
+        hashed = await hashing.hash_password("s3cret")
+        return hashed, await hashing.verify_password("s3cret", hashed), await hashing.verify_password("nope", hashed)
+
+    hashed, right, wrong = asyncio.run(round_trip())
+    assert hashed.startswith("$2b$") and right and not wrong
+
+
+def test_signup_then_login(client, pool):
+    assert client.post("/signup/", json=SIGNUP).status_code == 200
+
+    response = client.post("/token", data={"username": "9000000001", "password": "s3cret"})
+    assert response.status_code == 200 and response.json()["token_type"] == "bearer"
+    assert client.post("/token", data={"username": "9000000001", "password": "wrong"}).status_code == 401
+
+
+def test_a_full_hashing_queue_refuses_logins_with_503(client, db, pool, monkeypatch):
+    assert client.post("/signup/", json=SIGNUP).status_code == 200
+    # No free worker and no room to wait: the next call is refused.
+    monkeypatch.setattr(hashing, "hash_limiter", AdmissionLimiter(max_in_flight=0, max_waiting=0))
+
+    response = client.post("/token", data={"username": "9000000001", "password": "s3cret"})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "1"
+    assert hashing.stats()["rejected"] == 1
@@ -0,0 +1,85 @@
+"""
+Tests for versioned job index directories (app/index_versions.py).
+"""
+import os
+
+import pytest
+
+from app import index_versions
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_versions, "ABANDONED_AFTER_SECONDS", 0)
+    return str(tmp_path)
+
+
+def create(root, model_name="all-MiniLM-L6-v2", dim=384):
+    return index_versions.create_version(model_name, dim, root=root)
+
+
+def test_create_and_activate(root):
+    assert index_versions.active_version(root) is None
+    version = index_versions.create_version("org/model v2", 768, "int8", root=root)
+    assert version.name.endswith("-org_model_v2-768d")
+    assert index_versions.load_version(version.name, root) == version
+    assert version.chroma_path == os.path.join(version.path, "chroma")
+    assert index_versions.active_version(root) is None
+
+    index_versions.activate(version, root)
+    assert index_versions.active_version(root) == version
+    assert not [name for name in os.listdir(root) if name.endswith(".tmp")]
+
+
+def test_gc_keeps_the_previous_version_for_rollback(root):
+    served = []
+    for _ in range(4):
+        served.append(create(root))
+        index_versions.activate(served[-1], root)
+    assert index_versions.list_versions(root) == [served[2].name, served[3].name]
+
+    # Rolling back keeps the newer version too.
+    index_versions.activate(served[2], root)
+    assert index_versions.list_versions(root) == [served[2].name, served[3].name]
+
+
+def test_gc_removes_abandoned_builds(root):
+    previous = create(root)
+    index_versions.activate(previous, root)
+    abandoned_before = create(root)
+    active = create(root)
+    abandoned_after = create(root)
+    building = create(root)
+
+    with index_versions.locked(building):
+        index_versions.activate(active, root)
+        # Never-active builds go, whether older or newer; the one being built stays.
+        assert index_versions.list_versions(root) == [previous.name, active.name, building.name]
+
+
+def test_gc_leaves_new_and_locked_versions(root, monkeypatch):
+    old = [create(root)]
+    index_versions.activate(old[0], root)
+    old.append(create(root))
+    index_versions.activate(old[1], root)
+    with index_versions.locked(old[0]):
+        # An incremental run still writing the version it started on.
+        old.append(create(root))
+        index_versions.activate(old[2], root)
+    assert index_versions.list_versions(root) == [version.name for version in old]
+
+    monkeypatch.setattr(index_versions, "ABANDONED_AFTER_SECONDS", 600)
+    # Created a moment ago, and not yet locked by its build.
+    just_created = create(root)
+    index_versions.activate(old[2], root)
+    assert index_versions.list_versions(root) == [old[1].name, old[2].name, just_created.name]
+
+
+def test_a_version_is_written_by_one_run_at_a_time(root):
+    version = create(root)
+    with index_versions.locked(version):
+        with pytest.raises(index_versions.VersionLocked):
+            with index_versions.locked(version):
+                pass
+    with index_versions.locked(version):
+        pass
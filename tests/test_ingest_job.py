@@ -0,0 +1,254 @@
+"""
+Tests for ingestion (ingest_job.py): the embedding pipeline, the vector-store
+writer and incremental runs, into a real ChromaDB store and index segments
+under tmp_path.
+
+The job query is MySQL SQL (GROUP_CONCAT ... SEPARATOR), so the jobs table is a
+list read with the same (updated_at, id) keyset contract, and embeddings are
+word-hash vectors instead of a model. Embedding runs in-process (workers=0):
+worker processes load a real model by name.
+"""
+import os
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pytest
+
+pytest.importorskip("chromadb")
+
+import ingest_job
+from app import index_versions
+from app.embedding_cache import CachedEmbeddings, EmbeddingCache
+from app.vector_index import JobVectorIndex
+
+DIM = 16
+T0 = datetime(2024, 1, 1)
+
+
+class JobRow(NamedTuple):
+    job_id: int
+    title: str
+    description: str
+    location_area: str
+    location_area_norm: Optional[str]
+    updated_at: datetime
+    skills: Optional[str]
+    skill_ids: Optional[str]
+
+
+class WordVectors:
+    """Embeds a text as the sum of one fixed random vector per word, and records what it embedded."""
+
+    def __init__(self):
+        self.embedded = []
+        self.fail_on = None
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        vectors = []
+        for text in texts:
+            if self.fail_on and self.fail_on in text:
+                raise RuntimeError("embedding failed")
+            vector = np.zeros(DIM)
+            for word in text.lower().split():
+                vector += np.random.default_rng(zlib.crc32(word.encode())).standard_normal(DIM)
+            vectors.append(vector.tolist())
+        return vectors
+
+
+def job(job_id, title, updated_at, location="Adajan", skills=None):
+    skills = skills or {}
+    return JobRow(
+        job_id, title, f"{title} work", location, location.lower(), updated_at,
+        ", ".join(skills.values()) or None, ",".join(str(s) for s in skills) or None,
+    )
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    """The jobs "table": a dict by id, read by ingest_job as stream_changed_jobs would read MySQL."""
+    table = {}
+    reads = []
+
+    def stream_changed_jobs(after_updated_at, after_id, batch_size):
+        reads.append((after_updated_at, after_id))
+        rows = sorted(
+            (row for row in table.values() if (row.updated_at, row.job_id) > (after_updated_at, after_id)),
+            key=lambda row: (row.updated_at, row.job_id),
+        )
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    monkeypatch.setattr(ingest_job, "stream_changed_jobs", stream_changed_jobs)
+    monkeypatch.setattr(ingest_job, "fetch_all_job_ids", lambda: set(table))
+    return table, reads
+
+
+@pytest.fixture
+def embedder(tmp_path, monkeypatch):
+    model = WordVectors()
+    cached = CachedEmbeddings(model, EmbeddingCache("word-vectors", str(tmp_path / "embedding_cache")))
+    monkeypatch.setattr(ingest_job, "get_embedder", lambda model_name, inference: cached)
+    return model
+
+
+@pytest.fixture
+def version(tmp_path):
+    return index_versions.create_version("word-vectors", DIM, root=str(tmp_path / "job_index"))
+
+
+def stored(version):
+    collection = ingest_job.open_vector_store(version)
+    return sorted(ingest_job.job_id_of(i) for i in collection.get(include=[])["ids"])
+
+
+def test_prepare_documents():
+    rows = [
+        job(1, "Plumber", T0, "Adajan", {3: "Plumbing", 17: "Welding"}),
+        job(2, "Helper", T0, "Vesu"),
+    ]
+    documents, metadatas = ingest_job.prepare_documents(rows)
+    assert documents[0] == (
+        "Job Title: Plumber. Location: Adajan. Description: Plumber work. Required Skills: Plumbing, Welding."
+    )
+    assert documents[1].endswith("Required Skills: None specified.")
+    assert metadatas == [
+        {"job_id": 1, "location_area_norm": "adajan", "skill_ids": ",3,17,"},
+        {"job_id": 2, "location_area_norm": "vesu", "skill_ids": ""},
+    ]
+
+
+def test_vector_ids_round_trip():
+    assert ingest_job.vector_id(42) == "job-42"
+    assert ingest_job.job_id_of(ingest_job.vector_id(42)) == 42
+
+
+def test_state_round_trip(version):
+    assert ingest_job.load_state(version) == (ingest_job.EPOCH, 0, False)
+    ingest_job.save_state(version, T0, 7)
+    assert ingest_job.load_state(version) == (T0, 7, False)
+    ingest_job.save_state(version, T0 + timedelta(hours=1), 9, published=True)
+    assert ingest_job.load_state(version) == (T0 + timedelta(hours=1), 9, True)
+    assert os.listdir(version.chroma_path) == [ingest_job.STATE_FILE_NAME]
+
+
+def test_incremental_run_only_reads_changed_jobs(jobs, embedder, version, capsys):
+    table, reads = jobs
+    for i in range(1, 6):
+        table[i] = job(i, f"Job {i}", T0 + timedelta(days=i))
+    ingest_job.ingest_into(version, batch_size=2, workers=0)
+
+    assert stored(version) == [1, 2, 3, 4, 5]
+    assert ingest_job.load_state(version) == (T0 + timedelta(days=5), 5, True)
+    assert sorted(JobVectorIndex.open(version.path).job_ids.tolist()) == [1, 2, 3, 4, 5]
+
+    # Job 2 changes, job 3 is deleted, job 6 is new.
+    table[2] = job(2, "Job 2 carpenter", T0 + timedelta(days=10))
+    del table[3]
+    table[6] = job(6, "Job 6", T0 + timedelta(days=11))
+    embedder.embedded.clear()
+    capsys.readouterr()
+    ingest_job.ingest_into(version, batch_size=2, workers=0)
+
+    # Resumed from the saved watermark (less the overlap) instead of the start.
+    assert reads[-1] == (T0 + timedelta(days=5) - ingest_job.WATERMARK_OVERLAP, 0)
+    # Job 5 is re-read by the overlap, but its document is already cached.
+    assert [text.split(".")[0] for text in embedder.embedded] == ["Job Title: Job 2 carpenter", "Job Title: Job 6"]
+    assert "upserted 3 jobs and removed 1 deleted jobs" in capsys.readouterr().out
+    assert stored(version) == [1, 2, 4, 5, 6]
+
+    index = JobVectorIndex.open(version.path)
+    assert sorted(index.job_ids.tolist()) == [1, 2, 4, 5, 6]
+    # Job 2's row holds the vector of its new document.
+    document = ingest_job.prepare_documents([table[2]])[0][0]
+    (job_id, score), = index.search(np.asarray(embedder.embed_documents([document])[0]), k=1)
+    assert job_id == 2 and score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_interrupted_run_resumes_from_last_batch(jobs, embedder, version):
+    table, reads = jobs
+    for i in range(1, 6):
+        table[i] = job(i, f"Job {i}", T0 + timedelta(days=i))
+    embedder.fail_on = "Job 4"
+    with pytest.raises(RuntimeError):
+        ingest_job.ingest_into(version, batch_size=2, workers=0)
+
+    # The first two batches were written and checkpointed; nothing was published.
+    assert stored(version) == [1, 2]
+    assert ingest_job.load_state(version) == (T0 + timedelta(days=2), 2, False)
+    assert JobVectorIndex.open(version.path) is None
+
+    embedder.fail_on = None
+    ingest_job.ingest_into(version, batch_size=2, workers=0)
+    assert reads[-1] == (T0 + timedelta(days=2) - ingest_job.WATERMARK_OVERLAP, 0)
+    assert stored(version) == [1, 2, 3, 4, 5]
+    # The earlier run never published, so this one exports every vector, not only its own.
+    assert sorted(JobVectorIndex.open(version.path).job_ids.tolist()) == [1, 2, 3, 4, 5]
+
+
+def batches(count, size=2):
+    rows = [job(i, f"Job {i}", T0 + timedelta(days=i)) for i in range(1, count + 1)]
+    return [rows[start:start + size] for start in range(0, len(rows), size)]
+
+
+def test_embed_batches_keeps_order_and_counts_cache_hits(embedder):
+    first = list(ingest_job.embed_batches(batches(5), 0, "word-vectors", "fp32"))
+    assert [[row.job_id for row in jobs] for jobs, _, _, _ in first] == [[1, 2], [3, 4], [5]]
+    for jobs, documents, metadatas, (vectors, hits, misses) in first:
+        assert len(documents) == len(metadatas) == len(vectors) == len(jobs)
+        assert len(vectors[0]) == DIM
+        assert (hits, misses) == (0, len(jobs))
+
+    again = list(ingest_job.embed_batches(batches(5), 0, "word-vectors", "fp32"))
+    assert [embedded[1:] for _, _, _, embedded in again] == [(2, 0), (2, 0), (1, 0)]
+    assert [embedded[0] for _, _, _, embedded in again] == [embedded[0] for _, _, _, embedded in first]
+
+
+def test_writer_upserts_and_checkpoints_every_batch(embedder, version):
+    collection = ingest_job.open_vector_store(version)
+    writer = ingest_job.VectorStoreWriter(collection, version, queue_size=1)
+    for batch in ingest_job.embed_batches(batches(5), 0, "word-vectors", "fp32"):
+        writer.put(batch)
+    writer.close()
+
+    assert collection.count() == 5
+    assert writer.upserted == 5
+    assert writer.written_ids == [ingest_job.vector_id(i) for i in range(1, 6)]
+    assert (writer.cache_hits, writer.cache_misses) == (0, 5)
+    assert writer.peak_rss > 0 and writer.docs_per_second() > 0
+    assert ingest_job.load_state(version) == (T0 + timedelta(days=5), 5, False)
+    row = collection.get(ids=["job-3"], include=["metadatas", "documents"])
+    assert row["metadatas"] == [{"job_id": 3, "location_area_norm": "adajan", "skill_ids": ""}]
+    assert row["documents"][0].startswith("Job Title: Job 3.")
+
+
+def test_writer_failure_reaches_the_producer(embedder, version):
+    collection = ingest_job.open_vector_store(version)
+    writer = ingest_job.VectorStoreWriter(collection, version, queue_size=1)
+    good, bad, *rest = ingest_job.embed_batches(batches(8), 0, "word-vectors", "fp32")
+    writer.put(good)
+    jobs, documents, metadatas, (vectors, hits, misses) = bad
+    # Chroma refuses vectors of another dimension than the collection's.
+    writer.put((jobs, documents, metadatas, ([vector[:4] for vector in vectors], hits, misses)))
+
+    # The writer keeps draining after failing, so the producer gets the error instead of blocking.
+    errors = []
+
+    def produce():
+        try:
+            for batch in rest * 10:
+                writer.put(batch)
+        except RuntimeError as e:
+            errors.append(e)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    producer.join(timeout=10)
+    assert not producer.is_alive() and errors
+    with pytest.raises(RuntimeError, match="Vector store writer failed"):
+        writer.close()
+    assert collection.count() == 2
+    assert ingest_job.load_state(version) == (T0 + timedelta(days=2), 2, False)
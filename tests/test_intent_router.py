@@ -0,0 +1,91 @@
+"""
+Tests for the rule-based chat fast path (app/intent_router.py).
+"""
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import intent_router, models
+
+
+@pytest.fixture
+def router(db, monkeypatch):
+    monkeypatch.setattr(intent_router, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    return intent_router.IntentRouter()
+
+
+def add_jobs(db, *jobs):
+    skills = {}
+    for title, area, skill_names in jobs:
+        job = models.Job(title=title, description="", location_area=area)
+        for name in skill_names:
+            if name not in skills:
+                skills[name] = models.Skill(name=name, category="Trade")
+            job.required_skills.append(skills[name])
+        db.add(job)
+    db.commit()
+    return skills
+
+
+def answer_lines(answer):
+    return answer.splitlines()[1:] if answer else answer
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    automaton = intent_router.AhoCorasick()
+    for pattern in ("he", "she", "hers"):
+        automaton.add(pattern, "skill", pattern)
+    automaton.build()
+    found = {(m.start, m.end, m.value) for m in automaton.find_all("ushers")}
+    assert found == {(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")}
+
+
+def test_routes_skill_and_location_questions(router, db):
+    add_jobs(db, ("Bathroom repair", "Adajan", ["Plumber"]), ("Gate welding", "Adajan", ["Welder"]))
+    assert answer_lines(router.route("Any plumber jobs in Adajan?")) == ["- 'Bathroom repair' in Adajan"]
+    assert router.route("Show me plumbers jobs").startswith("Here are the jobs I found:")
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("Adajan-Gam", "adajan gam"),
+    ("Piplod, Surat", "Piplod Surat"),
+    ("St. Xavier Road", "st xavier road"),
+    ("Adajan  Gam", "Adajan Gam"),
+])
+def test_areas_with_punctuation_or_extra_spaces_find_their_jobs(router, db, stored, asked):
+    add_jobs(db, ("Bathroom repair", stored, ["Plumber"]))
+    assert answer_lines(router.route(f"plumber jobs in {asked}")) == [f"- 'Bathroom repair' in {stored}"]
+
+
+def test_spellings_of_one_area_are_answered_together(router, db):
+    add_jobs(
+        db,
+        ("Bathroom repair", "Adajan-Gam", ["Plumber"]),
+        ("Kitchen sink", " adajan gam", ["Plumber"]),
+        ("Gate welding", "Adajan", ["Plumber"]),  # a different area, not a spelling of it
+    )
+    answer = router.route("plumber jobs in Adajan Gam")
+    assert answer.startswith("Here are the jobs I found in Adajan Gam:")
+    assert sorted(answer_lines(answer)) == ["- 'Bathroom repair' in Adajan-Gam", "- 'Kitchen sink' in  adajan gam"]
+    assert router.entities("Plumber jobs in ADAJAN-GAM")[1] == frozenset({"adajan gam"})
+
+
+def test_open_ended_and_ambiguous_questions_go_to_the_agent(router, db):
+    add_jobs(db, ("Bathroom repair", "Adajan", ["Plumber"]), ("Kitchen sink", "Vesu", ["Plumber"]))
+    assert router.route("Which plumber jobs in Adajan pay the most?") is None
+    assert router.route("plumber jobs in Adajan or Vesu") is None
+    assert router.route("plumber") is None  # not about jobs
+    assert router.route("") is None
+
+
+def test_no_matching_jobs(router, db):
+    add_jobs(db, ("Bathroom repair", "Adajan", ["Plumber"]), ("Gate welding", "Vesu", ["Welder"]))
+    assert router.route("welder jobs in adajan").startswith("Sorry, I couldn't find any matching jobs in Adajan")
+
+
+def test_new_areas_are_seen_after_invalidate(router, db):
+    add_jobs(db, ("Bathroom repair", "Adajan", ["Plumber"]))
+    assert router.route("jobs in Vesu") is None
+    db.add(models.Job(title="Kitchen sink", description="", location_area="Vesu"))
+    db.commit()
+    router.invalidate()
+    assert answer_lines(router.route("jobs in Vesu")) == ["- 'Kitchen sink' in Vesu"]
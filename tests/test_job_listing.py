@@ -0,0 +1,96 @@
+"""
+Tests for the public job board, GET /jobs/.
+"""
+from sqlalchemy import event
+
+from app import models
+
+
+def add_board(db, jobs=30):
+    """Jobs by two employers, each requiring two of three skills."""
+    skills = [models.Skill(name=name, category="Trade") for name in ("Plumber", "Electrician", "Welder")]
+    owners = [
+        models.User(phone_number=f"800000000{n}", hashed_password="x", name=f"Employer {n}", role="employer")
+        for n in range(2)
+    ]
+    db.add_all(skills + owners)
+    areas = ("Adajan", "Vesu", "Adajan Gam")
+    for n in range(jobs):
+        job = models.Job(title=f"Job {n}", description="", location_area=areas[n % 3], owner=owners[n % 2])
+        job.required_skills.extend([skills[n % 3], skills[(n + 1) % 3]])
+        db.add(job)
+    db.commit()
+    return skills
+
+
+def listing_statements(client, db, url):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.expire_all()
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert response.status_code == 200, response.text
+    return len(statements), response.json()
+
+
+def test_listing_loads_a_page_in_two_queries(client, db):
+    add_board(db, jobs=30)
+    small_statements, small_page = listing_statements(client, db, "/jobs/?limit=2")
+    large_statements, large_page = listing_statements(client, db, "/jobs/?limit=25")
+
+    assert (len(small_page), len(large_page)) == (2, 25)
+    assert small_statements == large_statements == 2  # jobs with owners, then the page's skills
+
+
+def test_listing_serializes_owners_and_skills(client, db):
+    add_board(db, jobs=2)
+    first, second = client.get("/jobs/").json()
+
+    assert (first["employer_name"], second["employer_name"]) == ("Employer 0", "Employer 1")
+    assert [skill["name"] for skill in first["required_skills"]] == ["Plumber", "Electrician"]
+    assert first["location_area"] == "Adajan" and first["id"] < second["id"]
+
+
+def titles(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    return [job["title"] for job in response.json()]
+
+
+def test_skill_filters_match_any_of_the_skills(client, db):
+    plumber, electrician, welder = add_board(db, jobs=6)
+
+    # Job n requires skills n % 3 and (n + 1) % 3.
+    assert titles(client, f"/jobs/?skill_id={welder.id}") == ["Job 1", "Job 2", "Job 4", "Job 5"]
+    assert titles(client, "/jobs/?skill=%20Plumber%20") == ["Job 0", "Job 2", "Job 3", "Job 5"]
+    assert titles(client, f"/jobs/?skill=Plumber&skill_id={welder.id}") == [f"Job {n}" for n in range(6)]
+    assert titles(client, "/jobs/?skill=Carpenter") == []
+
+
+def test_location_filter_matches_the_start_of_the_area_ignoring_case(client, db):
+    add_board(db, jobs=6)
+
+    assert titles(client, "/jobs/?location_area=adajan") == ["Job 0", "Job 2", "Job 3", "Job 5"]
+    assert titles(client, "/jobs/?location_area=%20ADAJAN%20G") == ["Job 2", "Job 5"]
+    assert titles(client, "/jobs/?location_area=100%25") == []  # LIKE wildcards are literal
+
+
+def test_filters_combine_and_page_over_the_whole_board(client, db):
+    skills = add_board(db, jobs=30)
+    url = f"/jobs/?limit=2&location_area=vesu&skill_id={skills[0].id}"
+    first = client.get(url)
+    # Vesu jobs are n % 3 == 1; Plumber jobs are n % 3 in (0, 2).
+    assert [job["title"] for job in first.json()] == []
+
+    url = f"/jobs/?limit=2&location_area=vesu&skill_id={skills[1].id}"
+    first = client.get(url)
+    assert [job["title"] for job in first.json()] == ["Job 1", "Job 4"]
+    link = first.headers["Link"].split(";")[0].strip("<>")
+    assert [job["title"] for job in client.get(link).json()] == ["Job 7", "Job 10"]
@@ -0,0 +1,142 @@
+"""
+Tests for ranked job search, GET /jobs/search (app/job_search.py).
+
+The vector index is a real segment of an index version under tmp_path. Its
+vectors, like the query's, come from a word-group embedding in which words of
+one trade share a dimension, so "furniture" is close to a carpenter's job
+without sharing a word with it.
+"""
+from functools import partial
+
+import numpy as np
+import pytest
+from sqlalchemy import event
+
+from app import bm25_index, index_versions, job_search, models
+from app.vector_index import JobVectorIndex
+
+TRADES = (
+    {"plumber", "pipes", "plumbing"},
+    {"carpenter", "tables", "furniture", "carpentry"},
+    {"welder", "cnc", "welding"},
+    {"driver", "delivery", "van"},
+)
+
+
+class TradeVectors:
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        words = bm25_index.tokenize(text)
+        return [float(sum(word in trade for word in words)) for trade in TRADES] + [0.1]
+
+
+@pytest.fixture
+def search(db, bm25, tmp_path, monkeypatch):
+    """Jobs in the database, indexed for both vector and keyword search; returns a publish() helper."""
+    root = str(tmp_path / "job_index")
+    embedder = TradeVectors()
+    monkeypatch.setattr(job_search, "active_version", partial(index_versions.active_version, root=root))
+    monkeypatch.setattr(job_search, "get_embedder", lambda model_name, inference: embedder)
+    monkeypatch.setattr(job_search, "bm25_index", bm25)
+    monkeypatch.setattr("app.main.job_search", job_search.JobSearch())
+
+    owner = models.User(phone_number="8000000000", hashed_password="x", name="Employer", role="employer")
+    skills = {name: models.Skill(name=name, category="Trade") for name in ("Plumbing", "Carpentry", "Welding")}
+    for title, description, area, skill in (
+        ("Plumber", "Fix pipes", "Adajan", "Plumbing"),
+        ("Carpenter", "Make tables", "Vesu", "Carpentry"),
+        ("Welder", "CNC machine work", "Adajan", "Welding"),
+        ("Driver", "Delivery van work", "Vesu", None),
+    ):
+        job = models.Job(title=title, description=description, location_area=area, owner=owner)
+        if skill:
+            job.required_skills.append(skills[skill])
+        db.add(job)
+    db.commit()
+
+    def publish():
+        jobs = db.query(models.Job).order_by(models.Job.id).all()
+        index = JobVectorIndex.build(
+            [job.id for job in jobs],
+            np.asarray(embedder.embed_documents([bm25_index.job_text(job) for job in jobs])),
+            [job.location_area_norm for job in jobs],
+            [[skill.id for skill in job.required_skills] for job in jobs],
+        )
+        version = index_versions.active_version(root) or index_versions.create_version(
+            "trade-vectors", len(TRADES) + 1, root=root
+        )
+        index.save(version.path)
+        index_versions.activate(version, root)
+
+    publish()
+    return publish
+
+
+def titles(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    return [hit["job"]["title"] for hit in response.json()]
+
+
+def test_vector_search_finds_related_words(client, search):
+    assert titles(client, "/jobs/search?q=furniture&mode=vector")[0] == "Carpenter"
+    assert titles(client, "/jobs/search?q=furniture&mode=keyword") == []
+
+
+def test_keyword_search_matches_exact_terms(client, search):
+    assert titles(client, "/jobs/search?q=CNC&mode=keyword") == ["Welder"]
+
+
+def test_hybrid_search_fuses_both_rankings(client, search):
+    # Both rankings put the welder first; only the vectors know furniture.
+    assert titles(client, "/jobs/search?q=furniture+cnc&k=2") == ["Welder", "Carpenter"]
+
+
+@pytest.mark.parametrize("mode", ["vector", "keyword", "hybrid"])
+def test_filters_apply_before_ranking(client, search, mode):
+    in_adajan = titles(client, f"/jobs/search?q=work+pipes&mode={mode}&location_area=ADAJAN")
+    assert sorted(in_adajan) == ["Plumber", "Welder"]
+    assert titles(client, f"/jobs/search?q=work+pipes+tables&mode={mode}&skill=Carpentry") == ["Carpenter"]
+
+
+def test_results_are_loaded_in_one_query(client, db, search):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.expire_all()
+    event.listen(db.get_bind(), "before_cursor_execute", count)
+    try:
+        hits = client.get("/jobs/search?q=pipes&mode=vector&k=4").json()
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", count)
+
+    assert len(statements) == 1
+    assert len(hits) == 4 and hits[0]["score"] > hits[1]["score"]
+    assert hits[0]["job"]["employer_name"] == "Employer"
+    assert [skill["name"] for skill in hits[0]["job"]["required_skills"]] == ["Plumbing"]
+
+
+def test_jobs_deleted_since_ingestion_are_left_out(client, db, search):
+    db.delete(db.query(models.Job).filter_by(title="Carpenter").one())
+    db.commit()
+    assert "Carpenter" not in titles(client, "/jobs/search?q=furniture&mode=vector")
+
+
+def test_new_segments_are_picked_up(client, db, search, monkeypatch):
+    monkeypatch.setattr(job_search, "RECHECK_SECONDS", 0)
+    owner = db.query(models.User).one()
+    db.add(models.Job(title="Van driver", description="Delivery", location_area="Vesu", owner=owner))
+    db.commit()
+    assert "Van driver" not in titles(client, "/jobs/search?q=van&mode=vector")
+    search()
+    assert "Van driver" in titles(client, "/jobs/search?q=van&mode=vector")
+
+
+def test_reciprocal_rank_fusion():
+    fused = job_search.reciprocal_rank_fusion([[(1, 0.9), (2, 0.8)], [(2, 7.0), (3, 5.0)]], k=60)
+    assert [job_id for job_id, _ in fused] == [2, 1, 3]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
@@ -0,0 +1,89 @@
+"""
+Tests for the in-memory skill index (app/matching.py) and its refresh on skill writes.
+"""
+from datetime import timedelta
+
+from app import crud, matching, models, schemas
+
+
+def add_skills(db, count):
+    skills = [models.Skill(name=f"Skill {n}", category="Trade") for n in range(count)]
+    db.add_all(skills)
+    db.commit()
+    return [skill.id for skill in skills]
+
+
+def add_seeker(db, phone_number):
+    return crud.create_user(
+        db, schemas.UserCreate(phone_number=phone_number, password="x", name=phone_number, role="seeker", location_area="Adajan")
+    )
+
+
+def test_load_and_match(db):
+    skill_ids = add_skills(db, 3)
+    first, second, third = (add_seeker(db, f"900000000{n}") for n in range(3))
+    crud.update_user_skills(db, first, skill_ids[:1])
+    crud.update_user_skills(db, second, skill_ids[:2])
+    crud.update_user_skills(db, third, skill_ids[2:])
+    employer = models.User(phone_number="8000000001", hashed_password="x", role="employer")
+    employer.skills.append(db.get(models.Skill, skill_ids[0]))  # employers are never matched
+    db.add(employer)
+    db.commit()
+
+    index = matching.SkillIndex()
+    index.load(db)
+
+    assert index.matching_seeker_ids([skill_ids[0]]) == [first.id, second.id]
+    assert index.matching_seeker_ids([skill_ids[1], skill_ids[2]]) == [second.id, third.id]
+    assert index.count_matching_seekers(skill_ids) == 3
+    assert index.count_matching_seekers([]) == 0
+
+
+def test_writes_through_crud_update_the_index(db, monkeypatch):
+    index = matching.SkillIndex()
+    monkeypatch.setattr(crud, "skill_index", index)
+    skill_ids = add_skills(db, 2)
+    index.load(db)
+    seeker = add_seeker(db, "9000000001")
+    crud.update_user_skills(db, seeker, skill_ids)
+    assert index.matching_seeker_ids([skill_ids[1]]) == [seeker.id]
+
+    crud.update_user_skills(db, seeker, [skill_ids[0]])
+    assert index.count_matching_seekers([skill_ids[1]]) == 0
+    assert index.count_matching_seekers([skill_ids[0]]) == 1
+
+
+def test_refresh_catches_up_on_writes_from_other_processes(db, monkeypatch):
+    monkeypatch.setattr(matching, "RECHECK_SECONDS", 0)
+    skill_ids = add_skills(db, 2)
+    seeker = add_seeker(db, "9000000001")
+    crud.update_user_skills(db, seeker, [skill_ids[0]])
+    index = matching.SkillIndex()  # another worker's copy: sees none of the writes below
+    index.load(db)
+
+    crud.update_user_skills(db, seeker, [skill_ids[1]])
+    newcomer = add_seeker(db, "9000000002")
+    crud.update_user_skills(db, newcomer, skill_ids)
+    assert index.matching_seeker_ids([skill_ids[1]]) == []
+
+    index.refresh(db)
+    assert index.matching_seeker_ids([skill_ids[0]]) == [newcomer.id]
+    assert index.matching_seeker_ids([skill_ids[1]]) == [seeker.id, newcomer.id]
+
+
+def test_refresh_rereads_the_overlap_before_the_watermark(db, monkeypatch):
+    monkeypatch.setattr(matching, "RECHECK_SECONDS", 0)
+    skill_ids = add_skills(db, 1)
+    seeker = add_seeker(db, "9000000001")
+    crud.update_user_skills(db, seeker, skill_ids)
+    index = matching.SkillIndex()
+    index.load(db)
+
+    # A slow transaction commits a timestamp older than the watermark after the scan.
+    late = add_seeker(db, "9000000002")
+    late.skills.append(db.get(models.Skill, skill_ids[0]))
+    late.skills_updated_at = seeker.skills_updated_at - timedelta(seconds=30)
+    db.commit()
+
+    index.refresh(db)
+    assert index.matching_seeker_ids(skill_ids) == [seeker.id, late.id]
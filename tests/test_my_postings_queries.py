@@ -0,0 +1,90 @@
+"""
+Query-count test for GET /jobs/my-postings/.
+
+The endpoint must issue the same number of SQL statements whatever the number
+of jobs the employer owns. Requests go through the app with the database and the
+current user overridden, against an in-memory SQLite database built from the
+models, and statements are counted with a before_cursor_execute listener.
+"""
+import pytest
+from sqlalchemy import event
+
+from app import auth, crud, matching, models
+from app.principal_cache import Principal
+
+
+def add_user(db, phone_number, role, skills=()):
+    user = models.User(
+        phone_number=phone_number, hashed_password="x", name=phone_number, role=role, location_area="Adajan"
+    )
+    user.skills.extend(skills)
+    db.add(user)
+    return user
+
+
+def add_jobs(db, owner, count, skills):
+    for n in range(count):
+        job = models.Job(title=f"Job {n}", description="", location_area="Adajan", owner=owner)
+        job.required_skills.extend(skills[n % len(skills):][:2])
+        db.add(job)
+
+
+def my_postings_statements(client, db, owner):
+    """Calls GET /jobs/my-postings/ as the owner; returns the statements issued and the page."""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client.app.dependency_overrides[auth.get_current_principal] = lambda: Principal(
+        id=owner.id, phone_number=owner.phone_number, role=owner.role, is_active=True
+    )
+    db.expire_all()  # nothing may come from the identity map of the setup
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = client.get("/jobs/my-postings/")
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert response.status_code == 200, response.text
+    return len(statements), response.json()
+
+
+@pytest.mark.parametrize("index_loaded", [False, True], ids=["grouped-count", "skill-index"])
+def test_my_postings_query_count_is_constant(client, db, monkeypatch, index_loaded):
+    index = matching.SkillIndex()
+    monkeypatch.setattr("app.main.skill_index", index)
+    monkeypatch.setattr(matching, "RECHECK_SECONDS", 0)  # the index catches up on every request
+    skills = [models.Skill(name=f"Skill {n}", category="Trade") for n in range(5)]
+    db.add_all(skills)
+    for n in range(10):
+        add_user(db, f"90000000{n:02d}", "seeker", skills[n % 5:n % 5 + 2])
+    add_user(db, "8000000001", "employer")
+    add_user(db, "8000000002", "employer")
+    db.commit()
+    one_job_owner = crud.get_user_by_phone(db, "8000000001")
+    many_jobs_owner = crud.get_user_by_phone(db, "8000000002")
+    add_jobs(db, one_job_owner, 1, skills)
+    add_jobs(db, many_jobs_owner, 40, skills)
+    db.commit()
+    if index_loaded:
+        index.load(db)
+
+    one_job_statements, one_job_page = my_postings_statements(client, db, one_job_owner)
+    many_jobs_statements, many_jobs_page = my_postings_statements(client, db, many_jobs_owner)
+
+    assert len(one_job_page) == 1 and len(many_jobs_page) == 40
+    assert all(job["required_skills"] and job["matching_seekers_count"] > 0 for job in many_jobs_page)
+    # The skill index must agree with the grouped count query.
+    counts = crud.count_matching_seekers_by_owner(db, owner_id=many_jobs_owner.id)
+    assert {job["id"]: job["matching_seekers_count"] for job in many_jobs_page} == counts
+    assert many_jobs_statements == one_job_statements
+
+
+def test_my_postings_is_for_employers_only(client, db):
+    seeker = add_user(db, "9000000001", "seeker")
+    db.commit()
+    client.app.dependency_overrides[auth.get_current_principal] = lambda: Principal(
+        id=seeker.id, phone_number=seeker.phone_number, role="seeker", is_active=True
+    )
+    assert client.get("/jobs/my-postings/").status_code == 403
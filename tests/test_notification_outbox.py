@@ -0,0 +1,120 @@
+"""
+Tests for the notification outbox: fan-out, batch claims, retries and pruning
+(crud's outbox functions and app/notification_worker.py).
+"""
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, notification_worker, schemas
+
+
+@pytest.fixture
+def worker_db(db, monkeypatch):
+    """Lets the worker open its own sessions on the test database."""
+    monkeypatch.setattr(notification_worker, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(notification_worker, "backoff_seconds", lambda attempts: 60.0)
+    return db
+
+
+def post_job(db, seekers=3):
+    skill = models.Skill(name="Plumber", category="Trade")
+    employer = models.User(phone_number="8000000001", hashed_password="x", name="Employer", role="employer")
+    db.add_all([skill, employer])
+    for n in range(seekers):
+        seeker = models.User(phone_number=f"900000000{n}", hashed_password="x", name=f"Seeker {n}", role="seeker")
+        seeker.skills.append(skill)
+        db.add(seeker)
+    db.commit()
+    job = schemas.JobCreate(title="Pipe fitting", description="", location_area="Adajan", required_skill_ids=[skill.id])
+    return crud.create_job(db, job, employer_id=employer.id)
+
+
+def outbox_rows(db, kind):
+    db.expire_all()
+    return db.query(models.NotificationOutbox).filter_by(kind=kind).order_by(models.NotificationOutbox.id).all()
+
+
+def make_due(db):
+    db.query(models.NotificationOutbox).update({"available_at": models.utcnow() - timedelta(seconds=1)})
+    db.commit()
+
+
+def test_create_job_queues_the_fan_out_in_its_transaction(db, bm25):
+    job = post_job(db)
+    [row] = outbox_rows(db, "job_posted")
+    assert (row.job_id, row.status, row.attempts) == (job.id, "pending", 0)
+
+
+def test_worker_fans_out_and_sends(worker_db, bm25, monkeypatch):
+    db = worker_db
+    sent = []
+    monkeypatch.setattr(
+        notification_worker.notifications, "send_job_notification",
+        lambda user_name, phone_number, job_title: sent.append(phone_number),
+    )
+    post_job(db, seekers=3)
+
+    assert notification_worker.process_batch() == 1  # the fan-out row
+    assert [row.status for row in outbox_rows(db, "job_posted")] == ["sent"]
+    assert len(outbox_rows(db, "job_notification")) == 3
+
+    assert notification_worker.process_batch() == 3
+    assert sorted(sent) == ["9000000000", "9000000001", "9000000002"]
+    assert crud.get_outbox_depth(db) == {"sent": 4}
+
+
+def test_claimed_rows_are_hidden_until_the_visibility_timeout(db, bm25):
+    post_job(db)
+    first = crud.claim_outbox_batch(db, batch_size=10, visibility_timeout=300, max_attempts=5)
+    assert [(item.kind, item.attempts) for item in first] == [("job_posted", 1)]
+    assert crud.claim_outbox_batch(db, batch_size=10, visibility_timeout=300, max_attempts=5) == []
+
+    # The worker holding it died: the row comes due again and is claimed a second time.
+    make_due(db)
+    [again] = crud.claim_outbox_batch(db, batch_size=10, visibility_timeout=300, max_attempts=5)
+    assert (again.id, again.attempts) == (first[0].id, 2)
+
+    make_due(db)
+    assert crud.claim_outbox_batch(db, batch_size=10, visibility_timeout=300, max_attempts=2) == []
+    [row] = outbox_rows(db, "job_posted")
+    assert row.status == "failed" and "2 attempts" in row.last_error
+
+
+def test_failed_sends_are_retried_with_backoff_then_given_up(worker_db, bm25, monkeypatch):
+    db = worker_db
+    monkeypatch.setattr(notification_worker, "MAX_ATTEMPTS", 2)
+
+    def send(user_name, phone_number, job_title):
+        if phone_number == "9000000001":
+            raise RuntimeError("SMS gateway down")
+
+    monkeypatch.setattr(notification_worker.notifications, "send_job_notification", send)
+    post_job(db, seekers=2)
+    notification_worker.process_batch()
+    notification_worker.process_batch()
+
+    failing = [row for row in outbox_rows(db, "job_notification") if row.status != "sent"]
+    assert len(failing) == 1
+    [row] = failing
+    assert (row.status, row.attempts, row.last_error) == ("pending", 1, "SMS gateway down")
+    assert row.available_at > models.utcnow() + timedelta(seconds=30)  # backed off, not retried at once
+    assert notification_worker.process_batch() == 0
+
+    make_due(db)
+    assert notification_worker.process_batch() == 1
+    db.refresh(row)
+    assert (row.status, row.attempts) == ("failed", 2)
+
+
+def test_prune_deletes_only_old_sent_rows(db, bm25):
+    post_job(db, seekers=2)
+    crud.fan_out_job_notifications(db, job_id=outbox_rows(db, "job_posted")[0].job_id)
+    db.commit()
+    rows = outbox_rows(db, "job_notification")
+    crud.mark_outbox_sent(db, [rows[0].id])
+    make_due(db)
+
+    assert crud.prune_outbox(db, older_than=timedelta(0), batch_size=1) == 1
+    assert crud.get_outbox_depth(db) == {"pending": 2}
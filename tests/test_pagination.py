@@ -0,0 +1,97 @@
+"""
+Tests for keyset cursor pagination (app/pagination.py) and its Link headers.
+"""
+import pytest
+from fastapi import HTTPException
+
+from app import auth, models, pagination
+from app.principal_cache import Principal
+
+
+def add_jobs(db, count):
+    owner = models.User(phone_number="8000000001", hashed_password="x", name="Employer", role="employer")
+    db.add(owner)
+    db.add_all(models.Job(title=f"Job {n}", description="", location_area="Adajan", owner=owner) for n in range(count))
+    db.commit()
+    return owner
+
+
+def next_url(response):
+    link = response.headers.get("Link")
+    if link is None:
+        return None
+    url, rel = link.split(";")
+    assert rel.strip() == 'rel="next"'
+    return url.strip().strip("<>")
+
+
+def test_cursor_round_trip():
+    cursor = pagination.encode_cursor(12345)
+    assert "=" not in cursor and "12345" not in cursor  # opaque and URL-safe
+    assert pagination.decode_cursor(cursor) == 12345
+    assert pagination.decode_cursor(None) is None
+    assert pagination.decode_cursor("") is None
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "eyJpZCI6ICJ4In0", "e30", "WzFd"])
+def test_invalid_cursors_are_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        pagination.decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_split_page():
+    class Row:
+        def __init__(self, id):
+            self.id = id
+
+    rows = [Row(n) for n in (3, 5, 8)]
+    page, cursor = pagination.split_page(rows, 2)
+    assert [row.id for row in page] == [3, 5] and pagination.decode_cursor(cursor) == 5
+    page, cursor = pagination.split_page(rows, 3)
+    assert len(page) == 3 and cursor is None
+
+
+def test_following_link_headers_visits_every_job_once(client, db):
+    add_jobs(db, 7)
+    seen, url, pages = [], "/jobs/?limit=3&location_area=adajan", 0
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        seen.extend(job["id"] for job in response.json())
+        url, pages = next_url(response), pages + 1
+        if url:
+            # Filters and the limit are carried over; the deprecated skip is not.
+            assert "location_area=adajan" in url and "limit=3" in url and "skip" not in url
+
+    assert pages == 3
+    assert seen == sorted(seen) and len(set(seen)) == 7
+
+
+def test_skip_is_dropped_from_the_next_link(client, db):
+    add_jobs(db, 5)
+    response = client.get("/jobs/?skip=1&limit=2")
+    assert [job["title"] for job in response.json()] == ["Job 1", "Job 2"]
+    following = client.get(next_url(response)).json()
+    assert [job["title"] for job in following] == ["Job 3", "Job 4"]
+
+
+def test_limits_are_capped_at_100(client, db):
+    owner = add_jobs(db, 105)
+    response = client.get("/jobs/?limit=1000")
+    assert len(response.json()) == 100 and "limit=100" in next_url(response)
+
+    client.app.dependency_overrides[auth.get_current_principal] = lambda: Principal(
+        id=owner.id, phone_number=owner.phone_number, role="employer", is_active=True
+    )
+    assert len(client.get("/jobs/my-postings/").json()) == 105  # no limit: every posting
+    response = client.get("/jobs/my-postings/?limit=500")
+    assert len(response.json()) == 100 and next_url(response) is not None
+
+
+def test_skills_pages(client, db):
+    db.add_all(models.Skill(name=f"Skill {n}", category="Trade") for n in range(3))
+    db.commit()
+    response = client.get("/skills/?limit=2")
+    assert [skill["name"] for skill in response.json()] == ["Skill 0", "Skill 1"]
+    assert [skill["name"] for skill in client.get(next_url(response)).json()] == ["Skill 2"]
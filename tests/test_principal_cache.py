@@ -0,0 +1,111 @@
+"""
+Tests for cached principals (app/principal_cache.py, auth.get_current_principal).
+"""
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app import auth, crud, models, principal_cache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fresh = principal_cache.PrincipalCache(ttl_seconds=60, max_size=100)
+    monkeypatch.setattr(auth, "principal_cache", fresh)
+    monkeypatch.setattr(crud, "principal_cache", fresh)
+    return fresh
+
+
+def add_user(db, phone_number="9000000001", role="seeker", is_active=True):
+    user = models.User(phone_number=phone_number, hashed_password="x", name="Asha", role=role, is_active=is_active)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def token_for(user, **claims):
+    data = {"sub": user.phone_number, **auth.principal_claims(user), **claims}
+    return auth.create_access_token(data, expires_delta=timedelta(minutes=5))
+
+
+def principal_with_statements(db, token):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        return auth.get_current_principal(token=token, db=db), len(statements)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+
+def test_a_cached_principal_needs_no_queries(db, cache):
+    user = add_user(db)
+    token = token_for(user)
+
+    principal, statements = principal_with_statements(db, token)
+    assert (principal.id, principal.role, statements) == (user.id, "seeker", 1)
+    assert principal_with_statements(db, token) == (principal, 0)
+
+
+def test_entries_expire_and_are_evicted_least_recently_used_first():
+    cache = principal_cache.PrincipalCache(ttl_seconds=0.05, max_size=2)
+    alice = principal_cache.Principal(id=1, phone_number="1", role="seeker", is_active=True)
+    cache.put("1", "a", alice)
+    assert cache.get("1", "a") == alice
+    time.sleep(0.1)
+    assert cache.get("1", "a") is None
+
+    cache = principal_cache.PrincipalCache(ttl_seconds=60, max_size=2)
+    for jti in ("a", "b"):
+        cache.put("1", jti, alice)
+    cache.get("1", "a")  # b is now the least recently used
+    cache.put("1", "c", alice)
+    assert [cache.get("1", jti) is not None for jti in ("a", "b", "c")] == [True, False, True]
+
+
+def test_skill_updates_invalidate_the_user(db, cache):
+    user = add_user(db)
+    token = token_for(user)
+    auth.get_current_principal(token=token, db=db)
+
+    crud.update_user_skills(db, user, [])
+    assert cache.get(user.phone_number, None) is None
+    _, statements = principal_with_statements(db, token)
+    assert statements == 1  # looked up again
+
+
+def test_inactive_users_are_rejected(db, cache):
+    user = add_user(db, is_active=False)
+    with pytest.raises(HTTPException) as error:
+        auth.get_current_principal(token=token_for(user), db=db)
+    assert error.value.status_code == 400
+
+
+def test_trusted_claims_skip_the_database_until_the_user_is_invalidated(db, cache, monkeypatch):
+    monkeypatch.setattr(auth, "TRUST_TOKEN_CLAIMS", True)
+    user = add_user(db, role="employer")
+    old_token = token_for(user)
+
+    principal, statements = principal_with_statements(db, old_token)
+    assert (principal.role, statements) == ("employer", 0)
+
+    cache.invalidate(user.phone_number)
+    _, statements = principal_with_statements(db, old_token)
+    assert statements == 1  # issued before the invalidation: its claims are stale
+    time.sleep(1.1)  # iat has one-second resolution
+    _, statements = principal_with_statements(db, token_for(user))
+    assert statements == 0
+
+
+def test_bad_tokens_are_a_401(db, cache):
+    for token in ("not-a-jwt", auth.create_access_token({"uid": 1})):
+        with pytest.raises(HTTPException) as error:
+            auth.get_current_principal(token=token, db=db)
+        assert error.value.status_code == 401
@@ -0,0 +1,83 @@
+"""
+Tests for the cached skill catalog (app/skill_catalog.py) and GET /skills/catalog/.
+"""
+import gzip
+
+import pytest
+
+from app import models, skill_catalog
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    fresh = skill_catalog.SkillCatalog()
+    monkeypatch.setattr("app.main.skill_catalog", fresh)
+    monkeypatch.setattr("app.crud.skill_catalog", fresh)
+    return fresh
+
+
+def add_skills(db, *names):
+    db.add_all(models.Skill(name=name, category="Trade") for name in names)
+    db.commit()
+
+
+def get_catalog(client, **headers):
+    return client.get("/skills/catalog/", headers={"Accept-Encoding": "identity", **headers})
+
+
+def test_catalog_has_a_strong_etag_and_honors_if_none_match(client, db, catalog):
+    add_skills(db, "Plumber", "Welder")
+    response = get_catalog(client)
+    etag = response.headers["ETag"]
+
+    assert [skill["name"] for skill in response.json()] == ["Plumber", "Welder"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    not_modified = get_catalog(client, **{"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+    assert get_catalog(client, **{"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert get_catalog(client, **{"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_compressed_bodies_have_their_own_etags(client, db, catalog):
+    add_skills(db, "Plumber")
+    plain = get_catalog(client)
+    compressed = client.get("/skills/catalog/", headers={"Accept-Encoding": "gzip"})
+
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.json() == plain.json()
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
+    # Either tag revalidates: the content is the same.
+    assert get_catalog(client, **{"If-None-Match": compressed.headers["ETag"]}).status_code == 304
+
+
+def test_choose_encoding_prefers_the_smallest_accepted():
+    snapshot = skill_catalog.CatalogSnapshot(
+        version=(1, 1), etag="abc", bodies={"identity": b"[]", "gzip": gzip.compress(b"[]"), "zstd": b"z"}
+    )
+    assert skill_catalog.choose_encoding(snapshot, "gzip, deflate, zstd") == "zstd"
+    assert skill_catalog.choose_encoding(snapshot, "gzip;q=1.0, br") == "gzip"
+    assert skill_catalog.choose_encoding(snapshot, "") == "identity"
+    assert skill_catalog.entity_tag(snapshot, "gzip") == '"abc-gzip"'
+
+
+def test_creating_a_skill_changes_the_etag(client, db, catalog):
+    add_skills(db, "Plumber")
+    etag = get_catalog(client).headers["ETag"]
+
+    assert client.post("/skills/", json={"name": "Welder", "category": "Trade"}).status_code == 201
+    response = get_catalog(client, **{"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [skill["name"] for skill in response.json()] == ["Plumber", "Welder"]
+
+
+def test_skills_added_by_other_workers_are_seen_after_the_recheck(client, db, catalog, monkeypatch):
+    add_skills(db, "Plumber")
+    etag = get_catalog(client).headers["ETag"]
+    add_skills(db, "Welder")  # not through this process's create_skill
+
+    assert get_catalog(client, **{"If-None-Match": etag}).status_code == 304
+    monkeypatch.setattr(skill_catalog, "RECHECK_SECONDS", 0)
+    assert get_catalog(client, **{"If-None-Match": etag}).status_code == 200
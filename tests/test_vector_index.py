@@ -0,0 +1,261 @@
+"""
+Tests for the memory-mapped job vector index (app/vector_index.py).
+"""
+import os
+
+import numpy as np
+import pytest
+
+from app import vector_index
+from app.vector_index import JobVectorIndex
+
+DIM = 32
+LOCATIONS = ("adajan", "adajan gam", "vesu", "varachha")
+
+
+def corpus(rows, seed=0, first_id=1):
+    """(job ids, vectors, locations, skill ids) for random jobs."""
+    rng = np.random.default_rng(seed)
+    job_ids = np.arange(first_id, first_id + rows)
+    vectors = rng.standard_normal((rows, DIM)).astype(np.float32)
+    locations = [LOCATIONS[i % len(LOCATIONS)] for i in range(rows)]
+    skill_ids = [[i % 5, 5 + i % 3] for i in range(rows)]
+    return job_ids, vectors, locations, skill_ids
+
+
+def exact(job_ids, vectors, query, k, rows=None):
+    """Brute-force cosine top-k as (job id, score), over the given rows."""
+    rows = np.arange(len(job_ids)) if rows is None else np.asarray(rows)
+    scores = vector_index.normalize_rows(vectors)[rows] @ (query / np.linalg.norm(query))
+    best = np.argsort(-scores)[:k]
+    return [(int(job_ids[rows[i]]), float(scores[i])) for i in best]
+
+
+def ids(hits):
+    return [job_id for job_id, _ in hits]
+
+
+def test_search_is_exact_cosine_top_k():
+    job_ids, vectors, locations, skill_ids = corpus(200)
+    index = JobVectorIndex.build(job_ids, vectors, locations, skill_ids)
+    query = np.random.default_rng(1).standard_normal(DIM)
+
+    hits, expected = index.search(query, 10), exact(job_ids, vectors, query, 10)
+    assert ids(hits) == ids(expected)
+    assert [score for _, score in hits] == pytest.approx([score for _, score in expected], abs=1e-5)
+    assert len(index.search(query, 500)) == 200
+    assert JobVectorIndex.empty().search(query, 10) == []
+
+
+def test_filters_match_location_prefixes_and_any_skill():
+    job_ids, vectors, locations, skill_ids = corpus(200)
+    index = JobVectorIndex.build(job_ids, vectors, locations, skill_ids)
+    query = np.random.default_rng(2).standard_normal(DIM)
+
+    adajan = [row for row, location in enumerate(locations) if location.startswith("adajan")]
+    assert ids(index.search(query, 10, location_area="adajan")) == ids(exact(job_ids, vectors, query, 10, adajan))
+
+    # Small candidate sets are scored on their own, large ones by masking a full scan; both agree.
+    for skills in ([0], [0, 1, 2, 3]):
+        rows = [row for row, s in enumerate(skill_ids) if set(s) & set(skills)]
+        assert ids(index.search(query, 10, skill_ids=skills)) == ids(exact(job_ids, vectors, query, 10, rows))
+
+    vesu_skill_6 = [row for row in range(200) if locations[row] == "vesu" and 6 in skill_ids[row]]
+    hits = index.search(query, 100, skill_ids=[6], location_area="vesu")
+    assert sorted(ids(hits)) == sorted(int(job_ids[row]) for row in vesu_skill_6)
+    assert index.search(query, 10, skill_ids=[99]) == []
+    assert index.search(query, 10, location_area="surat") == []
+
+
+def test_segments_are_memory_mapped_and_swapped_atomically(tmp_path):
+    directory = str(tmp_path)
+    assert JobVectorIndex.open(directory) is None
+
+    built = JobVectorIndex.build(*corpus(50))
+    first = built.save(directory)
+    opened = JobVectorIndex.open(directory)
+    assert isinstance(opened.vectors, np.memmap)
+    query = np.random.default_rng(1).standard_normal(DIM)
+    assert opened.search(query, 5) == built.search(query, 5)
+    assert opened.search(query, 5, skill_ids=[2], location_area="vesu") == built.search(
+        query, 5, skill_ids=[2], location_area="vesu"
+    )
+
+    second = JobVectorIndex.build(*corpus(10, seed=1)).save(directory)
+    third = JobVectorIndex.build(*corpus(20, seed=2)).save(directory)
+    assert JobVectorIndex.current_segment(directory) == third
+    assert len(JobVectorIndex.open(directory)) == 20
+    # A reader of the previous segment keeps it; older ones are removed.
+    assert sorted(os.listdir(tmp_path / "segments")) == [second, third]
+    assert first not in os.listdir(tmp_path / "segments")
+    assert len(JobVectorIndex.open(directory, second)) == 10
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_int8_rows_rank_like_float32(tmp_path):
+    job_ids, vectors, locations, skill_ids = corpus(500)
+    full = JobVectorIndex.build(job_ids, vectors, locations, skill_ids)
+    quantized = JobVectorIndex.build(job_ids, vectors, locations, skill_ids, quantize=True)
+    assert quantized.vectors.dtype == np.int8 and quantized.nbytes < full.nbytes / 3
+
+    quantized.save(str(tmp_path))
+    opened = JobVectorIndex.open(str(tmp_path))
+    assert opened.scales is not None
+    rng = np.random.default_rng(3)
+    for query in rng.standard_normal((20, DIM)):
+        expected = full.search(query, 10)
+        hits = opened.search(query, 10)
+        assert len(set(ids(hits)) & set(ids(expected))) >= 9
+        expected_scores = dict(expected)
+        for job_id, score in hits:
+            assert score == pytest.approx(expected_scores.get(job_id, score), abs=0.02)
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_merged_equals_a_full_build(quantize):
+    job_ids, vectors, locations, skill_ids = corpus(100)
+    current = JobVectorIndex.build(job_ids, vectors, locations, skill_ids, quantize=quantize)
+
+    # Jobs 10-19 change (new vectors, locations and skills), 20-24 are deleted, 101-105 are new.
+    changed_ids, changed_vectors, _, _ = corpus(10, seed=5, first_id=10)
+    new_ids, new_vectors, _, _ = corpus(5, seed=6, first_id=101)
+    update_ids = np.concatenate([changed_ids, new_ids])
+    update_vectors = np.concatenate([changed_vectors, new_vectors])
+    update_locations = ["vesu"] * len(update_ids)
+    update_skills = [[9]] * len(update_ids)
+    changed = JobVectorIndex.build(update_ids, update_vectors, update_locations, update_skills, quantize=quantize)
+    merged = current.merged(changed, removed_job_ids=range(20, 25))
+
+    rows = {int(job_id): row for row, job_id in enumerate(job_ids)}
+    expected_ids, expected_vectors, expected_locations, expected_skills = [], [], [], []
+    for job_id in job_ids:
+        if 10 <= job_id < 25:
+            continue
+        expected_ids.append(int(job_id))
+        expected_vectors.append(vectors[rows[int(job_id)]])
+        expected_locations.append(locations[rows[int(job_id)]])
+        expected_skills.append(skill_ids[rows[int(job_id)]])
+    full = JobVectorIndex.build(
+        expected_ids + update_ids.tolist(),
+        np.concatenate([np.asarray(expected_vectors), update_vectors]),
+        expected_locations + update_locations,
+        expected_skills + update_skills,
+        quantize=quantize,
+    )
+
+    assert sorted(merged.job_ids.tolist()) == sorted(full.job_ids.tolist())
+    rng = np.random.default_rng(7)
+    for query in rng.standard_normal((5, DIM)):
+        for filters in ({}, {"skill_ids": [9]}, {"location_area": "vesu"}, {"skill_ids": [1], "location_area": "ad"}):
+            merged_hits = merged.search(query, 10, **filters)
+            full_hits = full.search(query, 10, **filters)
+            assert ids(merged_hits) == ids(full_hits)
+            assert [s for _, s in merged_hits] == pytest.approx([s for _, s in full_hits], abs=1e-5)
+
+    # carried_rows maps rows kept from the current index back to it.
+    carried = merged.carried_rows
+    assert (carried[:len(carried) - len(update_ids)] >= 0).all() and (carried[-len(update_ids):] == -1).all()
+    assert (np.asarray(current.job_ids)[carried[carried >= 0]] == merged.job_ids[carried >= 0]).all()
+
+
+def test_merging_other_formats_is_refused():
+    job_ids, vectors, locations, skill_ids = corpus(10)
+    with pytest.raises(ValueError):
+        JobVectorIndex.build(job_ids, vectors, locations, skill_ids).merged(
+            JobVectorIndex.build(job_ids, vectors, locations, skill_ids, quantize=True)
+        )
+
+
+def test_export_rows_round_trips():
+    job_ids, vectors, locations, skill_ids = corpus(30)
+    index = JobVectorIndex.build(job_ids, vectors, locations, skill_ids)
+    exported_ids, exported_vectors, exported_locations, exported_skills = index.export_rows()
+    assert exported_ids.tolist() == job_ids.tolist()
+    assert np.allclose(exported_vectors, vector_index.normalize_rows(vectors))
+    assert exported_locations == locations
+    assert [sorted(s) for s in exported_skills] == [sorted(s) for s in skill_ids]
+
+
+# --- IVF ---
+def clustered(rows, clusters=20, seed=0, first_id=1):
+    """corpus() with vectors drawn around a few centres, as job embeddings are."""
+    job_ids, _, locations, skill_ids = corpus(rows, seed, first_id)
+    rng = np.random.default_rng(seed)
+    centres = np.random.default_rng(100).standard_normal((clusters, DIM))
+    vectors = centres[rng.integers(clusters, size=rows)] + 0.3 * rng.standard_normal((rows, DIM))
+    return job_ids, vectors.astype(np.float32), locations, skill_ids
+
+
+def recall(index, reference, queries, nprobe, **filters):
+    found = [
+        len(set(ids(index.search(q, 10, nprobe=nprobe, **filters))) & set(ids(reference.search(q, 10, **filters))))
+        for q in queries
+    ]
+    return sum(found) / (10 * len(queries))
+
+
+def test_ivf_trades_recall_for_fewer_scored_rows(tmp_path):
+    data = clustered(3000)
+    reference = JobVectorIndex.build(*data)
+    index = JobVectorIndex.build(*data)
+    index.build_ivf(nlist=20)
+    assert index.ivf_centroids.shape == (20, DIM)
+    assert np.bincount(index.ivf_assignments(), minlength=20).tolist() == np.diff(index._arrays["ivf_offsets"]).tolist()
+
+    queries = np.random.default_rng(5).standard_normal((30, DIM))
+    probed = index.probe_rows(queries[0] / np.linalg.norm(queries[0]), 2)
+    assert len(probed) < len(index) / 4
+    assert recall(index, reference, queries, nprobe=1) < recall(index, reference, queries, nprobe=8)
+    assert recall(index, reference, queries, nprobe=8) >= 0.95
+    # 0, or every list, is exact.
+    assert recall(index, reference, queries, nprobe=0) == recall(index, reference, queries, nprobe=20) == 1.0
+
+    index.save(str(tmp_path))
+    opened = JobVectorIndex.open(str(tmp_path))
+    assert np.array_equal(opened.ivf_centroids, index.ivf_centroids)
+    assert [opened.search(q, 10, nprobe=4) for q in queries] == [index.search(q, 10, nprobe=4) for q in queries]
+
+
+def test_ivf_falls_back_to_exact_search_for_sparse_candidates():
+    data = clustered(3000)
+    reference = JobVectorIndex.build(*data)
+    index = JobVectorIndex.build(*data)
+    index.build_ivf(nlist=20)
+    queries = np.random.default_rng(6).standard_normal((10, DIM))
+    # Few candidates are scored exactly, without probing.
+    assert recall(index, reference, queries, nprobe=1, skill_ids=[0], location_area="vesu") == 1.0
+    # Many are probed, unless the probed lists hold fewer than k of them.
+    many = [0, 1, 2, 3]
+    assert len(np.intersect1d(index.probe_rows(queries[0] / np.linalg.norm(queries[0]), 1),
+                              index.candidate_rows(skill_ids=many))) < 500
+    for query in queries:
+        assert index.search(query, 500, nprobe=1, skill_ids=many) == reference.search(query, 500, skill_ids=many)
+
+
+def test_ivf_reuses_centroids_until_the_index_outgrows_them():
+    data = clustered(1000)
+    current = JobVectorIndex.build(*data)
+    current.build_ivf(nlist=10)
+
+    # An incremental run: 50 jobs change, 100 are new.
+    update = clustered(150, seed=3, first_id=951)
+    merged = current.merged(JobVectorIndex.build(*update), removed_job_ids=[1, 2])
+    merged.build_ivf(nlist=10, previous=current)
+    assert np.array_equal(merged.ivf_centroids, current.ivf_centroids)
+    assert int(merged._arrays["ivf_trained_rows"][0]) == 1000
+    carried = merged.carried_rows >= 0
+    assert (merged.ivf_assignments()[carried] == current.ivf_assignments()[merged.carried_rows[carried]]).all()
+    # New rows join their closest centroid.
+    new_rows = np.flatnonzero(~carried)
+    closest = np.argmax(merged._float_rows(new_rows) @ merged.ivf_centroids.T, axis=1)
+    assert (merged.ivf_assignments()[new_rows] == closest).all()
+
+    grown = JobVectorIndex.build(*clustered(int(1000 * vector_index.IVF_RETRAIN_GROWTH) + 1, seed=4))
+    grown.build_ivf(nlist=10, previous=current)
+    assert not np.array_equal(grown.ivf_centroids, current.ivf_centroids)
+    assert int(grown._arrays["ivf_trained_rows"][0]) == len(grown)
+
+
+def test_default_ivf_lists():
+    assert vector_index.default_ivf_lists(1) == 1
+    assert vector_index.default_ivf_lists(10000) == 400